@@ -0,0 +1,99 @@
+"""
+Admission control for the AI fallback path.
+Bounds how many LLM calls run at once and how many wait for a slot, so a
+traffic spike degrades to rule-based replies instead of unbounded latency.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+class AdmissionRejected(Exception):
+    """Raised when a call is shed because the queue is full or its wait deadline passed."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"AI fallback overloaded ({reason})")
+        self.reason = reason
+
+class AdmissionController:
+    """Concurrency limit with a bounded wait queue and a per-request queue deadline."""
+
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 64, queue_timeout: float = 2.0):
+        """
+        Args:
+            max_concurrent: Maximum LLM calls in flight at once
+            max_queue: Maximum calls waiting for a slot; further calls are shed
+            queue_timeout: Seconds a call may wait for a slot before it is shed
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the block, or raise AdmissionRejected."""
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.shed_queue_full += 1
+                raise AdmissionRejected("queue full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                raise AdmissionRejected("queue timeout") from None
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def try_acquire(self) -> bool:
+        """
+        Take a slot only if one is free right now, never queueing; pair with release().
+        Used for optional extra work (hedged attempts) that must not displace real calls.
+        """
+        if self._semaphore.locked():
+            return False
+        await self._semaphore.acquire()  # Free slot: returns without suspending
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a slot taken by slot() or try_acquire()."""
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict:
+        """Return current depth and shed counters."""
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shedQueueFull": self.shed_queue_full,
+            "shedTimeout": self.shed_timeout,
+        }
+
+def create_admission_controller() -> AdmissionController:
+    """Build an AdmissionController from environment configuration."""
+    return AdmissionController(
+        max_concurrent=int(os.getenv("AI_MAX_CONCURRENT", "16")),
+        max_queue=int(os.getenv("AI_MAX_QUEUE", "64")),
+        queue_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", "2")),
+    )
@@ -0,0 +1,11 @@
+"""
+Offline benchmarks for the backend.
+Run from the backend/ directory; nothing here needs a server, network access
+or an API key.
+
+    python -m benchmarks.bench_rules --sizes 8,100,500 --messages 5000
+    python -m benchmarks.bench_app --requests 2000 --concurrency 32
+
+Both accept --json FILE to save results (tagged with the git commit) and
+--compare FILE to print the change against an earlier run.
+"""
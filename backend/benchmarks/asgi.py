@@ -0,0 +1,61 @@
+"""
+Minimal in-process ASGI client, so benchmarks measure the app rather than an
+HTTP stack.
+"""
+
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+
+async def request(app, method: str, path: str, body: Optional[Dict] = None, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+    """
+    Send one HTTP request straight to an ASGI app.
+
+    Returns:
+        (status code, full response body)
+    """
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode("latin-1"),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # Streaming responses watch for a disconnect; only report one once the body is done
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    status = 500
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
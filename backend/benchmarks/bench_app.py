@@ -0,0 +1,103 @@
+"""
+End-to-end benchmark of the FastAPI app, in-process.
+
+Requests go straight to the ASGI app (no sockets) and the LLM is replaced by
+a stub with a fixed latency, so results reflect the app's own overhead and
+its behaviour under concurrency. Each scenario runs --requests requests with
+--concurrency in flight; the reply cache is cleared between scenarios.
+
+Usage: python -m benchmarks.bench_app [--requests 2000] [--concurrency 32] [--llm-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+# The app reads its configuration at import time
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.pop("REPLY_DISK_CACHE_PATH", None)
+os.environ.pop("REPLY_CACHE_WARM_FILE", None)
+
+import main
+from admission import create_admission_controller
+from benchmarks.asgi import request
+from benchmarks.corpus import synthetic_messages
+from benchmarks.report import load_baseline, print_table, summarize, write_json
+from benchmarks.stub_llm import stub_llm_client
+from resilience import create_resilience_policy
+from rules import rule_store
+
+def scenarios(messages: List[str]) -> List[Dict]:
+    session = {"grade": 10, "interests": ["coding"], "experience_types": [], "clubs_viewed": [], "query_history": []}
+    return [
+        {"name": "GET /api/health", "method": "GET", "path": "/api/health", "bodies": [None]},
+        {"name": "POST /api/recommend", "method": "POST", "path": "/api/recommend",
+         "bodies": [{"message": message, "sessionData": session} for message in messages]},
+        {"name": "POST /api/recommend/stream", "method": "POST", "path": "/api/recommend/stream",
+         "bodies": [{"message": message, "sessionData": session} for message in messages]},
+        {"name": "POST /api/ai", "method": "POST", "path": "/api/ai",
+         "bodies": [{"message": message, "sessionData": session} for message in messages]},
+    ]
+
+async def run_scenario(scenario: Dict, total: int, concurrency: int) -> Dict:
+    bodies = scenario["bodies"]
+    durations: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            body = bodies[next_index % len(bodies)]
+            next_index += 1
+            started = time.perf_counter()
+            status, _ = await request(main.app, scenario["method"], scenario["path"], body)
+            durations.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    main.reply_cache.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(scenario["name"], durations, time.perf_counter() - started, errors=errors)
+
+async def run(total: int, concurrency: int, hit_ratio: float, llm_latency: float, seed: int) -> List[Dict]:
+    messages = synthetic_messages(total, dict(rule_store.snapshot.rule_mappings), hit_ratio=hit_ratio, seed=seed)
+    async with main.app.router.lifespan_context(main.app):
+        if main.app.state.llm is not None:
+            await main.app.state.llm.aclose()
+        admission = create_admission_controller()
+        main.app.state.llm = stub_llm_client(
+            latency=llm_latency,
+            admission=admission,
+            resilience=create_resilience_policy(admission),
+        )
+        # Warm up imports, caches and pydantic models
+        for scenario in scenarios(messages[:20]):
+            await run_scenario(scenario, 20, 4)
+        return [await run_scenario(scenario, total, concurrency) for scenario in scenarios(messages)]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the FastAPI app in-process against a stub LLM")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--hit-ratio", type=float, default=0.6, help="Share of messages the rules answer")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.hit_ratio, args.llm_latency, args.seed))
+    print_table(results, load_baseline(args.compare))
+    if args.json:
+        write_json(
+            results, args.json,
+            requests=args.requests, concurrency=args.concurrency, hitRatio=args.hit_ratio,
+            llmLatency=args.llm_latency, seed=args.seed
+        )
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,84 @@
+"""
+Rule engine micro-benchmarks as the rule table grows.
+
+Times match_club, _extract_matched_patterns, get_rule_based_recommendations
+and ClubScorer scoring alone call by call over a synthetic corpus, for each
+requested table size. Scoring only touches the terms a message hit, so its
+cost should stay flat as the table grows; --max-score-growth turns that into
+a check.
+
+Usage: python -m benchmarks.bench_rules [--sizes 8,100,500] [--messages 5000] [--max-score-growth 5]
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List
+
+import rules
+from benchmarks.corpus import synthetic_messages, synthetic_rule_table
+from normalize import normalize
+from benchmarks.report import load_baseline, print_table, summarize, write_json
+
+def time_calls(name: str, fn: Callable[[str], object], messages: List[str], **extra) -> Dict:
+    """Call fn once per message, after a short warm-up, and summarize."""
+    for message in messages[:100]:
+        fn(message)
+    durations = []
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    for message in messages:
+        call_started = perf_counter()
+        fn(message)
+        durations.append(perf_counter() - call_started)
+    return summarize(name, durations, perf_counter() - started, **extra)
+
+def run(sizes: List[int], message_count: int, hit_ratio: float, seed: int) -> List[Dict]:
+    results = []
+    session_data = {"interests": ["coding", "music"]}
+    original_store = rules.rule_store
+    try:
+        for size in sizes:
+            table = synthetic_rule_table(size, seed=seed)
+            rules.rule_store = rules.RuleStore(table)
+            rules.rule_store.warm_up()
+            messages = synthetic_messages(message_count, table, hit_ratio=hit_ratio, seed=seed)
+            snapshot = rules.rule_store.snapshot
+            spans = {message: snapshot.matcher.find(normalize(message)) for message in messages}
+            interests = [session_data["interests"]]
+            for name, fn in (
+                ("match_club", lambda message: rules.match_club(message, session_data)),
+                ("_extract_matched_patterns", rules._extract_matched_patterns),
+                ("get_rule_based_recommendations", lambda message: rules.get_rule_based_recommendations(message, session_data)),
+                ("ClubScorer.score", lambda message: snapshot.scorer.rank(snapshot.scorer.score([spans[message]], interests)[0])),
+            ):
+                results.append(time_calls(f"{name}[rules={len(table)}]", fn, messages, rules=len(table)))
+    finally:
+        rules.rule_store = original_store
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rule engine as the rule table grows")
+    parser.add_argument("--sizes", default="8,100,500,2000", help="Comma-separated rule table sizes")
+    parser.add_argument("--messages", type=int, default=5000, help="Messages per table size")
+    parser.add_argument("--hit-ratio", type=float, default=0.6, help="Share of messages containing a keyword")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-score-growth", type=float, help="Fail if ClubScorer.score p50 at the largest size exceeds this multiple of the smallest")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.messages, args.hit_ratio, args.seed)
+    print_table(results, load_baseline(args.compare))
+    if args.json:
+        write_json(results, args.json, sizes=sizes, messages=args.messages, hitRatio=args.hit_ratio, seed=args.seed)
+    if args.max_score_growth:
+        scoring = [result for result in results if result["name"].startswith("ClubScorer.score")]
+        growth = scoring[-1]["p50Us"] / scoring[0]["p50Us"]
+        print(f"ClubScorer.score p50 grew {growth:.1f}x from {scoring[0]['name']} to {scoring[-1]['name']}")
+        if growth > args.max_score_growth:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
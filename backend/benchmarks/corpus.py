@@ -0,0 +1,81 @@
+"""
+Deterministic synthetic inputs: rule tables of any size and message corpora
+with a chosen share of rule hits.
+"""
+
+import random
+from typing import Dict, List, Optional
+
+from rules import RULE_MAPPINGS
+
+# Conversational filler that matches no rule keyword or word list
+FILLER = [
+    "hi", "hey", "so", "i", "am", "really", "into", "kind", "of", "like", "stuff",
+    "with", "my", "friends", "after", "school", "is", "there", "anything", "for",
+    "people", "who", "enjoy", "things", "maybe", "something", "fun", "this", "year",
+    "thanks", "please", "any", "ideas", "about", "good", "options", "here",
+]
+
+_SYLLABLES = ["ka", "zor", "vel", "tri", "mon", "qua", "lex", "dru", "pim", "sho", "nax", "bel", "yor", "fen"]
+
+def pseudo_word(rng: random.Random) -> str:
+    """A made-up word that won't collide with real keywords."""
+    return "".join(rng.choice(_SYLLABLES) for _ in range(3))
+
+def synthetic_rule_table(size: int, keywords_per_rule: int = 8, seed: int = 0) -> Dict[str, Dict]:
+    """
+    The built-in rules padded with made-up clubs up to size entries.
+
+    Args:
+        size: Total number of rules (at least the built-in count)
+        keywords_per_rule: Keywords for each made-up club
+        seed: Random seed
+
+    Returns:
+        Rule mappings shaped like RULE_MAPPINGS
+    """
+    rng = random.Random(seed)
+    table = {club_type: dict(rule_data) for club_type, rule_data in RULE_MAPPINGS.items()}
+    index = 0
+    while len(table) < size:
+        keywords = [pseudo_word(rng) for _ in range(keywords_per_rule)]
+        table[f"club{index}"] = {"keywords": keywords, "response": f"Try Club {index}!"}
+        index += 1
+    return table
+
+def synthetic_messages(
+    count: int,
+    rule_mappings: Dict[str, Dict],
+    hit_ratio: float = 0.6,
+    words: int = 12,
+    seed: int = 0,
+    unique_misses: bool = True,
+) -> List[str]:
+    """
+    Student-like messages, a hit_ratio share of which contain a rule keyword.
+
+    Args:
+        count: Number of messages
+        rule_mappings: Rule table the hits are drawn from
+        hit_ratio: Fraction of messages containing one keyword
+        words: Filler words per message
+        seed: Random seed
+        unique_misses: Give every miss a made-up word so misses don't repeat
+
+    Returns:
+        The messages, in a reproducible order
+    """
+    rng = random.Random(seed)
+    keywords = [keyword for rule_data in rule_mappings.values() for keyword in rule_data["keywords"]]
+    messages = []
+    for _ in range(count):
+        parts = [rng.choice(FILLER) for _ in range(words)]
+        extra: Optional[str] = None
+        if rng.random() < hit_ratio:
+            extra = rng.choice(keywords)
+        elif unique_misses:
+            extra = pseudo_word(rng)
+        if extra:
+            parts.insert(rng.randrange(len(parts) + 1), extra)
+        messages.append(" ".join(parts))
+    return messages
@@ -0,0 +1,81 @@
+"""
+Small keep-alive HTTP/1.1 client on asyncio streams, so the load generator
+needs nothing beyond the standard library.
+"""
+
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+class HTTPError(Exception):
+    """Raised for connection failures and malformed responses."""
+
+class ConnectionPool:
+    """Pool of keep-alive connections to one host, with a connection limit."""
+
+    def __init__(self, host: str, port: int, max_connections: int = 256, timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._limit = asyncio.Semaphore(max_connections)
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        """Send one request and return (status, body), reusing an idle connection when possible."""
+        async with self._limit:
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = await asyncio.open_connection(self.host, self.port)
+            try:
+                status, response_body, keep_alive = await asyncio.wait_for(
+                    self._exchange(connection, method, path, body), self.timeout
+                )
+            except BaseException:
+                connection[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+            return status, response_body
+
+    async def _exchange(self, connection, method: str, path: str, body: Optional[Dict]) -> Tuple[int, bytes, bool]:
+        reader, writer = connection
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise HTTPError("connection closed")
+        status = int(status_line.split()[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            response_body = b"".join(chunks)
+        else:
+            response_body = await reader.readexactly(int(headers.get("content-length", "0")))
+        return status, response_body, headers.get("connection", "").lower() != "close"
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
@@ -0,0 +1,223 @@
+"""
+Open-loop load generator for sizing the backend, fully offline.
+
+Starts the deterministic mock LLM (benchmarks.mock_llm) and the backend
+pointed at it, unless --target names an already running backend. Then, for
+each rate in --rates, sends Poisson-distributed arrivals for --duration
+seconds without waiting for earlier responses, mixing /api/recommend, /api/ai
+and /api/ai-recommendations. Latency is measured from each request's
+scheduled send time, so queueing inside the client isn't hidden. Add
+recommend-stream to --mix to include the SSE endpoint (timed to the last event).
+
+Usage: python -m benchmarks.loadgen --rates 10,25,50,100 --duration 20
+       [--workers 1] [--llm-latency lognormal:0.6:0.4] [--llm-error-rate 0.02]
+       [--mix recommend=0.7,ai=0.1,ai-recommendations=0.2] [--target 127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks.corpus import synthetic_messages
+from benchmarks.httpclient import ConnectionPool
+from benchmarks.report import percentile, write_json
+from rules import RULE_MAPPINGS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "recommend": "/api/recommend",
+    "ai": "/api/ai",
+    "ai-recommendations": "/api/ai-recommendations",
+    "recommend-stream": "/api/recommend/stream",
+}
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix.append((name, float(weight)))
+    return mix
+
+def request_body(endpoint: str, message: str, rng: random.Random) -> Dict:
+    session = {
+        "grade": rng.choice((9, 10, 11, 12)),
+        "interests": rng.sample(["coding", "music", "art", "debate", "sports", "science"], rng.randint(0, 2)),
+        "experience_types": [],
+        "clubs_viewed": [],
+        "query_history": [],
+    }
+    if endpoint == "ai-recommendations":
+        return {"userAnswers": {"query": message}, "conversationContext": session}
+    return {"message": message, "sessionData": session}
+
+def summarize_latencies(latencies: List[float]) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        "p50Ms": percentile(ordered, 0.50) * 1000,
+        "p90Ms": percentile(ordered, 0.90) * 1000,
+        "p99Ms": percentile(ordered, 0.99) * 1000,
+    }
+
+async def run_step(pool: ConnectionPool, rate: float, duration: float, mix, messages: List[str], seed: int, drain_timeout: float) -> Dict:
+    """Offer rate requests/s for duration seconds and collect the outcomes."""
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    sources: Counter = Counter()
+    sent: Counter = Counter()
+
+    async def fire(endpoint: str, body: Dict, scheduled: float) -> None:
+        try:
+            status, response_body = await pool.request("POST", ENDPOINTS[endpoint], body)
+        except Exception as e:
+            errors[(endpoint, type(e).__name__)] += 1
+            return
+        latencies[endpoint].append(time.perf_counter() - scheduled)
+        if status >= 400:
+            errors[(endpoint, str(status))] += 1
+            return
+        if endpoint == "recommend":
+            sources[json.loads(response_body).get("source")] += 1
+        elif endpoint == "ai-recommendations" and json.loads(response_body).get("status") == "error":
+            errors[(endpoint, "status=error")] += 1
+
+    tasks = []
+    started = time.perf_counter()
+    next_arrival = started
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - started >= duration:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(names, weights)[0]
+        body = request_body(endpoint, rng.choice(messages), rng)
+        sent[endpoint] += 1
+        tasks.append(asyncio.ensure_future(fire(endpoint, body, next_arrival)))
+
+    done, pending = await asyncio.wait(tasks, timeout=drain_timeout) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+        errors[("all", "unfinished")] += 1
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    total_errors = sum(errors.values())
+    return {
+        "offeredRps": rate,
+        "sent": sum(sent.values()),
+        "completedRps": len(all_latencies) / elapsed,
+        "errorRate": total_errors / max(1, sum(sent.values())),
+        **summarize_latencies(all_latencies),
+        "endpoints": {
+            endpoint: {"sent": sent[endpoint], **summarize_latencies(latencies[endpoint])}
+            for endpoint in names
+        },
+        "errors": {f"{endpoint}:{kind}": count for (endpoint, kind), count in errors.items()},
+        "recommendSources": dict(sources),
+    }
+
+def print_step(result: Dict) -> None:
+    print(
+        f"{result['offeredRps']:>8.1f} {result['completedRps']:>10.1f} {result['errorRate'] * 100:>7.2f}% "
+        f"{result['p50Ms']:>9.1f} {result['p90Ms']:>9.1f} {result['p99Ms']:>9.1f}   "
+        + " ".join(f"{endpoint}:p99={stats['p99Ms']:.0f}ms" for endpoint, stats in result["endpoints"].items())
+        + (f"   sources={result['recommendSources']}" if result["recommendSources"] else "")
+    )
+    if result["errors"]:
+        print(f"{'':>8} errors: {result['errors']}")
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env={**os.environ, **env})
+
+async def wait_until_up(pool: ConnectionPool, method: str, path: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            status, _ = await pool.request(method, path)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{pool.host}:{pool.port} did not come up")
+        await asyncio.sleep(0.2)
+
+async def run(args) -> List[Dict]:
+    mix = parse_mix(args.mix)
+    messages = synthetic_messages(args.corpus, RULE_MAPPINGS, hit_ratio=args.hit_ratio, seed=args.seed)
+    processes: List[subprocess.Popen] = []
+    try:
+        if args.target:
+            host, _, port = args.target.rpartition(":")
+        else:
+            host, port = "127.0.0.1", str(args.port)
+            processes.append(start_process([
+                "-m", "benchmarks.mock_llm", "--port", str(args.llm_port), "--latency", args.llm_latency,
+                "--error-rate", str(args.llm_error_rate), "--token-delay", str(args.llm_token_delay), "--seed", str(args.seed),
+            ], {}))
+            backend_env = {"OPENAI_API_KEY": "mock", "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1"}
+            if args.workers > 1:
+                processes.append(start_process(["serve.py", "--port", port, "--workers", str(args.workers)], backend_env))
+            else:
+                processes.append(start_process(["-m", "uvicorn", "main:app", "--port", port, "--log-level", "warning"], backend_env))
+            await wait_until_up(ConnectionPool("127.0.0.1", args.llm_port), "GET", "/stats")
+
+        pool = ConnectionPool(host, int(port), max_connections=args.max_connections, timeout=args.timeout)
+        await wait_until_up(pool, "GET", "/api/health")
+
+        print(f"{'offered':>8} {'done/s':>10} {'errors':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+        results = []
+        for index, rate in enumerate(args.rates):
+            result = await run_step(pool, rate, args.duration, mix, messages, args.seed + index, args.timeout)
+            print_step(result)
+            results.append(result)
+        await pool.close()
+        return results
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test against a mock LLM")
+    parser.add_argument("--rates", default="10,25,50,100", help="Comma-separated request rates (req/s), one step each")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per rate step")
+    parser.add_argument("--mix", default="recommend=0.7,ai=0.1,ai-recommendations=0.2", help="Endpoint weights")
+    parser.add_argument("--hit-ratio", type=float, default=0.6, help="Share of messages the rules answer")
+    parser.add_argument("--corpus", type=int, default=5000, help="Distinct messages to draw from")
+    parser.add_argument("--target", help="host:port of a running backend; skips starting the backend and mock LLM")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the backend started by this tool")
+    parser.add_argument("--workers", type=int, default=1, help="Backend worker processes (uses serve.py when > 1)")
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--llm-latency", default="lognormal:0.6:0.4", help="Mock LLM latency spec")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-token-delay", type=float, default=0.02)
+    parser.add_argument("--max-connections", type=int, default=1024)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout and drain limit in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+
+    results = asyncio.run(run(args))
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key != "json"}
+        write_json(results, args.json, **settings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Deterministic mock of the OpenAI chat completions API, for offline load tests.
+
+Latency, errors and streamed tokens are drawn from a random generator
+seeded by --seed, the prompt and how many times that prompt has been seen,
+so a rerun with the same traffic behaves the same way.
+
+Latency specs: fixed:S, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA, exponential:MEAN
+
+Usage: python -m benchmarks.mock_llm [--port 9100] [--latency lognormal:0.6:0.4]
+       [--error-rate 0.02] [--token-delay 0.02]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+class LatencyModel:
+    """A latency distribution parsed from a spec like "lognormal:0.6:0.4"."""
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+        if expected.get(kind) != len(self.params):
+            raise ValueError(f"Bad latency spec {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma)
+        return rng.expovariate(1 / self.params[0])
+
+def create_mock_app(latency: LatencyModel, error_rate: float = 0.0, token_delay: float = 0.02, seed: int = 0) -> FastAPI:
+    """
+    Build the mock server app.
+
+    Args:
+        latency: Time to first token (or to the whole reply when not streaming)
+        error_rate: Share of calls answered with a 500 or 429
+        token_delay: Seconds between streamed tokens
+        seed: Seed mixed into every per-request generator
+    """
+    app = FastAPI(title="Mock LLM")
+    seen: Counter = Counter()
+    stats = Counter()
+
+    def request_rng(messages: List[Dict]) -> random.Random:
+        prompt = json.dumps(messages, sort_keys=True)
+        seen[prompt] += 1
+        digest = hashlib.sha256(f"{seed}\x00{seen[prompt]}\x00{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body["messages"]
+        rng = request_rng(messages)
+        stats["requests"] += 1
+        await asyncio.sleep(latency.sample(rng))
+
+        if rng.random() < error_rate:
+            status = rng.choice((500, 429))
+            stats[f"errors{status}"] += 1
+            return JSONResponse({"error": {"message": "mock upstream error", "type": "server_error"}}, status_code=status)
+
+        words = ["Here", "are", "some", "clubs", "you", "might", "like:"] + [
+            rng.choice(("Coding", "Robotics", "Debate", "Art", "Music", "Science", "Chess", "Drama"))
+            for _ in range(rng.randint(5, 40))
+        ]
+        reply = " ".join(words)
+        usage = {
+            "prompt_tokens": sum(len(message["content"]) for message in messages) // 4,
+            "completion_tokens": len(words),
+            "total_tokens": sum(len(message["content"]) for message in messages) // 4 + len(words),
+        }
+        base = {"id": f"mock-{stats['requests']}", "created": int(time.time()), "model": body.get("model", "mock")}
+
+        if not body.get("stream"):
+            stats["completions"] += 1
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            for index, word in enumerate(words):
+                if index and token_delay:
+                    await asyncio.sleep(token_delay)
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["streams"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic mock OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:0.6:0.4", help="Latency distribution spec")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_mock_app(LatencyModel(args.latency), args.error_rate, args.token_delay, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
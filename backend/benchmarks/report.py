@@ -0,0 +1,73 @@
+"""
+Latency summaries, result tables and JSON output for comparing runs.
+"""
+
+import json
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(name: str, durations: List[float], wall_seconds: float, **extra) -> Dict:
+    """
+    Summarize per-operation durations (seconds) measured over wall_seconds.
+
+    Returns:
+        Dictionary with ops/s and p50/p99/max latency in microseconds
+    """
+    ordered = sorted(durations)
+    result = {
+        "name": name,
+        "ops": len(ordered),
+        "opsPerSecond": len(ordered) / wall_seconds if wall_seconds else 0.0,
+        "p50Us": percentile(ordered, 0.50) * 1e6,
+        "p99Us": percentile(ordered, 0.99) * 1e6,
+        "maxUs": (ordered[-1] if ordered else 0.0) * 1e6,
+    }
+    result.update(extra)
+    return result
+
+def print_table(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None) -> None:
+    """Print results, with the percentage change from a baseline run when given."""
+    print(f"{'benchmark':<48} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'max us':>10}")
+    for result in results:
+        line = f"{result['name']:<48} {result['opsPerSecond']:>12.1f} {result['p50Us']:>10.1f} {result['p99Us']:>10.1f} {result['maxUs']:>10.1f}"
+        if result.get("errors"):
+            line += f"  errors={result['errors']}"
+        previous = (baseline or {}).get(result["name"])
+        if previous and previous["opsPerSecond"]:
+            change = (result["opsPerSecond"] / previous["opsPerSecond"] - 1) * 100
+            line += f"  ({change:+.1f}% ops/s, p99 {previous['p99Us']:.1f} -> {result['p99Us']:.1f})"
+        print(line)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_json(results: List[Dict], path: str, **settings) -> None:
+    """Save results with the commit, interpreter and settings they came from."""
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump({
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "settings": settings,
+            "results": results,
+        }, results_file, indent=2)
+
+def load_baseline(path: Optional[str]) -> Optional[Dict[str, Dict]]:
+    """Load a previous --json file as name -> result."""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as results_file:
+        return {result["name"]: result for result in json.load(results_file)["results"]}
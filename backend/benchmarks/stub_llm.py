@@ -0,0 +1,68 @@
+"""
+In-process stand-in for the OpenAI SDK client.
+Installed under a real LLMClient, so admission control, single-flight,
+resilience and metrics all run as in production; only the HTTP round-trip
+is replaced by a fixed, deterministic delay and reply.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, List
+
+from llm_client import LLMClient
+
+def _usage(messages: List[Dict], reply: str) -> SimpleNamespace:
+    prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(reply) // 4)
+
+class _StubStream:
+    def __init__(self, reply: str, messages: List[Dict], token_delay: float):
+        self._words = reply.split(" ")
+        self._usage = _usage(messages, reply)
+        self._token_delay = token_delay
+
+    async def __aiter__(self):
+        for index, word in enumerate(self._words):
+            if self._token_delay:
+                await asyncio.sleep(self._token_delay)
+            text = word if index == 0 else " " + word
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        yield SimpleNamespace(choices=[], usage=self._usage)
+
+    async def close(self) -> None:
+        pass
+
+class StubCompletions:
+    """Implements chat.completions.create with a fixed latency."""
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+
+    async def create(self, model: str, messages: List[Dict], stream: bool = False, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        reply = f"Based on what you said, you might enjoy these clubs: {messages[-1]['content'][:40]}"
+        if stream:
+            return _StubStream(reply, messages, self.token_delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+            usage=_usage(messages, reply),
+        )
+
+class StubOpenAI:
+    """Just enough of openai.AsyncOpenAI for LLMClient."""
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0):
+        self.chat = SimpleNamespace(completions=StubCompletions(latency, token_delay))
+
+    async def close(self) -> None:
+        pass
+
+def stub_llm_client(latency: float = 0.0, token_delay: float = 0.0, **kwargs) -> LLMClient:
+    """An LLMClient whose upstream calls are served by StubOpenAI."""
+    client = LLMClient(api_key="stub", **kwargs)
+    client._client = StubOpenAI(latency, token_delay)
+    return client
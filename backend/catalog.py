@@ -0,0 +1,337 @@
+"""
+Club catalog for the Python backend.
+The catalog is read once from the frontend's shared club data
+(frontend/src/shared/data/clubData.ts, or a JSON export of allClubData via
+CLUB_DATA_FILE) into inverted indexes by school, category, meeting day and
+keyword, so filtered queries touch only the matching clubs and pages are
+cut with an opaque cursor instead of shipping the whole dataset.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from normalize import normalize, stem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLUB_DATA_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "src", "shared", "data", "clubData.ts"
+)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+SORT_ORDERS = ("relevance", "name", "school")
+
+# Weight of a keyword by the field it appears in
+FIELD_WEIGHTS = (("name", 3.0), ("category", 2.0), ("activities", 1.0), ("benefits", 1.0), ("description", 1.0))
+
+# Terms in more than this share of clubs ("club", "students") don't narrow a search
+MAX_TERM_SHARE = 0.5
+
+_DAY_PATTERNS = tuple((day, re.compile(pattern, re.IGNORECASE)) for day, pattern in (
+    ("monday", r"\bmon(day)?s?\b"),
+    ("tuesday", r"\btues?(day)?s?\b"),
+    ("wednesday", r"\bwed(nesday)?s?\b"),
+    ("thursday", r"\bthu(rs?)?(day)?s?\b"),
+    ("friday", r"\bfri(day)?s?\b"),
+    ("saturday", r"\bsat(urday)?s?\b"),
+    ("sunday", r"\bsun(day)?s?\b"),
+))
+
+def meeting_days(text: str) -> Set[str]:
+    """Weekdays named in a free-text meeting description."""
+    return {day for day, pattern in _DAY_PATTERNS if pattern.search(text or "")}
+
+# JavaScript object literals, as written in clubData.ts
+_JS_TOKEN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}\[\]:,])
+""", re.VERBOSE | re.DOTALL)
+_JS_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\n|.)", re.DOTALL)
+_JS_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0", "\n": ""}
+_JS_CONSTANTS = {"true": True, "false": False, "null": None, "undefined": None}
+
+def _unescape(match: "re.Match") -> str:
+    escape = match.group(1)
+    if escape[0] in "ux" and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return _JS_ESCAPES.get(escape, escape)
+
+def parse_js_literal(text: str, start: int = 0):
+    """
+    Parse a JavaScript object/array literal (quoted or bare keys, trailing
+    commas, comments) starting at text[start].
+
+    Raises:
+        ValueError: If the text is not a supported literal
+    """
+    tokens = []
+    position = start
+    depth = 0
+    while position < len(text):
+        match = _JS_TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected character {text[position]!r} at offset {position}")
+        position = match.end()
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        tokens.append((kind, match.group()))
+        if kind == "punct" and match.group() in "{[":
+            depth += 1
+        elif kind == "punct" and match.group() in "}]":
+            depth -= 1
+            if depth == 0:
+                break
+    index = 0
+
+    def value():
+        nonlocal index
+        kind, token = tokens[index]
+        index += 1
+        if kind == "string":
+            return _JS_ESCAPE.sub(_unescape, token[1:-1])
+        if kind == "number":
+            return float(token) if "." in token else int(token)
+        if kind == "name" and token in _JS_CONSTANTS:
+            return _JS_CONSTANTS[token]
+        if token == "[":
+            items = []
+            while tokens[index][1] != "]":
+                items.append(value())
+                if tokens[index][1] == ",":
+                    index += 1
+            index += 1
+            return items
+        if token == "{":
+            obj = {}
+            while tokens[index][1] != "}":
+                key_kind, key = tokens[index]
+                obj_key = _JS_ESCAPE.sub(_unescape, key[1:-1]) if key_kind == "string" else key
+                if tokens[index + 1][1] != ":":
+                    raise ValueError(f"Expected ':' after key {obj_key!r}")
+                index += 2
+                obj[obj_key] = value()
+                if tokens[index][1] == ",":
+                    index += 1
+            index += 1
+            return obj
+        raise ValueError(f"Unexpected token {token!r}")
+
+    try:
+        return value()
+    except IndexError:
+        raise ValueError("Unterminated literal") from None
+
+def load_club_data(path: str) -> Tuple[List[Dict], str]:
+    """
+    Read [{school, clubs: [...]}, ...] from a JSON file or from the
+    allClubData literal in a .ts/.js module.
+
+    Returns:
+        (schools, content hash used as the catalog version)
+    """
+    with open(path, "r", encoding="utf-8") as data_file:
+        text = data_file.read()
+    version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    if path.endswith(".json"):
+        return json.loads(text), version
+    match = re.search(r"\ballClubData\s*=\s*", text)
+    if match is None:
+        raise ValueError(f"No allClubData literal in {path}")
+    return parse_js_literal(text, match.end()), version
+
+def _terms(text: str) -> List[str]:
+    return [stem(word) for word in normalize(text).words]
+
+class ClubCatalog:
+    """Read-only, indexed club catalog; see the module docstring."""
+
+    def __init__(self, schools: Iterable[Dict], version: str = "empty"):
+        """
+        Args:
+            schools: allClubData-shaped list of {school, clubs}
+            version: Identifies this catalog's content, for cursors and caching
+        """
+        self.version = version
+        clubs = []
+        for school in schools:
+            for club in school.get("clubs") or ():
+                clubs.append({**club, "school": school["school"]})
+        # Position in name order, so sorting positions sorts by name
+        clubs.sort(key=lambda club: (club.get("name", "").lower(), club["school"]))
+        self.clubs: Tuple[Dict, ...] = tuple(clubs)
+        by_school_order = sorted(range(len(clubs)), key=lambda i: (clubs[i]["school"], i))
+        self._school_rank = {position: rank for rank, position in enumerate(by_school_order)}
+
+        self.by_school: Dict[str, Set[int]] = {}
+        self.by_category: Dict[str, Set[int]] = {}
+        self.by_day: Dict[str, Set[int]] = {}
+        self.by_term: Dict[str, Dict[int, float]] = {}
+        for position, club in enumerate(clubs):
+            self.by_school.setdefault(club["school"].lower(), set()).add(position)
+            self.by_category.setdefault(str(club.get("category", "")).lower(), set()).add(position)
+            for day in meeting_days(club.get("meetingDay", "")):
+                self.by_day.setdefault(day, set()).add(position)
+            for field, weight in FIELD_WEIGHTS:
+                content = club.get(field) or ""
+                if isinstance(content, list):
+                    content = " ".join(map(str, content))
+                for term in set(_terms(str(content))):
+                    postings = self.by_term.setdefault(term, {})
+                    postings[position] = postings.get(position, 0.0) + weight
+
+        # Inverse document frequency; overly common terms get none
+        self._idf = {
+            term: math.log(len(clubs) / len(postings))
+            for term, postings in self.by_term.items()
+            if len(postings) <= MAX_TERM_SHARE * len(clubs)
+        }
+
+    def schools(self) -> List[str]:
+        return sorted({club["school"] for club in self.clubs})
+
+    def categories(self) -> List[str]:
+        return sorted({club.get("category", "") for club in self.clubs})
+
+    def score(self, text: str, candidates: Optional[Set[int]] = None) -> Dict[int, float]:
+        """Relevance of clubs to free text: summed field weight times IDF of each matching term."""
+        scores: Dict[int, float] = {}
+        for term in set(_terms(text)):
+            idf = self._idf.get(term)
+            if not idf:
+                continue
+            for position, weight in self.by_term[term].items():
+                if candidates is None or position in candidates:
+                    scores[position] = scores.get(position, 0.0) + weight * idf
+        return scores
+
+    def query(
+        self,
+        school: Optional[str] = None,
+        category: Optional[str] = None,
+        day: Optional[str] = None,
+        q: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """
+        Filter, sort and page the catalog.
+
+        Args:
+            school: Exact school name (case-insensitive)
+            category: Exact category (case-insensitive)
+            day: Weekday the club meets ("tuesday", "tue", ...)
+            q: Free-text search; clubs must match at least one distinctive term
+            sort: "relevance" (default with q), "name" (default otherwise) or "school"
+            limit: Page size, capped at MAX_PAGE_SIZE
+            cursor: nextCursor from the previous page of the same query
+
+        Returns:
+            {"clubs": [...], "total": int, "nextCursor": str or None, "version": str}
+
+        Raises:
+            ValueError: On an unknown sort order or day, or a cursor from another query or catalog
+        """
+        sort = sort or ("relevance" if q else "name")
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order {sort!r}; use one of {', '.join(SORT_ORDERS)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Intersect the smallest posting sets first
+        filters: List[Set[int]] = []
+        if school:
+            filters.append(self.by_school.get(school.lower(), set()))
+        if category:
+            filters.append(self.by_category.get(category.lower(), set()))
+        if day:
+            days = meeting_days(day)
+            if not days:
+                raise ValueError(f"Unknown day {day!r}")
+            filters.append(set().union(*(self.by_day.get(name, set()) for name in days)))
+        filters.sort(key=len)
+        candidates: Optional[Set[int]] = None
+        for posting in filters:
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                break
+
+        if q:
+            scores = self.score(q, candidates)
+            positions = list(scores)
+        else:
+            scores = {}
+            positions = list(candidates) if candidates is not None else list(range(len(self.clubs)))
+        if sort == "relevance" and q:
+            positions.sort(key=lambda position: (-scores[position], position))
+        elif sort == "school":
+            positions.sort(key=self._school_rank.__getitem__)
+        else:
+            positions.sort()
+
+        fingerprint = zlib.crc32(repr((school and school.lower(), category and category.lower(), day, q, sort)).encode())
+        offset = self._decode_cursor(cursor, fingerprint) if cursor else 0
+        page = positions[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            "clubs": [self.clubs[position] for position in page],
+            "total": len(positions),
+            "nextCursor": self._encode_cursor(next_offset, fingerprint) if next_offset < len(positions) else None,
+            "version": self.version,
+        }
+
+    def _encode_cursor(self, offset: int, fingerprint: int) -> str:
+        raw = json.dumps({"v": self.version, "f": fingerprint, "o": offset}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str, fingerprint: int) -> int:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset = int(data["o"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Malformed cursor") from None
+        if data.get("v") != self.version:
+            raise ValueError("Cursor is from an older catalog; start again without a cursor")
+        if data.get("f") != fingerprint or offset < 0:
+            raise ValueError("Cursor belongs to a different query")
+        return offset
+
+    def __len__(self) -> int:
+        return len(self.clubs)
+
+def create_club_catalog() -> ClubCatalog:
+    """Load the catalog from CLUB_DATA_FILE (default: the frontend's clubData.ts)."""
+    path = os.getenv("CLUB_DATA_FILE") or DEFAULT_CLUB_DATA_FILE
+    try:
+        schools, version = load_club_data(path)
+    except (OSError, ValueError):
+        logger.exception("Failed to load club data from %s; serving an empty catalog", path)
+        return ClubCatalog([])
+    return ClubCatalog(schools, version)
+
+_catalog: Optional[ClubCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_club_catalog() -> ClubCatalog:
+    """The shared catalog, loaded on first use or by the startup warm-up."""
+    global _catalog
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = create_club_catalog()
+            catalog = _catalog
+    return catalog
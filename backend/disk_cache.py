@@ -0,0 +1,182 @@
+"""
+Persistent AI reply cache on local disk.
+Backed by SQLite in WAL mode so several uvicorn worker processes can read and
+write the same file concurrently, and replies survive deploys. Entries are
+keyed on a hash of the full prompt, expire after a TTL and are evicted
+least-recently-used once the file's payload exceeds a size budget.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Seconds between last-access updates for a hot entry, to avoid a write per hit
+_TOUCH_INTERVAL = 60.0
+
+# Run expiry and size eviction every N writes
+_EVICT_EVERY = 32
+
+# Seconds between recounts of the shared entry count and size reported by stats()
+_COUNT_INTERVAL = 30.0
+
+def prompt_hash(model: str, system_message: str, message: str) -> str:
+    """Stable hash of everything that determines an AI reply."""
+    digest = hashlib.sha256()
+    for part in (model, system_message, message):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class DiskReplyCache:
+    """SQLite-backed reply cache shared across processes on one host."""
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite database file
+            ttl_seconds: Seconds before an entry expires
+            max_bytes: Budget for stored reply text; least recently used entries are evicted beyond it
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Shared totals as of the last recount; stats() reports these without querying
+        self.entries = 0
+        self.bytes = 0
+        self._counted_at = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connection()
+        self._count(time.time(), force=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork(), so each worker process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._pid = os.getpid()
+            self._init_schema()
+        return self._conn
+
+    def _init_schema(self) -> None:
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS replies (
+                key TEXT PRIMARY KEY,
+                reply TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS replies_last_access ON replies (last_access)")
+
+    def _count(self, now: float, force: bool = False) -> None:
+        # Other processes write the same file, so totals are recounted rather than tracked
+        if force or now - self._counted_at >= _COUNT_INTERVAL:
+            self.entries, self.bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM replies"
+            ).fetchone()
+            self._counted_at = now
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached reply for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT reply, expires_at, last_access FROM replies WHERE key = ?", (key,)
+            ).fetchone()
+            self._count(now)
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            if now - row[2] >= _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE replies SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+                )
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, reply: str) -> None:
+        """Store a reply, occasionally purging expired entries and evicting to the size budget."""
+        now = time.time()
+        size = len(reply.encode("utf-8"))
+        with self._lock:
+            self._connection().execute(
+                """INSERT INTO replies (key, reply, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET reply = excluded.reply, size = excluded.size,
+                    expires_at = excluded.expires_at, last_access = excluded.last_access""",
+                (key, reply, size, now + self.ttl_seconds, now)
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+            self._count(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM replies WHERE expires_at <= ?", (now,))
+        self._count(now, force=True)
+        total = self.bytes
+        if total <= self.max_bytes:
+            return
+        # Walk from least recently used, deleting until under budget
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM replies ORDER BY last_access"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM replies WHERE key = ?", victims)
+        self.evictions += len(victims)
+        self._count(now, force=True)
+
+    def clear(self) -> None:
+        """Delete every entry, for all processes sharing the file."""
+        with self._lock:
+            self._connection().execute("DELETE FROM replies")
+            self.entries = self.bytes = 0
+
+    def stats(self) -> Dict:
+        """
+        Return this process's counters and the shared entry count and size.
+        The totals are recounted by get() and set() at most every
+        _COUNT_INTERVAL seconds (off the event loop), never here, so health
+        checks and metrics scrapes don't scan the table.
+        """
+        return {
+            "path": self.path,
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+def create_disk_reply_cache() -> Optional[DiskReplyCache]:
+    """Build a DiskReplyCache when REPLY_DISK_CACHE_PATH is set, otherwise None."""
+    path = os.getenv("REPLY_DISK_CACHE_PATH")
+    if not path:
+        return None
+    return DiskReplyCache(
+        path,
+        ttl_seconds=float(os.getenv("REPLY_DISK_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_bytes=int(os.getenv("REPLY_DISK_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
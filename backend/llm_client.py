@@ -0,0 +1,220 @@
+"""
+Async LLM client for the AI fallback path.
+A single client (and its pooled keep-alive HTTP connections) is created on
+the first AI request and shared by every later one, so awaiting a
+completion never blocks the event loop. The openai SDK is imported then
+too, not at app import.
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+from admission import AdmissionController, create_admission_controller
+from resilience import ResiliencePolicy, create_resilience_policy
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    Every waiter receives the same result, or the same exception. The shared
+    call runs as its own task, so a waiter that disconnects doesn't cancel it
+    for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Await fn(), or the already in-flight call for the same key."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+class LLMClient:
+    """Thin async wrapper around a shared openai.AsyncOpenAI client."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = DEFAULT_MODEL,
+        timeout: float = 30.0,
+        max_retries: int = 0,
+        admission: Optional[AdmissionController] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+    ):
+        """
+        Args:
+            api_key: Provider API key (defaults to OPENAI_API_KEY)
+            base_url: Override the provider URL, e.g. a local stub server
+            model: Chat model used for completions
+            timeout: Per-request HTTP timeout in seconds
+            max_retries: Transport-level retries performed by the SDK
+            admission: Limits concurrent upstream calls; unlimited when None
+            resilience: Deadline, hedging and circuit breaker; plain calls when None
+        """
+        self.model = model
+        self.admission = admission
+        self.resilience = resilience
+        self._single_flight = SingleFlight()
+        # Imported here: the SDK takes longer to import than the rest of the app,
+        # and workers serving only rule matches never need it
+        import openai
+        # The SDK keeps one httpx connection pool per client instance
+        self._client = openai.AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=max_retries,
+        )
+
+    async def complete(
+        self,
+        system_message: str,
+        user_message: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+    ) -> str:
+        """
+        Request a chat completion.
+
+        Args:
+            system_message: System prompt for the conversation
+            user_message: The student's message
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+
+        Returns:
+            The stripped reply text
+        """
+        # Identical prompts in flight at the same time share one upstream call
+        key = (system_message, user_message, max_tokens, temperature)
+        return await self._single_flight.do(
+            key, lambda: self._create(system_message, user_message, max_tokens, temperature)
+        )
+
+    @metrics.instrument("llm", on_outcome=metrics.record_llm_outcome("complete"))
+    async def _create(self, system_message: str, user_message: str, max_tokens: int, temperature: float) -> str:
+        # Coalesced waiters share the leader's slot, and its AdmissionRejected
+        request = self._request(system_message, user_message, max_tokens, temperature)
+        async with self._admit():
+            if self.resilience is None:
+                response = await self._client.chat.completions.create(**request)
+            else:
+                response = await self.resilience.call(lambda: self._client.chat.completions.create(**request))
+        metrics.record_llm_usage(response.usage)
+        return response.choices[0].message.content.strip()
+
+    async def stream(
+        self,
+        system_message: str,
+        user_message: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas.
+
+        Closing the iterator early (e.g. the client disconnected) closes the
+        upstream stream, so no further tokens are generated for us.
+        """
+        error: Optional[BaseException] = None
+        try:
+            async with self._admit():
+                # Streams can't be hedged, but they still respect and feed the breaker
+                if self.resilience is not None:
+                    self.resilience.check()
+                try:
+                    with metrics.stage("llm_stream"):
+                        response = await self._client.chat.completions.create(
+                            **self._request(system_message, user_message, max_tokens, temperature),
+                            stream=True,
+                            stream_options={"include_usage": True}
+                        )
+                        try:
+                            async for chunk in response:
+                                if chunk.choices and chunk.choices[0].delta.content:
+                                    yield chunk.choices[0].delta.content
+                                # With include_usage the last chunk carries the token counts
+                                metrics.record_llm_usage(chunk.usage)
+                        finally:
+                            await response.close()
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    if self.resilience is not None:
+                        self.resilience.record(error)
+        except BaseException as e:
+            error = error or e
+            raise
+        finally:
+            metrics.LLM_CALLS.inc(1, "stream", metrics.llm_outcome(error))
+
+    def _admit(self):
+        return self.admission.slot() if self.admission else contextlib.nullcontext()
+
+    def _request(self, system_message: str, user_message: str, max_tokens: int, temperature: float) -> Dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_message}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+    def stats(self) -> Dict:
+        """Return in-flight, coalescing, admission and resilience counters."""
+        return {
+            "inFlight": len(self._single_flight),
+            "coalesced": self._single_flight.coalesced,
+            "admission": self.admission.stats() if self.admission else None,
+            "resilience": self.resilience.stats() if self.resilience else None,
+        }
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self._client.close()
+
+def openai_error_types() -> Tuple[type, ...]:
+    """
+    Exception types to treat as provider errors, for except clauses.
+    Empty until the SDK has been imported, since nothing could raise them before.
+    """
+    openai = sys.modules.get("openai")
+    return (openai.OpenAIError,) if openai is not None else ()
+
+def create_llm_client() -> LLMClient:
+    """Build an LLMClient from environment configuration."""
+    admission = create_admission_controller()
+    return LLMClient(
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        model=os.getenv("OPENAI_MODEL", DEFAULT_MODEL),
+        timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+        admission=admission,
+        resilience=create_resilience_policy(admission),
+    )
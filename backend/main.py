@@ -1,21 +1,184 @@
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Load environment variables before the modules below read their configuration
+load_dotenv()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, List, Optional
-import openai
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, PrivateAttr
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import os
-from dotenv import load_dotenv
+import asyncio
+import hmac
 import json
-from rules import get_rule_based_recommendations, match_club
+import logging
+import sys
+from admission import AdmissionRejected
+from catalog import get_club_catalog
+from disk_cache import create_disk_reply_cache, prompt_hash
+from llm_client import DEFAULT_MODEL, LLMClient, create_llm_client, openai_error_types
+import metrics
+import profiling
+import prompts
+from responses import CompressionMiddleware, FastJSONResponse, cached_json, make_etag, not_modified
+import shared_state
+from sessions import SessionRecord, create_session_store
+from reply_cache import create_reply_cache, make_cache_key, normalize_message
+from rules import (
+    evaluate_message,
+    get_batch_rule_based_recommendations,
+    get_degraded_recommendation,
+    get_rule_based_recommendations,
+    rank_clubs,
+    rule_store,
+)
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of RULES_FILE for changes
+RULES_RELOAD_INTERVAL = float(os.getenv("RULES_RELOAD_INTERVAL", "5"))
+
+async def watch_rules_file():
+    """Poll the rules file and swap in a new snapshot when it changes."""
+    while True:
+        await asyncio.sleep(RULES_RELOAD_INTERVAL)
+        try:
+            if await asyncio.to_thread(rule_store.reload):
+                logger.info("Loaded rules version %s", rule_store.snapshot.version)
+        except Exception:
+            logger.exception("Failed to reload rules from %s; keeping version %s", rule_store.path, rule_store.snapshot.version)
+
+# Seconds between checks of the cross-worker channel set up by serve.py
+SHARED_STATE_POLL_INTERVAL = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "0.5"))
+
+# Channel generations this worker has already acted on
+_seen_generations: Dict[int, int] = {}
+
+def publish_invalidation(slot: int) -> None:
+    """Announce a local rule reload or cache clear to the other workers."""
+    generation = shared_state.publish(slot)
+    if generation is not None:
+        _seen_generations[slot] = generation
+
+async def watch_shared_state(channel: shared_state.SharedGenerations):
+    """Repeat rule reloads and cache clears published by other workers."""
+    for slot in (shared_state.RULES, shared_state.REPLY_CACHE):
+        _seen_generations[slot] = channel.get(slot)
+    while True:
+        await asyncio.sleep(SHARED_STATE_POLL_INTERVAL)
+        generation = channel.get(shared_state.RULES)
+        if generation != _seen_generations[shared_state.RULES]:
+            _seen_generations[shared_state.RULES] = generation
+            try:
+                await asyncio.to_thread(rule_store.reload, True)
+                logger.info("Loaded rules version %s after a reload in another worker", rule_store.snapshot.version)
+            except Exception:
+                logger.exception("Failed to reload rules from %s; keeping version %s", rule_store.path, rule_store.snapshot.version)
+        generation = channel.get(shared_state.REPLY_CACHE)
+        if generation != _seen_generations[shared_state.REPLY_CACHE]:
+            _seen_generations[shared_state.REPLY_CACHE] = generation
+            reply_cache.clear()
+
+async def warm_reply_cache(path: str) -> int:
+    """
+    Preload AI fallback replies for popular queries.
+    
+    Reads one query per line (blank lines and "#" comments are skipped) and
+    runs each rule miss through the AI fallback, which fills the in-memory
+    cache from the disk cache or, failing that, from the LLM.
+    
+    Returns:
+        Number of queries warmed
+    """
+    with open(path, "r", encoding="utf-8") as queries_file:
+        queries = [line.strip() for line in queries_file if line.strip() and not line.startswith("#")]
+    
+    warmed = 0
+    for query in queries:
+        request = AIRequest(message=query, sessionData=SessionData())
+        if get_rule_based_recommendations(query, {})["reply"]:
+            continue
+        try:
+            await get_ai_fallback(request)
+            warmed += 1
+        except Exception:
+            logger.exception("Failed to warm reply cache for %r", query)
+    return warmed
+
+# Print import and warm-up timings once the worker is ready
+STARTUP_TIMING = os.getenv("STARTUP_TIMING", "0") not in ("0", "false", "False")
+
+# Seconds spent in each startup phase, reported by /api/ready
+startup_timings: Dict[str, float] = {}
+
+def warm_up() -> None:
+    """
+    Build what the first requests would otherwise build: the rule snapshot
+    (matcher, fuzzy index and scoring matrix), the club catalog indexes and
+    the normalization and scoring code paths. Runs once; serve.py calls it
+    before forking so every worker starts warm.
+    """
+    if "warm_up" in startup_timings:
+        return
+    started = time.perf_counter()
+    rule_store.warm_up()
+    startup_timings["rules"] = time.perf_counter() - started
+    
+    phase_started = time.perf_counter()
+    get_club_catalog()
+    startup_timings["catalog"] = time.perf_counter() - phase_started
+    
+    phase_started = time.perf_counter()
+    evaluate_message("warming up the coding club matcher", {"interests": ["music"]})
+    prompts.count_tokens(prompts.build_session_context(10, ["music"], [], [], []))
+    startup_timings["prime"] = time.perf_counter() - phase_started
+    startup_timings["warm_up"] = time.perf_counter() - started
+
+async def run_warm_up(app: FastAPI) -> None:
+    """Warm up off the event loop, then report the worker ready."""
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception:
+        logger.exception("Startup warm-up failed; structures will be built on first use")
+    app.state.ready = True
+    if STARTUP_TIMING:
+        phases = ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in startup_timings.items())
+        print(f"[{os.getpid()}] Ready: {phases}", file=sys.stderr, flush=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background and close the LLM connection pool on shutdown."""
+    # The LLM client (and the openai SDK) are created on the first AI request
+    app.state.llm = None
+    app.state.ready = False
+    warmer = asyncio.create_task(run_warm_up(app))
+    rules_watcher = asyncio.create_task(watch_rules_file()) if rule_store.path else None
+    channel = shared_state.channel
+    state_watcher = asyncio.create_task(watch_shared_state(channel)) if channel is not None else None
+    warm_file = os.getenv("REPLY_CACHE_WARM_FILE")
+    cache_warmer = asyncio.create_task(warm_reply_cache(warm_file)) if warm_file else None
+    yield
+    for task in (warmer, rules_watcher, state_watcher, cache_warmer):
+        if task is not None:
+            task.cancel()
+    if app.state.llm is not None:
+        await app.state.llm.aclose()
+    if disk_cache is not None:
+        disk_cache.close()
+    session_store.close()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Forsyth County Club AI Backend",
     description="AI-powered club recommendation service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -27,8 +190,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Compress large, complete responses for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in per-request profiling, by header or 1-in-N sampling
+if profiling.PROFILING_ENABLED or profiling.PROFILE_SAMPLE_EVERY:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Outermost, so it times the whole request including CORS handling
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+def get_llm_client() -> LLMClient:
+    """Return the shared LLM client created at startup."""
+    llm = getattr(app.state, "llm", None)
+    if llm is None:
+        # Created on first use, so workers that only serve rule matches never import the SDK
+        llm = app.state.llm = create_llm_client()
+    return llm
+
+# Cache of AI fallback replies, shared by every request on this worker
+reply_cache = create_reply_cache()
+
+# Optional persistent cache shared by every worker on this host
+disk_cache = create_disk_reply_cache()
+
+# Server-side conversation sessions, referenced by sessionId
+session_store = create_session_store()
+
 
 # Pydantic models
 class SessionData(BaseModel):
@@ -38,46 +227,449 @@ class SessionData(BaseModel):
     clubs_viewed: List[str] = []
     query_history: List[str] = []
 
+class SessionDelta(BaseModel):
+    grade: Optional[int] = None
+    interests: Optional[List[str]] = None  # Replaces the stored list
+    add_interests: List[str] = []
+    experience_types: Optional[List[str]] = None  # Replaces the stored list
+    add_clubs_viewed: List[str] = []
+
 class AIRequest(BaseModel):
     message: str
-    sessionData: SessionData
+    # Inline session, sent in full on every turn; ignored for known sessionIds
+    sessionData: SessionData = SessionData()
+    # Server-side session plus the changes since the last turn
+    sessionId: Optional[str] = None
+    sessionDelta: Optional[SessionDelta] = None
+    
+    # Set by resolve_session
+    _session: Optional[SessionRecord] = PrivateAttr(default=None)
 
 class AIResponse(BaseModel):
     reply: str
+    source: Optional[str] = None  # "ai", or "rules-degraded" when the AI fallback was shed
+    sessionId: Optional[str] = None
 
 class ErrorResponse(BaseModel):
     error: str
 
 class HybridRecommendationResponse(BaseModel):
-    source: str  # "rules" or "ai"
+    source: str  # "rules", "ai" or "rules-degraded"
     reply: str
     confidence: Optional[str] = None
     matched_patterns: Optional[List[str]] = None
+    sessionId: Optional[str] = None
+
+class BatchRecommendationItem(BaseModel):
+    source: str  # "rules", "ai", "rules-degraded" or "error"
+    reply: Optional[str] = None
+    confidence: Optional[str] = None
+    matched_patterns: Optional[List[str]] = None
+    error: Optional[str] = None
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[BatchRecommendationItem]
+
+# Batch limits for /api/recommend/batch
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_AI_CONCURRENCY = int(os.getenv("BATCH_AI_CONCURRENCY", "8"))
+
+def build_session_context(session: SessionData) -> str:
+    """Render the session data as a short, token-budgeted context string."""
+    return prompts.build_session_context(
+        session.grade,
+        session.interests,
+        session.experience_types,
+        session.clubs_viewed,
+        session.query_history
+    )
+
+async def run_session_call(fn, *args, **kwargs):
+    """Call a session store method, in a thread when the store does SQLite I/O."""
+    if not session_store.persistent:
+        return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+def seed_changes(seed: SessionData) -> Dict:
+    """Session store changes that start a session from inline SessionData."""
+    return {
+        "grade": seed.grade,
+        "interests": seed.interests,
+        "experience_types": seed.experience_types,
+        "add_clubs_viewed": seed.clubs_viewed,
+        "add_queries": seed.query_history,
+    }
+
+async def resolve_session(request: AIRequest) -> Optional[SessionRecord]:
+    """
+    Bring the request's server-side session up to date for this turn.
+    
+    Requests without a sessionId keep using their inline sessionData. An
+    unknown or expired sessionId starts a new session, seeded from the inline
+    sessionData; the response carries the id to use from then on. The delta
+    is applied and the message appended to the query history in one write,
+    so this runs once per request; later calls return the same record.
+    
+    Returns:
+        The session as of this turn (history without this message), or None
+    """
+    if request.sessionId is None or request._session is not None:
+        return request._session
+    with metrics.stage("session"):
+        changes = request.sessionDelta.model_dump(exclude_defaults=True) if request.sessionDelta else {}
+        request._session = await run_session_call(
+            session_store.begin_turn,
+            request.sessionId,
+            request.message,
+            changes,
+            seed_changes(request.sessionData),
+        )
+    return request._session
+
+def session_data(request: AIRequest) -> Dict:
+    """The request's session as a SessionData dict, from the store when it has a sessionId."""
+    if request._session is not None:
+        return request._session.as_session_data()
+    return request.sessionData.model_dump()
+
+def session_context(request: AIRequest) -> str:
+    """Context string for the request's session; pre-rendered for server-side sessions."""
+    if request._session is not None:
+        return request._session.context
+    return build_session_context(request.sessionData)
+
+def session_id(request: AIRequest) -> Optional[str]:
+    return request._session.session_id if request._session is not None else None
+
+def build_ai_system_message(request: AIRequest) -> str:
+    """System prompt for the /api/ai endpoint."""
+    return prompts.build_system_message(session_context(request))
+
+def build_hybrid_system_message(request: AIRequest) -> str:
+    """System prompt for the AI fallback of /api/recommend."""
+    return prompts.build_system_message(session_context(request), hybrid=True)
+
+def build_reply_cache_key(request: AIRequest):
+    """Cache key for AI fallback replies to this request."""
+    session = session_data(request)
+    return make_cache_key(
+        request.message,
+        session["grade"],
+        session["interests"],
+        session["experience_types"]
+    )
+
+async def lookup_disk_reply(cache_key, system_message: str, message: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look a reply up in the on-disk cache, keyed on the full prompt.
+    
+    A hit is copied into the memory cache under cache_key.
+    
+    Returns:
+        (disk_key, reply): disk_key is None without a disk cache, reply is None on a miss
+    """
+    if disk_cache is None:
+        return None, None
+    disk_key = prompt_hash(
+        os.getenv("OPENAI_MODEL", DEFAULT_MODEL),
+        system_message,
+        normalize_message(message)
+    )
+    with metrics.stage("disk_cache"):
+        disk_reply = await asyncio.to_thread(disk_cache.get, disk_key)
+    if disk_reply is not None:
+        metrics.AI_FALLBACKS.inc(1, "disk_cache")
+        reply_cache.set(cache_key, disk_reply)
+    return disk_key, disk_reply
+
+async def store_ai_reply(cache_key, disk_key: Optional[str], reply: str) -> None:
+    """Keep a fresh LLM reply in the memory cache and, when configured, on disk."""
+    reply_cache.set(cache_key, reply)
+    if disk_key is not None:
+        await asyncio.to_thread(disk_cache.set, disk_key, reply)
+
+async def get_ai_fallback(request: AIRequest) -> Dict:
+    """
+    AI fallback for /api/recommend, served from the memory or disk reply cache when possible.
+    
+    When the AI path is overloaded the best rule-based reply is returned
+    instead, marked with source "rules-degraded".
+    """
+    with metrics.stage("reply_cache"):
+        cache_key = build_reply_cache_key(request)
+        cached_reply, hit = reply_cache.lookup(cache_key)
+    if cached_reply is not None:
+        metrics.AI_FALLBACKS.inc(1, "memory_cache" if hit == "exact" else "memory_cache_near")
+        return {"source": "ai", "reply": cached_reply, "confidence": "medium", "matched_patterns": None}
+    
+    with metrics.stage("prompt"):
+        system_message = build_hybrid_system_message(request)
+    
+    # Then the on-disk cache, keyed on the full prompt
+    disk_key, disk_reply = await lookup_disk_reply(cache_key, system_message, request.message)
+    if disk_reply is not None:
+        return {"source": "ai", "reply": disk_reply, "confidence": "medium", "matched_patterns": None}
+    
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, 
+            detail="No rule-based match found and OpenAI API key not configured"
+        )
+    
+    # Call the LLM without blocking the event loop
+    try:
+        ai_reply = await get_llm_client().complete(system_message, request.message)
+    except AdmissionRejected:
+        metrics.AI_FALLBACKS.inc(1, "degraded")
+        return get_degraded_recommendation(request.message, session_data(request))
+    metrics.AI_FALLBACKS.inc(1, "llm")
+    await store_ai_reply(cache_key, disk_key, ai_reply)
+    return {"source": "ai", "reply": ai_reply, "confidence": "medium", "matched_patterns": None}
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def complete_reply_events(meta: Dict, reply: str) -> AsyncIterator[str]:
+    """SSE events for a reply that is already complete (rule match or cache hit)."""
+    yield format_sse("meta", meta)
+    yield format_sse("token", {"text": reply})
+    yield format_sse("done", {"reply": reply})
+
+async def llm_reply_events(
+    meta: Dict,
+    system_message: str,
+    message: str,
+    on_rejected: Callable[[], Dict],
+    on_complete: Optional[Callable[[str], Awaitable[None]]] = None
+) -> AsyncIterator[str]:
+    """
+    SSE events that relay LLM tokens as they arrive.
+    
+    If the AI path sheds the call, a second "meta" event announces the
+    degraded recommendation from on_rejected, which is sent complete.
+    """
+    yield format_sse("meta", meta)
+    parts = []
+    try:
+        async for delta in get_llm_client().stream(system_message, message):
+            parts.append(delta)
+            yield format_sse("token", {"text": delta})
+    except AdmissionRejected:
+        degraded = on_rejected()
+        reply = degraded.pop("reply")
+        async for event in complete_reply_events(degraded, reply):
+            yield event
+        return
+    except openai_error_types() as e:
+        yield format_sse("error", {"error": f"OpenAI API error: {str(e)}"})
+        return
+    except Exception as e:
+        yield format_sse("error", {"error": f"Internal server error: {str(e)}"})
+        return
+    reply = "".join(parts).strip()
+    if on_complete:
+        await on_complete(reply)
+    yield format_sse("done", {"reply": reply})
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an SSE event iterator in an unbuffered streaming response."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Health check endpoint
 @app.get("/api/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    return {
+    return cached_json(request, {
         "status": "healthy",
         "aiConfigured": bool(os.getenv("OPENAI_API_KEY")),
+        "ready": getattr(app.state, "ready", False),
+        "rulesVersion": rule_store.snapshot.version,
+        "replyCache": reply_cache.stats(),
+        "diskCache": disk_cache.stats() if disk_cache is not None else None,
+        "sessions": session_store.stats(),
+        "catalog": {"clubs": len(get_club_catalog()), "version": get_club_catalog().version},
+        "llm": app.state.llm.stats() if getattr(app.state, "llm", None) else None,
         "service": "Forsyth County Club AI Backend"
-    }
+    })
+
+# Readiness endpoint, for load balancers and autoscalers
+@app.get("/api/ready")
+async def readiness_check():
+    """Report ready (200) once startup warm-up has finished, 503 before"""
+    if not getattr(app.state, "ready", False):
+        return FastJSONResponse({"ready": False}, status_code=503)
+    return {"ready": True, "startup": {phase: round(seconds, 4) for phase, seconds in startup_timings.items()}}
+
+def collect_runtime_gauges():
+    """Current cache, queue, breaker and rule-table state for /api/metrics."""
+    yield ("club_backend_rules_version", "Version of the rule snapshot in use", rule_store.snapshot.version, {})
+    for key, value in reply_cache.stats().items():
+        yield ("club_backend_reply_cache", "In-memory AI reply cache statistics", value, {"stat": key})
+    if disk_cache is not None:
+        for key, value in disk_cache.stats().items():
+            if key != "path":
+                yield ("club_backend_disk_cache", "On-disk AI reply cache statistics", value, {"stat": key})
+    yield ("club_backend_catalog_clubs", "Clubs in the loaded catalog", len(get_club_catalog()), {})
+    for key, value in session_store.stats().items():
+        yield ("club_backend_sessions", "Server-side session store statistics", value, {"stat": key})
+    llm = getattr(app.state, "llm", None)
+    if llm is None:
+        return
+    llm_stats = llm.stats()
+    yield ("club_backend_llm_in_flight", "Distinct LLM completions in flight", llm_stats["inFlight"], {})
+    yield ("club_backend_llm_coalesced", "Requests that shared an in-flight completion", llm_stats["coalesced"], {})
+    if llm_stats["admission"]:
+        for key, value in llm_stats["admission"].items():
+            yield ("club_backend_admission", "AI fallback admission queue statistics", value, {"stat": key})
+    if llm_stats["resilience"]:
+        breaker = llm_stats["resilience"]["breaker"]
+        for state in ("closed", "open", "half_open"):
+            yield ("club_backend_breaker_state", "Circuit breaker state (1 for the current state)", int(breaker["state"] == state), {"state": state})
+        yield ("club_backend_breaker_trips", "Times the circuit breaker opened", breaker["trips"], {})
+        yield ("club_backend_llm_hedges", "Hedged second attempts launched", llm_stats["resilience"]["hedges"], {})
+
+metrics.registry.register_collector(collect_runtime_gauges)
+
+# Metrics endpoint
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics for this worker in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Club catalog endpoint
+@app.get("/api/clubs")
+async def get_clubs(
+    request: Request,
+    school: Optional[str] = None,
+    category: Optional[str] = None,
+    day: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    """
+    Query the club catalog.
+    
+    Filters combine (school, category and meeting day match exactly; q is a
+    keyword search). Results are sorted by relevance, name or school and
+    paged: pass the returned nextCursor to get the next page.
+    """
+    club_catalog = get_club_catalog()
+    etag = make_etag("clubs", club_catalog.version, school, category, day, q, sort, limit, cursor)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    try:
+        page = club_catalog.query(school=school, category=category, day=day, q=q, sort=sort, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cached_json(request, page, etag)
 
-# Rules endpoint (placeholder)
+# Rules endpoint
 @app.get("/api/rules")
-async def get_rules():
-    """Get club rules and guidelines (placeholder)"""
+async def get_rules(request: Request, school: Optional[str] = None, limit: int = 5):
+    """Get the rule categories with their keywords and the catalog clubs each one points to"""
+    snapshot = rule_store.snapshot
+    club_catalog = get_club_catalog()
+    etag = make_etag("rules", snapshot.fingerprint, club_catalog.version, school, limit)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    rules = []
+    for club_type, rule_data in snapshot.rule_mappings.items():
+        matches = club_catalog.query(school=school, q=" ".join(rule_data["keywords"]), limit=limit)
+        rules.append({
+            "club": club_type,
+            "keywords": list(rule_data["keywords"]),
+            "clubs": [
+                {"id": club.get("id"), "name": club.get("name"), "school": club["school"], "category": club.get("category")}
+                for club in matches["clubs"]
+            ],
+            "totalClubs": matches["total"]
+        })
+    return cached_json(request, {
+        "version": snapshot.version,
+        "fingerprint": snapshot.fingerprint,
+        "catalogVersion": club_catalog.version,
+        "rules": rules
+    }, etag)
+
+# Admin endpoint to reload rules without restarting workers
+def check_admin_token(x_admin_token: Optional[str]) -> None:
+    """Reject admin calls without the right X-Admin-Token; admin endpoints are closed while ADMIN_TOKEN is unset."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not configured")
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), admin_token.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/api/admin/rules/reload")
+async def reload_rules(x_admin_token: Optional[str] = Header(default=None)):
+    """Reload RULES_FILE now and swap in the new rule snapshot in every worker"""
+    check_admin_token(x_admin_token)
+    if not rule_store.path:
+        raise HTTPException(status_code=400, detail="RULES_FILE is not configured")
+    
+    try:
+        reloaded = await asyncio.to_thread(rule_store.reload, True)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to load rules: {str(e)}"
+        )
+    publish_invalidation(shared_state.RULES)
+    
     return {
-        "message": "Rules endpoint - to be implemented",
-        "rules": []
+        "reloaded": reloaded,
+        "version": rule_store.snapshot.version,
+        "rules": len(rule_store.snapshot.rule_mappings)
     }
 
+@app.post("/api/admin/cache/clear")
+async def clear_reply_caches(x_admin_token: Optional[str] = Header(default=None)):
+    """Drop cached AI replies in every worker and on disk"""
+    check_admin_token(x_admin_token)
+    reply_cache.clear()
+    if disk_cache is not None:
+        await asyncio.to_thread(disk_cache.clear)
+    publish_invalidation(shared_state.REPLY_CACHE)
+    return {"cleared": True}
+
+# Server-side session endpoints
+@app.post("/api/sessions")
+async def create_session(seed: Optional[SessionData] = None):
+    """Start a server-side session, optionally seeded with existing session data"""
+    record = await run_session_call(session_store.create, **(seed_changes(seed) if seed is not None else {}))
+    return {"sessionId": record.session_id, "sessionData": record.as_session_data()}
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Get the current data of a server-side session"""
+    record = await run_session_call(session_store.get, session_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"sessionId": record.session_id, "sessionData": record.as_session_data()}
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a server-side session"""
+    await run_session_call(session_store.delete, session_id)
+    return {"deleted": True}
+
 # Main AI endpoint
 @app.post("/api/ai", response_model=AIResponse)
+@metrics.endpoint
 async def get_ai_response(request: AIRequest):
     """Get AI-powered club recommendations and responses"""
     try:
+        await resolve_session(request)
+        
         # Check if OpenAI API key is configured
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(
@@ -85,56 +677,17 @@ async def get_ai_response(request: AIRequest):
                 detail="OpenAI API key not configured"
             )
         
-        # Prepare system context with session data
-        session_context = ""
-        if request.sessionData.grade:
-            session_context += f"User is in grade {request.sessionData.grade}. "
-        if request.sessionData.interests:
-            session_context += f"User interests: {', '.join(request.sessionData.interests)}. "
-        if request.sessionData.experience_types:
-            session_context += f"Experience types: {', '.join(request.sessionData.experience_types)}. "
-        if request.sessionData.clubs_viewed:
-            session_context += f"Previously viewed clubs: {', '.join(request.sessionData.clubs_viewed)}. "
-        if request.sessionData.query_history:
-            session_context += f"Previous queries: {'; '.join(request.sessionData.query_history[-3:])}. "
-        
-        # Create system message
-        system_message = f"""You are a helpful Smart Club Recommender for the Forsyth County Club Website. 
-        Your role is to help students discover clubs that match their interests and personality.
-        
-        Context about the user: {session_context}
-        
-        Guidelines:
-        - Be friendly, encouraging, and helpful
-        - Focus on club recommendations and discovery
-        - Ask clarifying questions when needed
-        - Provide specific club suggestions when possible
-        - Keep responses concise but informative
-        - Use emojis appropriately to make responses engaging
-        - If the user asks about specific clubs, provide detailed information
-        - If the user is unsure, guide them through the discovery process
-        - Never mention "AI" or "artificial intelligence" - you are a Smart Club Recommender
-        - Present yourself as an intelligent recommendation system, not an AI
-        
-        Respond naturally to their message: "{request.message}" """
-        
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": request.message}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+        system_message = build_ai_system_message(request)
         
-        # Extract the AI response
-        ai_reply = response.choices[0].message.content.strip()
+        # Call the LLM without blocking the event loop
+        ai_reply = await get_llm_client().complete(system_message, request.message)
         
-        return AIResponse(reply=ai_reply)
+        return AIResponse(reply=ai_reply, source="ai", sessionId=session_id(request))
         
-    except openai.error.OpenAIError as e:
+    except AdmissionRejected:
+        degraded = get_degraded_recommendation(request.message, session_data(request))
+        return AIResponse(reply=degraded["reply"], source=degraded["source"], sessionId=session_id(request))
+    except openai_error_types() as e:
         raise HTTPException(
             status_code=500,
             detail=f"OpenAI API error: {str(e)}"
@@ -145,62 +698,90 @@ async def get_ai_response(request: AIRequest):
             detail=f"Internal server error: {str(e)}"
         )
 
+# Streaming variant of the main AI endpoint
+@app.post("/api/ai/stream")
+@metrics.endpoint
+async def stream_ai_response(request: AIRequest):
+    """Stream AI-powered responses as Server-Sent Events (meta, token..., done or error)"""
+    await resolve_session(request)
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, 
+            detail="OpenAI API key not configured"
+        )
+    
+    return sse_response(llm_reply_events(
+        {"source": "ai", "sessionId": session_id(request)},
+        build_ai_system_message(request),
+        request.message,
+        on_rejected=lambda: get_degraded_recommendation(request.message, session_data(request))
+    ))
+
 # Legacy endpoint for compatibility with existing frontend
 @app.post("/api/ai-recommendations")
+@metrics.endpoint
 async def get_ai_recommendations(request: dict):
     """Legacy endpoint for AI recommendations (for compatibility)"""
+    recommendations = []
     try:
         # Extract user query from the request
         user_query = request.get("userAnswers", {}).get("query", "")
         selected_school = request.get("selectedSchool")
         conversation_context = request.get("conversationContext", {})
         
-        # Create session data from conversation context
-        session_data = SessionData(
-            grade=conversation_context.get("grade"),
-            interests=conversation_context.get("interests", []),
-            experience_types=conversation_context.get("experience_types", []),
-            clubs_viewed=conversation_context.get("clubs_viewed", []),
-            query_history=conversation_context.get("query_history", [])
-        )
-        
-        # Create AI request
+        # Create AI request, with session data from the conversation context or the server-side session
         ai_request = AIRequest(
             message=user_query,
-            sessionData=session_data
+            sessionData=SessionData(
+                grade=conversation_context.get("grade"),
+                interests=conversation_context.get("interests", []),
+                experience_types=conversation_context.get("experience_types", []),
+                clubs_viewed=conversation_context.get("clubs_viewed", []),
+                query_history=conversation_context.get("query_history", [])
+            ),
+            sessionId=request.get("sessionId"),
+            sessionDelta=request.get("sessionDelta")
         )
+        await resolve_session(ai_request)
+        
+        # Rank clubs from the rule keywords, boosted by the user's interests
+        recommendations = rank_clubs(user_query, session_data(ai_request))
         
         # Get AI response
         ai_response = await get_ai_response(ai_request)
         
         # Return in the expected format for the frontend
         return {
-            "recommendations": [],  # AI will provide text-based recommendations
+            "recommendations": recommendations,
             "aiResponse": ai_response.reply,
+            "sessionId": ai_response.sessionId,
             "status": "success"
         }
         
     except Exception as e:
         return {
-            "recommendations": [],
+            "recommendations": recommendations,
             "error": str(e),
             "status": "error"
         }
 
 # Hybrid recommendation endpoint
 @app.post("/api/recommend", response_model=HybridRecommendationResponse)
+@metrics.endpoint
 async def get_hybrid_recommendation(request: AIRequest):
     """
     Get hybrid club recommendations using rule-based matching first, then AI fallback.
     
     This endpoint:
     1. First tries rule-based pattern matching
-    2. If no clear match, falls back to AI-powered recommendations
-    3. Returns the source of the recommendation (rules or ai)
+    2. If no clear match, serves a cached AI reply or falls back to AI-powered recommendations
+    3. Returns the source of the recommendation (rules, ai, or rules-degraded when the AI path is overloaded)
     """
     try:
+        await resolve_session(request)
+        
         # Step 1: Try rule-based matching first
-        rule_result = get_rule_based_recommendations(request.message, request.sessionData.dict())
+        rule_result = get_rule_based_recommendations(request.message, session_data(request))
         
         if rule_result["reply"]:
             # Rule-based match found
@@ -208,73 +789,14 @@ async def get_hybrid_recommendation(request: AIRequest):
                 source="rules",
                 reply=rule_result["reply"],
                 confidence=rule_result["confidence"],
-                matched_patterns=rule_result["matched_patterns"]
-            )
-        
-        # Step 2: No rule match found, fall back to AI
-        if not os.getenv("OPENAI_API_KEY"):
-            raise HTTPException(
-                status_code=500, 
-                detail="No rule-based match found and OpenAI API key not configured"
+                matched_patterns=rule_result["matched_patterns"],
+                sessionId=session_id(request)
             )
         
-        # Prepare system context with session data
-        session_context = ""
-        if request.sessionData.grade:
-            session_context += f"User is in grade {request.sessionData.grade}. "
-        if request.sessionData.interests:
-            session_context += f"User interests: {', '.join(request.sessionData.interests)}. "
-        if request.sessionData.experience_types:
-            session_context += f"Experience types: {', '.join(request.sessionData.experience_types)}. "
-        if request.sessionData.clubs_viewed:
-            session_context += f"Previously viewed clubs: {', '.join(request.sessionData.clubs_viewed)}. "
-        if request.sessionData.query_history:
-            session_context += f"Previous queries: {'; '.join(request.sessionData.query_history[-3:])}. "
-        
-        # Create system message for smart recommendations
-        system_message = f"""You are a helpful Smart Club Recommender for the Forsyth County Club Website. 
-        Your role is to help students discover clubs that match their interests and personality.
-        
-        Context about the user: {session_context}
-        
-        Guidelines:
-        - Be friendly, encouraging, and helpful
-        - Focus on club recommendations and discovery
-        - Ask clarifying questions when needed
-        - Provide specific club suggestions when possible
-        - Keep responses concise but informative
-        - Use emojis appropriately to make responses engaging
-        - If the user asks about specific clubs, provide detailed information
-        - If the user is unsure, guide them through the discovery process
-        - Never mention "AI" or "artificial intelligence" - you are a Smart Club Recommender
-        - Present yourself as an intelligent recommendation system, not an AI
-        - Provide personalized recommendations based on the user's context
-        
-        Note: Rule-based matching didn't find a clear match, so provide smart personalized recommendations.
-        
-        Respond naturally to their message: "{request.message}" """
-        
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": request.message}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        # Extract the AI response
-        ai_reply = response.choices[0].message.content.strip()
-        
-        return HybridRecommendationResponse(
-            source="ai",
-            reply=ai_reply,
-            confidence="medium"
-        )
+        # Step 2: No rule match found, fall back to a cached or fresh AI reply
+        return HybridRecommendationResponse(**await get_ai_fallback(request), sessionId=session_id(request))
         
-    except openai.error.OpenAIError as e:
+    except openai_error_types() as e:
         raise HTTPException(
             status_code=500,
             detail=f"OpenAI API error: {str(e)}"
@@ -285,6 +807,115 @@ async def get_hybrid_recommendation(request: AIRequest):
             detail=f"Internal server error: {str(e)}"
         )
 
+# Batch variant of the hybrid recommendation endpoint
+@app.post("/api/recommend/batch", response_model=BatchRecommendationResponse)
+@metrics.endpoint
+async def get_batch_recommendations(requests: List[AIRequest]):
+    """
+    Get hybrid recommendations for many messages in one call.
+    
+    The rule engine matches each message and scores the whole batch in one
+    vectorized pass; only rule misses go to the AI fallback, with at most BATCH_AI_CONCURRENCY calls in
+    flight. Results come back in input order, each with its source. Items
+    are independent messages, so only their inline sessionData is used.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(requests)} items (max {MAX_BATCH_SIZE})"
+        )
+    
+    rule_results = get_batch_rule_based_recommendations(
+        [request.message for request in requests],
+        [session_data(request) for request in requests]
+    )
+    results: List[Optional[BatchRecommendationItem]] = [None] * len(requests)
+    semaphore = asyncio.Semaphore(BATCH_AI_CONCURRENCY)
+    
+    async def fall_back(index: int) -> None:
+        async with semaphore:
+            try:
+                results[index] = BatchRecommendationItem(**await get_ai_fallback(requests[index]))
+            except HTTPException as e:
+                results[index] = BatchRecommendationItem(source="error", error=e.detail)
+            except openai_error_types() as e:
+                results[index] = BatchRecommendationItem(source="error", error=f"OpenAI API error: {str(e)}")
+            except Exception as e:
+                results[index] = BatchRecommendationItem(source="error", error=f"Internal server error: {str(e)}")
+    
+    misses = []
+    for index, rule_result in enumerate(rule_results):
+        if rule_result["reply"]:
+            results[index] = BatchRecommendationItem(
+                source="rules",
+                reply=rule_result["reply"],
+                confidence=rule_result["confidence"],
+                matched_patterns=rule_result["matched_patterns"]
+            )
+        else:
+            misses.append(fall_back(index))
+    await asyncio.gather(*misses)
+    
+    return BatchRecommendationResponse(results=results)
+
+# Streaming variant of the hybrid recommendation endpoint
+@app.post("/api/recommend/stream")
+@metrics.endpoint
+async def stream_hybrid_recommendation(request: AIRequest):
+    """
+    Stream hybrid club recommendations as Server-Sent Events.
+    
+    The first "meta" event carries source, confidence and matched_patterns.
+    Rule matches and replies from the memory or disk cache arrive complete in
+    a single "token" event; AI fallbacks relay tokens as the model produces
+    them and are cached once complete; if the AI path is overloaded a second
+    "meta" event switches to a rules-degraded reply. The stream ends with
+    "done" (full reply) or "error".
+    """
+    await resolve_session(request)
+    rule_result = get_rule_based_recommendations(request.message, session_data(request))
+    
+    if rule_result["reply"]:
+        return sse_response(complete_reply_events(
+            {
+                "source": "rules",
+                "confidence": rule_result["confidence"],
+                "matched_patterns": rule_result["matched_patterns"],
+                "sessionId": session_id(request)
+            },
+            rule_result["reply"]
+        ))
+    
+    ai_meta = {"source": "ai", "confidence": "medium", "matched_patterns": None, "sessionId": session_id(request)}
+    cache_key = build_reply_cache_key(request)
+    cached_reply, hit = reply_cache.lookup(cache_key)
+    if cached_reply is not None:
+        metrics.AI_FALLBACKS.inc(1, "memory_cache" if hit == "exact" else "memory_cache_near")
+        return sse_response(complete_reply_events(ai_meta, cached_reply))
+    
+    system_message = build_hybrid_system_message(request)
+    disk_key, disk_reply = await lookup_disk_reply(cache_key, system_message, request.message)
+    if disk_reply is not None:
+        return sse_response(complete_reply_events(ai_meta, disk_reply))
+    
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, 
+            detail="No rule-based match found and OpenAI API key not configured"
+        )
+    
+    metrics.AI_FALLBACKS.inc(1, "llm_stream")
+    return sse_response(llm_reply_events(
+        ai_meta,
+        system_message,
+        request.message,
+        on_rejected=lambda: get_degraded_recommendation(request.message, session_data(request)),
+        on_complete=lambda reply: store_ai_reply(cache_key, disk_key, reply)
+    ))
+
+startup_timings["import"] = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
+    # Single-process development server; use serve.py for multi-worker production
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
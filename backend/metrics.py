@@ -0,0 +1,325 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+Counters and histograms are kept in plain dicts keyed by label values and
+rendered on demand by GET /api/metrics. Each worker process keeps its own
+series; with serve.py, scrape every worker (or aggregate with the usual
+sum() over instances).
+
+instrument() and stage() are the hooks used around the rule engine, prompt
+building, cache lookups and LLM calls. With METRICS_ENABLED=0, instrument()
+returns the function unchanged and stage() returns a shared no-op context,
+so disabled instrumentation costs next to nothing.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+# Seconds; covers sub-millisecond rule matches up to slow LLM round-trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A collector returns (name, help, value, labels) gauge samples at scrape time
+GaugeSample = Tuple[str, str, float, Dict[str, str]]
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labelvalues: str) -> None:
+        if not ENABLED:
+            return
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        if not ENABLED:
+            return
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+class Registry:
+    """Holds metrics and scrape-time gauge collectors, and renders them all."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[GaugeSample]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[GaugeSample]]) -> None:
+        """Add a function called at scrape time to report current gauge values."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        gauges: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, help_text, value, labels in collector():
+                if value is None:
+                    continue
+                samples = gauges.setdefault(name, (help_text, []))[1]
+                samples.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        for name, (help_text, samples) in gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "club_backend_stage_seconds",
+    "Time spent in each stage of request handling",
+    ("stage",)
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "club_backend_http_request_seconds",
+    "End-to-end HTTP request latency",
+    ("method", "route", "status")
+)
+RULE_EVALUATIONS = registry.counter(
+    "club_backend_rule_evaluations_total",
+    "Rule engine evaluations by outcome, top matched club and confidence",
+    ("result", "club", "confidence")
+)
+AI_FALLBACKS = registry.counter(
+    "club_backend_ai_fallback_total",
+    "Rule misses by where the reply came from",
+    ("source",)
+)
+LLM_CALLS = registry.counter(
+    "club_backend_llm_calls_total",
+    "Upstream LLM calls by mode and outcome",
+    ("mode", "outcome")
+)
+LLM_TOKENS = registry.counter(
+    "club_backend_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ("kind",)
+)
+
+# perf_counter() when the current HTTP request arrived, set by MetricsMiddleware
+_request_started: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_started", default=None)
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage)
+        return False
+
+_NOOP = contextlib.nullcontext()
+
+def stage(name: str):
+    """Context manager timing a block as the named stage."""
+    return _StageTimer(name) if ENABLED else _NOOP
+
+def instrument(stage_name: str, on_outcome: Optional[Callable[[object, Optional[BaseException]], None]] = None):
+    """
+    Decorator timing a sync or async function as a stage.
+
+    Args:
+        stage_name: Stage label for club_backend_stage_seconds
+        on_outcome: Called with (result, None) or (None, error) to record outcome metrics
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage_name)
+                    if on_outcome:
+                        on_outcome(None, e)
+                    raise
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage_name)
+                if on_outcome:
+                    on_outcome(result, None)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage_name)
+                if on_outcome:
+                    on_outcome(None, e)
+                raise
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage_name)
+            if on_outcome:
+                on_outcome(result, None)
+            return result
+        return wrapper
+    return decorate
+
+def endpoint(fn):
+    """
+    Decorator for async endpoints that records the "parse" stage: the time
+    from the request arriving to the handler being called, which covers body
+    reading and pydantic validation.
+    """
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = _request_started.get()
+        if started is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - started, "parse")
+            # Don't count again if this handler calls another decorated one
+            _request_started.set(None)
+        return await fn(*args, **kwargs)
+    return wrapper
+
+def record_rule_outcome(result: Optional[Dict], error: Optional[BaseException]) -> None:
+    """on_outcome hook for get_rule_based_recommendations."""
+    if result is None:
+        return
+    if result["reply"]:
+        club = result["matched_patterns"][0] if result["matched_patterns"] else "general"
+        RULE_EVALUATIONS.inc(1, "hit", club, result["confidence"] or "none")
+    else:
+        RULE_EVALUATIONS.inc(1, "miss", "none", "none")
+
+def record_rule_outcomes(results: Optional[List[Dict]], error: Optional[BaseException]) -> None:
+    """on_outcome hook for get_batch_rule_based_recommendations."""
+    for result in results or ():
+        record_rule_outcome(result, None)
+
+def record_llm_outcome(mode: str) -> Callable[[object, Optional[BaseException]], None]:
+    """Build an on_outcome hook counting LLM calls of the given mode."""
+    def record(result, error: Optional[BaseException]) -> None:
+        LLM_CALLS.inc(1, mode, llm_outcome(error))
+    return record
+
+def llm_outcome(error: Optional[BaseException]) -> str:
+    """Outcome label for an LLM call that ended with error (or None)."""
+    # Imported here to keep this module free of backend dependencies
+    from admission import AdmissionRejected
+    if error is None:
+        return "ok"
+    if isinstance(error, AdmissionRejected):
+        return "rejected"
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    return "error"
+
+def record_llm_usage(usage) -> None:
+    """Count prompt and completion tokens from an OpenAI usage object, if present."""
+    if not ENABLED or usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, "prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, "completion")
+
+class MetricsMiddleware:
+    """ASGI middleware recording end-to-end latency per route and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = _request_started.set(started)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_started.reset(token)
+            # Label by route template, not raw path, to bound cardinality
+            route = scope.get("route")
+            route_label = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route_label, str(status[0]))
@@ -0,0 +1,52 @@
+"""
+Message normalization shared by the rule engine and the reply caches.
+A message is lowercased, split into word tokens (punctuation dropped) and
+paired into bigrams once; every later stage works from that result. An LRU
+memo keeps results for recently seen messages, which repeat a lot.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Tuple
+
+# Distinct messages whose normalized form is memoized
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", "8192"))
+
+_WORD = re.compile(r"\w+")
+
+@dataclass(frozen=True)
+class NormalizedMessage:
+    """Lowercased, tokenized view of one message."""
+    text: str  # Tokens joined by single spaces
+    words: Tuple[str, ...]  # Tokens in order
+    offsets: Tuple[Tuple[int, int], ...]  # (start, end) of each token in the original message
+    token_set: FrozenSet[str]
+    bigram_set: FrozenSet[str]  # "word word" for each adjacent pair
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize(message: str) -> NormalizedMessage:
+    """Normalize a message, memoized on the raw text."""
+    matches = list(_WORD.finditer(message.lower()))
+    words = tuple(m.group() for m in matches)
+    return NormalizedMessage(
+        text=" ".join(words),
+        words=words,
+        offsets=tuple(m.span() for m in matches),
+        token_set=frozenset(words),
+        bigram_set=frozenset(f"{first} {second}" for first, second in zip(words, words[1:])),
+    )
+
+_STEM_SUFFIXES = ("ing", "ies", "es", "ed", "s")
+
+def stem(word: str) -> str:
+    """Strip one common suffix, so "clubs" and "volunteering" match "club" and "volunteer"."""
+    for suffix in _STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+def normalize_term(term: str) -> str:
+    """Normalize a keyword the same way, so "Web-Dev" matches "web dev"."""
+    return " ".join(_WORD.findall(term.lower()))
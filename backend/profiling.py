@@ -0,0 +1,140 @@
+"""
+Opt-in per-request sampling profiler.
+A request is profiled when PROFILING_ENABLED is set and it carries an
+X-Profile header matching ADMIN_TOKEN (the header is ignored while no token
+is configured), or when it is the Nth request with PROFILE_SAMPLE_EVERY=N.
+While it runs, a background thread samples the event loop thread's stack
+every few milliseconds; the samples are written as folded stacks
+("frame;frame;frame count" lines, as read by flamegraph.pl, speedscope and
+inferno) to PROFILE_DIR, named after the request id.
+
+The event loop interleaves requests, so a profile also shows whatever else
+the worker ran meanwhile; idle time appears as the loop's selector wait.
+Unprofiled requests cost one counter increment and a header lookup.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") not in ("0", "false", "False")
+
+# Profile one in N requests without a header; 0 disables sampling
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000
+
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_.-]")
+
+class StackSampler:
+    """Periodically samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        """
+        Args:
+            thread_id: threading.get_ident() of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and return folded stack -> sample count."""
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Folded stacks are root first
+            self.stacks[";".join(reversed(frames))] += 1
+
+def write_folded(stacks: Counter, path: str) -> None:
+    """Write samples in the folded-stack format."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as profile_file:
+        for stack, count in stacks.most_common():
+            profile_file.write(f"{stack} {count}\n")
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests; see the module docstring."""
+
+    def __init__(self, app, sample_every: int = PROFILE_SAMPLE_EVERY, header_enabled: bool = PROFILING_ENABLED, profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.sample_every = sample_every
+        self.header_enabled = header_enabled
+        self.profile_dir = profile_dir
+        self._requests = 0
+        # One profile at a time keeps the overhead bounded and the samples readable
+        self._active = False
+
+    def _wants_profile(self, headers: Dict[bytes, bytes]) -> bool:
+        self._requests += 1
+        if self._active:
+            return False
+        if self.header_enabled and b"x-profile" in headers:
+            admin_token = os.getenv("ADMIN_TOKEN")
+            return bool(admin_token) and hmac.compare_digest(headers[b"x-profile"], admin_token.encode("latin-1"))
+        return self.sample_every > 0 and self._requests % self.sample_every == 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not self._wants_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        request_id = _SAFE_ID.sub("_", request_id)[:64]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        self._active = True
+        sampler = StackSampler(threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stacks = sampler.stop()
+            self._active = False
+            elapsed = time.perf_counter() - started
+            path = os.path.join(self.profile_dir, f"{request_id}.folded")
+            try:
+                await asyncio.to_thread(write_folded, stacks, path)
+                logger.info("Profiled %s %s in %.1f ms (%d samples) -> %s", scope["method"], scope["path"], elapsed * 1000, sum(stacks.values()), path)
+            except OSError:
+                logger.exception("Failed to write profile %s", path)
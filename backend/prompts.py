@@ -0,0 +1,132 @@
+"""
+System prompt construction for the AI fallback.
+The static guidelines come first and are byte-identical on every request, so
+provider-side prompt caching can reuse them. Per-user context is appended
+last and trimmed to a token budget. The user's message is sent only as the
+user turn, never repeated in the system prompt.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to an estimate when tiktoken isn't installed
+    tiktoken = None
+
+# Shared, cacheable prefix for every AI call
+SYSTEM_PREFIX = """You are a helpful Smart Club Recommender for the Forsyth County Club Website.
+Your role is to help students discover clubs that match their interests and personality.
+
+Guidelines:
+- Be friendly, encouraging, and helpful
+- Focus on club recommendations and discovery
+- Ask clarifying questions when needed
+- Provide specific club suggestions when possible
+- Keep responses concise but informative
+- Use emojis appropriately to make responses engaging
+- If the user asks about specific clubs, provide detailed information
+- If the user is unsure, guide them through the discovery process
+- Never mention "AI" or "artificial intelligence" - you are a Smart Club Recommender
+- Present yourself as an intelligent recommendation system, not an AI
+"""
+
+# Extra instructions for the /api/recommend fallback, placed after the shared prefix
+HYBRID_SUFFIX = """- Provide personalized recommendations based on the user's context
+
+Note: Rule-based matching didn't find a clear match, so provide smart personalized recommendations.
+"""
+
+# Maximum tokens spent on per-user context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "200"))
+
+# Number of previous queries included in the context
+QUERY_HISTORY_LIMIT = 3
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("o200k_base") if tiktoken else None
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Token count for text, memoized since context fragments repeat across turns."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Rough estimate: a token per word or punctuation mark, at least one per 4 characters
+    return max(len(_WORD_PIECES.findall(text)), (len(text) + 3) // 4)
+
+def _fit_list(template: str, items: Sequence[str], separator: str, budget: int) -> Optional[str]:
+    """Render template with as many of the most recent items as fit in budget."""
+    items = list(items)
+    while items:
+        fragment = template.format(separator.join(items))
+        if count_tokens(fragment) <= budget:
+            return fragment
+        items.pop(0)
+    return None
+
+def build_session_context(
+    grade: Optional[int],
+    interests: Sequence[str],
+    experience_types: Sequence[str],
+    clubs_viewed: Sequence[str],
+    query_history: Sequence[str],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """
+    Render session data as context, most important facts first, within a token budget.
+
+    Args:
+        grade: Student's grade, if known
+        interests: Stated interests
+        experience_types: Preferred experience types
+        clubs_viewed: Clubs the student has looked at
+        query_history: Earlier messages in the conversation
+        budget: Maximum tokens for the whole context
+
+    Returns:
+        Context string (possibly empty)
+    """
+    fragments: List[str] = []
+    remaining = budget
+
+    def add(fragment: Optional[str]) -> None:
+        nonlocal remaining
+        if fragment and count_tokens(fragment) <= remaining:
+            fragments.append(fragment)
+            remaining -= count_tokens(fragment)
+
+    if grade:
+        add(f"User is in grade {grade}. ")
+    if interests:
+        add(_fit_list("User interests: {}. ", interests, ", ", remaining))
+    if experience_types:
+        add(_fit_list("Experience types: {}. ", experience_types, ", ", remaining))
+    if clubs_viewed:
+        add(_fit_list("Previously viewed clubs: {}. ", clubs_viewed, ", ", remaining))
+    if query_history:
+        add(_fit_list("Previous queries: {}. ", query_history[-QUERY_HISTORY_LIMIT:], "; ", remaining))
+    return "".join(fragments)
+
+def build_system_message(session_context: str, hybrid: bool = False) -> str:
+    """
+    Assemble the system prompt: static prefix, mode instructions, then user context.
+
+    Args:
+        session_context: Output of build_session_context
+        hybrid: Add the /api/recommend fallback instructions
+
+    Returns:
+        The system message
+    """
+    parts = [SYSTEM_PREFIX]
+    if hybrid:
+        parts.append(HYBRID_SUFFIX)
+    if session_context:
+        parts.append(f"\nContext about the user: {session_context.strip()}\n")
+    return "".join(parts)
@@ -0,0 +1,294 @@
+"""
+In-memory LRU + TTL cache for AI fallback replies.
+Students often send near-identical messages, so replies are keyed on the
+normalized message plus the session fields that change the prompt.
+
+Rewordings ("what club should i join?" / "which clubs should I join") are
+caught by an optional near-duplicate index: MinHash signatures of each
+message's content words, bucketed by LSH bands and scoped to the same
+session fields, so a lookup only compares against a handful of candidates.
+Similarity alone would happily swap topics ("a club about hiking" vs "...
+fishing" share most words), so two messages only match when every word
+one has and the other lacks is filler.
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from normalize import normalize, stem
+
+def normalize_message(message: str) -> str:
+    """Lowercased words without punctuation, shared with (and memoized for) the rule engine."""
+    return normalize(message).text
+
+def make_cache_key(
+    message: str,
+    grade: Optional[int] = None,
+    interests: Iterable[str] = (),
+    experience_types: Iterable[str] = (),
+) -> Tuple:
+    """
+    Build a cache key from the message and the session fields that shape the prompt.
+
+    Args:
+        message: User's input message
+        grade: Student's grade, if known
+        interests: Student's stated interests
+        experience_types: Student's preferred experience types
+
+    Returns:
+        Hashable cache key
+    """
+    return (
+        normalize_message(message),
+        grade,
+        tuple(sorted({interest.lower() for interest in interests})),
+        tuple(sorted({kind.lower() for kind in experience_types})),
+    )
+
+# Words that don't change what is being asked
+_STOP_WORDS = frozenset("""
+a about am an and any are can could do does for from get give good have help how i im in is it me my
+of on or please recommend should show some tell that the there these this to want what which who would you
+""".split())
+
+# Content words that don't change the topic; near matches may differ only in these
+_FILLER_WORDS = frozenset(stem(word) for word in """
+actually also really just very so pretty kinda maybe like love enjoy into interested interest
+club clubs join joining find looking look need suggest suggestion idea ideas option options
+good great best fun cool thing things stuff something anything kind sort school hi hey hello thanks thank
+be we us our your will with at as but if too much lot lots well one ones
+m s re ve ll d
+""".split())
+
+# Words that flip or narrow a question; two messages only match if these agree exactly
+_NEGATIONS = frozenset(("no", "not", "dont", "don", "t", "never", "without", "nor", "isnt", "cant", "won"))
+_HAS_DIGIT = re.compile(r"\d")
+
+def message_features(normalized: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Features compared between messages.
+
+    Returns:
+        (stemmed content words, guard words: negations and anything containing a digit)
+    """
+    words = normalized.split()
+    guards = frozenset(word for word in words if word in _NEGATIONS or _HAS_DIGIT.search(word))
+    content = frozenset(stem(word) for word in words if word not in _STOP_WORDS) | guards
+    return content, guards
+
+class NearDuplicateIndex:
+    """MinHash/LSH index from reply cache keys to similar earlier keys."""
+
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, threshold: float = 0.8, bands: int = 8, rows: int = 2, min_words: int = 2):
+        """
+        Args:
+            threshold: Minimum Jaccard similarity of content words for a match
+            bands: LSH bands; more bands find more candidates
+            rows: MinHash values per band; more rows find fewer, closer candidates
+            min_words: Messages with fewer content words are only matched exactly
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.min_words = min_words
+        # Fixed multiply-shift hash family, so signatures are stable across runs
+        self._permutations = [
+            (zlib.crc32(f"a{i}".encode()) << 32 | zlib.crc32(f"b{i}".encode()) | 1, zlib.crc32(f"c{i}".encode()))
+            for i in range(bands * rows)
+        ]
+        self._buckets: Dict[Tuple, Set[Tuple]] = {}
+        # key -> (content words, guard words, bucket ids)
+        self._entries: Dict[Tuple, Tuple[FrozenSet[str], FrozenSet[str], List[Tuple]]] = {}
+
+    def _bucket_ids(self, content: FrozenSet[str], scope: Tuple) -> List[Tuple]:
+        hashes = [zlib.crc32(word.encode()) for word in content]
+        signature = tuple(
+            min(((a * h + b) & self._MASK) >> 32 for h in hashes)
+            for a, b in self._permutations
+        )
+        return [
+            (scope, band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: Tuple) -> None:
+        """Index a cache key (normalized message, *session fields)."""
+        content, guards = message_features(key[0])
+        if len(content) < self.min_words or key in self._entries:
+            return
+        bucket_ids = self._bucket_ids(content, key[1:])
+        for bucket_id in bucket_ids:
+            self._buckets.setdefault(bucket_id, set()).add(key)
+        self._entries[key] = (content, guards, bucket_ids)
+
+    def remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for bucket_id in entry[2]:
+            bucket = self._buckets[bucket_id]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[bucket_id]
+
+    def find(self, key: Tuple) -> Optional[Tuple]:
+        """Return the most similar indexed key with the same session fields, or None."""
+        content, guards = message_features(key[0])
+        if len(content) < self.min_words:
+            return None
+        best_key, best_score = None, self.threshold
+        for bucket_id in self._bucket_ids(content, key[1:]):
+            for candidate in self._buckets.get(bucket_id, ()):
+                candidate_content, candidate_guards, _ = self._entries[candidate]
+                if candidate_guards != guards or not (content ^ candidate_content) <= _FILLER_WORDS:
+                    continue
+                score = len(content & candidate_content) / len(content | candidate_content)
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+        return best_key
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class ReplyCache:
+    """Bounded LRU cache with per-entry TTL and an approximate memory limit."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 8 * 1024 * 1024,
+        near_threshold: float = 0.0,
+        near_min_words: int = 2,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached replies
+            ttl_seconds: Seconds before an entry expires
+            max_bytes: Approximate memory budget for keys and replies
+            near_threshold: Jaccard similarity for serving a reworded message's reply; 0 disables
+            near_min_words: Content words a message needs before near matching applies
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[str, float, int]]" = OrderedDict()
+        self._near = NearDuplicateIndex(near_threshold, min_words=near_min_words) if near_threshold > 0 else None
+        self._bytes = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Return the cached reply for key (or a near-duplicate of it), or None."""
+        return self.lookup(key)[0]
+
+    def lookup(self, key: Tuple) -> Tuple[Optional[str], str]:
+        """
+        Look up a reply, first by exact key, then by near-duplicate message.
+
+        Returns:
+            (reply or None, "exact", "near" or "miss")
+        """
+        reply = self._live_reply(key)
+        if reply is not None:
+            self.hits += 1
+            return reply, "exact"
+        if self._near is not None:
+            similar_key = self._near.find(key)
+            reply = self._live_reply(similar_key) if similar_key is not None else None
+            if reply is not None:
+                self.near_hits += 1
+                return reply, "near"
+        self.misses += 1
+        return None, "miss"
+
+    def _live_reply(self, key: Tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        reply, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def set(self, key: Tuple, reply: str) -> None:
+        """Store a reply, evicting least-recently-used entries to stay within limits."""
+        size = _approximate_size(key, reply)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (reply, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        if self._near is not None:
+            self._near.add(key)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters."""
+        self._entries.clear()
+        self._bytes = 0
+        if self._near is not None:
+            self._near.clear()
+
+    def stats(self) -> Dict:
+        """Return counters and current size."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: Tuple) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        if self._near is not None:
+            self._near.remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _approximate_size(key: Tuple, reply: str) -> int:
+    """Rough memory footprint of a cache entry in bytes."""
+    size = sys.getsizeof(reply)
+    for part in key:
+        if isinstance(part, tuple):
+            size += sum(sys.getsizeof(item) for item in part)
+        else:
+            size += sys.getsizeof(part)
+    return size
+
+def create_reply_cache() -> ReplyCache:
+    """Build a ReplyCache from environment configuration."""
+    return ReplyCache(
+        max_entries=int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv("REPLY_CACHE_TTL_SECONDS", "3600")),
+        max_bytes=int(os.getenv("REPLY_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+        near_threshold=float(os.getenv("REPLY_CACHE_NEAR_THRESHOLD", "0.8")),
+        near_min_words=int(os.getenv("REPLY_CACHE_NEAR_MIN_WORDS", "2")),
+    )
@@ -0,0 +1,275 @@
+"""
+Resilience policy for upstream LLM calls.
+Each call gets a deadline, a hedged second attempt once it runs past the
+recent p95 latency, and a circuit breaker that fails fast while the
+provider is unhealthy. Hedges are budgeted (a fraction of recent calls) and
+take an admission slot of their own, so they can't double upstream load
+when the provider slows down for everyone.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from admission import AdmissionController, AdmissionRejected
+
+class UpstreamUnavailable(AdmissionRejected):
+    """Raised when the circuit is open or the call deadline passed; callers degrade like a shed call."""
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast. Once reset_timeout has passed one trial call is let through;
+    success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Return True if a call may go upstream now."""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def abandon_trial(self) -> None:
+        """Release the half-open trial slot for a call that was cancelled without an outcome."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the given percentile, or None until min_samples have been seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class HedgeBudget:
+    """Allows hedges on at most a fixed fraction of the most recent calls."""
+
+    def __init__(self, ratio: float = 0.1, window: int = 200):
+        self.ratio = ratio
+        self._calls = deque(maxlen=window)  # True for each recent call that was hedged
+        self._hedged = 0
+
+    def record(self, hedged: bool) -> None:
+        if len(self._calls) == self._calls.maxlen:
+            self._hedged -= self._calls[0]
+        self._calls.append(hedged)
+        self._hedged += hedged
+
+    def allows(self) -> bool:
+        """True if one more hedge keeps hedged calls within ratio of recent calls, this one included."""
+        return self._hedged + 1 <= self.ratio * (len(self._calls) + 1)
+
+class ResiliencePolicy:
+    """Deadline, p95-hedged retry and circuit breaker around one upstream call."""
+
+    def __init__(
+        self,
+        deadline: float = 20.0,
+        hedge: bool = True,
+        default_hedge_delay: float = 5.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge_budget: float = 0.1,
+        admission: Optional[AdmissionController] = None,
+    ):
+        """
+        Args:
+            deadline: Seconds before a call (including its hedge) is abandoned
+            hedge: Whether to launch a second attempt for slow calls
+            default_hedge_delay: Hedge delay used until enough latencies are recorded
+            breaker: Circuit breaker shared by every call
+            hedge_budget: Largest fraction of recent calls that may be hedged
+            admission: Controller a hedge must take a free slot from; hedges are unbounded when None
+        """
+        self.deadline = deadline
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.admission = admission
+        self.latencies = LatencyTracker()
+        self.budget = HedgeBudget(hedge_budget)
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.deadline_exceeded = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay before the hedged attempt: recent p95, or the default until warmed up."""
+        if not self.hedge:
+            return None
+        p95 = self.latencies.percentile(0.95)
+        return p95 if p95 is not None else self.default_hedge_delay
+
+    def check(self) -> None:
+        """Raise UpstreamUnavailable if the breaker is open."""
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("circuit open")
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """Feed a call outcome to the breaker; only upstream-health errors count as failures."""
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            self.breaker.abandon_trial()
+        elif error is None:
+            self.breaker.record_success()
+        elif _is_upstream_failure(error):
+            self.breaker.record_failure()
+        else:
+            # A request-specific error says nothing about upstream health
+            self.breaker.record_success()
+
+    async def call(self, attempt: Callable[[], Awaitable]):
+        """
+        Run attempt() under the policy.
+
+        Args:
+            attempt: Factory for one upstream attempt; called again for the hedge
+
+        Returns:
+            The first successful attempt's result
+        """
+        self.check()
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._hedged(attempt), self.deadline)
+        except asyncio.TimeoutError as e:
+            self.deadline_exceeded += 1
+            self.record(e)
+            raise UpstreamUnavailable("deadline exceeded") from None
+        except BaseException as e:
+            self.record(e)
+            raise
+        self.record(None)
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, attempt: Callable[[], Awaitable]):
+        pending = {asyncio.ensure_future(attempt())}
+        hedged = False
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    hedge = await self._start_hedge(attempt)
+                    if hedge is not None:
+                        hedged = True
+                        pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            self.budget.record(hedged)
+            for task in pending:
+                task.cancel()
+
+    async def _start_hedge(self, attempt: Callable[[], Awaitable]) -> Optional[asyncio.Future]:
+        """Launch the hedged attempt if the budget and a free admission slot allow it."""
+        if not self.budget.allows() or (self.admission is not None and not await self.admission.try_acquire()):
+            self.hedges_skipped += 1
+            return None
+        self.hedges += 1
+        task = asyncio.ensure_future(attempt())
+        if self.admission is not None:
+            task.add_done_callback(lambda _: self.admission.release())
+        return task
+
+    def stats(self) -> Dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "hedges": self.hedges,
+            "hedgesSkipped": self.hedges_skipped,
+            "deadlineExceeded": self.deadline_exceeded,
+            "hedgeDelay": self.hedge_delay(),
+        }
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Errors that indicate the provider is unhealthy, as opposed to a bad request."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # The SDK is imported lazily by LLMClient; without it there are no SDK errors
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def create_resilience_policy(admission: Optional[AdmissionController] = None) -> ResiliencePolicy:
+    """
+    Build a ResiliencePolicy from environment configuration.
+
+    Args:
+        admission: The LLM client's admission controller, which hedges take slots from
+    """
+    return ResiliencePolicy(
+        deadline=float(os.getenv("LLM_DEADLINE", "20")),
+        hedge=os.getenv("LLM_HEDGE", "1") not in ("0", "false", "False"),
+        default_hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "5")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "30")),
+        ),
+        hedge_budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.1")),
+        admission=admission,
+    )
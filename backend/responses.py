@@ -0,0 +1,181 @@
+"""
+Response encoding: fast JSON, compression and ETag revalidation.
+JSON is rendered with orjson. Bodies above RESPONSE_COMPRESS_MIN_BYTES are
+brotli- or gzip-compressed, whichever the client's Accept-Encoding prefers;
+streamed responses (SSE) pass through untouched. Cacheable GET endpoints
+send a strong ETag derived from the rule and catalog versions they depend
+on and answer a matching If-None-Match with 304 before doing any work.
+"""
+
+import gzip
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+import brotli
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+# Smallest body worth compressing; 0 disables compression
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("RESPONSE_COMPRESS_LEVEL", "6"))
+
+# Clients may keep responses but must revalidate them (cheaply, via ETag) before reuse
+CACHE_CONTROL = "no-cache"
+
+_UNCOMPRESSED_TYPES = ("text/event-stream", "image/", "application/gzip")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the versions and parameters a response depends on."""
+    return '"' + hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20] + '"'
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    If-None-Match comparison (weak, as RFC 9110 specifies), ignoring our encoding suffixes.
+
+    Returns the matching tag as the client holds it (e.g. '"abc-gzip"') so a
+    304 can repeat the validator its 200 carried, or None when nothing matches.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    tag = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        base = candidate
+        for suffix in ("-gzip", "-br"):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if base == tag:
+            return f'"{candidate}"'
+    return None
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already has this ETag, else None."""
+    matched = matching_etag(request.headers.get("if-none-match"), etag)
+    if matched is None:
+        return None
+    # Same validator and Vary as the 200 the client cached, compressed or not
+    return Response(status_code=304, headers={
+        "ETag": matched,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    })
+
+def cached_json(request: Request, content: Any, etag: Optional[str] = None) -> Response:
+    """
+    JSON response carrying an ETag, or 304 when the client's copy is current.
+
+    Args:
+        request: Incoming request, for If-None-Match
+        content: JSON-serializable body
+        etag: Version-derived ETag; when omitted the rendered body is hashed
+    """
+    response = FastJSONResponse(content, headers={"Cache-Control": CACHE_CONTROL})
+    etag = etag or '"' + hashlib.sha1(response.body).hexdigest()[:20] + '"'
+    return not_modified(request, etag) or _with_etag(response, etag)
+
+def _with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    return response
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding for an Accept-Encoding header: "br", "gzip" or None.
+
+    Tokens are matched whole with their q-values (RFC 9110): q=0 refuses a
+    coding, "*" covers the codings not listed, and brotli wins ties.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value.strip())
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    best, best_weight = None, 0.0
+    for coding in ("br", "gzip"):
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete (non-streamed) response bodies."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, level: int = COMPRESS_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body")
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or content_type.startswith(_UNCOMPRESSED_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            body = _compress(body, encoding, self.level)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                # A strong ETag names one representation; the compressed one needs its own
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,9 +3,21 @@ Rule-based club recommendation system.
 This module contains simple pattern matching logic for club recommendations.
 """
 
-from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
-# Smart rule mappings for club recommendations
+import numpy as np
+
+import metrics
+from normalize import NormalizedMessage, normalize, normalize_term
+
+# Built-in rule mappings for club recommendations, used when no rules file is configured
 RULE_MAPPINGS = {
     "coding": {
         "keywords": ["coding", "programming", "code", "software", "development", "python", "javascript", "java", "web dev", "computer science", "tech"],
@@ -41,64 +53,652 @@ RULE_MAPPINGS = {
     }
 }
 
-def match_club(message: str, session_data: Dict) -> Optional[str]:
+# Auxiliary word lists checked after the club keywords
+WORD_LISTS = {
+    "newer_student": ["new", "beginner", "start", "learn", "explore"],
+    "upperclassman": ["leadership", "lead", "mentor", "college", "career"],
+    "question": ["what", "which", "recommend", "suggest", "help"],
+    "club": ["club"],
+    "experienced": ["experienced", "advanced", "expert", "pro"],
+    "beginner": ["beginner", "new", "learning", "start"],
+}
+
+# Replies for matches that don't point at a specific club, keyed by word list
+GENERAL_RESPONSES = {
+    "newer_student": "🌟 As a newer student, I recommend starting with clubs that match your interests. The Coding Club, Art Club, or Science Club are great for exploring new passions and making friends!",
+    "upperclassman": "🎓 As an upperclassman, consider leadership roles in clubs! The Business Club, Debate Club, or becoming a mentor in Coding Club could be great for college applications and personal growth.",
+    "question": "🤔 I'd be happy to help you find the right club! What are your main interests or hobbies? I can suggest clubs that match your passions and goals.",
+    "experienced": "🚀 For experienced students, consider taking on leadership roles or starting new initiatives in clubs that match your expertise! You could mentor others and make a real impact.",
+    "beginner": "🌱 Great! Many clubs welcome beginners and offer mentorship programs. Consider joining clubs that align with your interests - it's a great way to learn and meet new people!",
+}
+
+# Simple inflections accepted after a keyword, so "robots" or "leading" still match
+_SUFFIXES = ("", "s", "es", "ed", "er", "ers", "ing")
+
+# Maximum edit distance for typo-tolerant keyword matches; 0 disables them
+FUZZY_MAX_DISTANCE = int(os.getenv("FUZZY_MAX_DISTANCE", "1"))
+
+# Shorter words are only matched exactly; "read" is too close to "lead"
+FUZZY_MIN_LENGTH = 5
+
+# With FUZZY_MAX_DISTANCE=2, words at least this long may be two edits away
+# ("chemestri" -> "chemistry"); shorter ones collide with real words
+# ("cooking" -> "coding", "medical" -> "musical")
+FUZZY_TWO_EDIT_LENGTH = 8
+
+# Ordinary words never typo-corrected, plus an optional extra word list (e.g. a full dictionary)
+KNOWN_WORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_words.txt")
+FUZZY_VOCABULARY_FILE = os.getenv("FUZZY_VOCABULARY_FILE") or None
+
+# Score multiplier applied to clubs the user listed as interests
+INTEREST_BOOST = 0.5
+
+# Number of ranked clubs returned by default
+DEFAULT_TOP_K = 3
+
+Tag = Tuple[str, str]
+
+class Span(NamedTuple):
+    """One keyword hit: the matched term and where it sits in the original message."""
+    term: str
+    start: int
+    end: int
+    fuzzy: bool = False  # Matched through the FuzzyIndex rather than exactly
+
+@lru_cache(maxsize=None)
+def load_known_words(paths: Tuple[str, ...] = (KNOWN_WORDS_FILE,)) -> FrozenSet[str]:
+    """Read word lists (one lowercase word per line, # comments) into a set."""
+    words = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as words_file:
+            words.update(line.strip().lower() for line in words_file if line.strip() and not line.startswith("#"))
+    return frozenset(words)
+
+def _allowed_distance(length: int, max_distance: int) -> int:
+    """Edits tolerated in a word of the given length."""
+    if length < FUZZY_MIN_LENGTH:
+        return 0
+    return min(max_distance, 1 if length < FUZZY_TWO_EDIT_LENGTH else 2)
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
     """
-    Match user message against rule-based patterns to find club recommendations.
+    Optimal string alignment distance (insert, delete, substitute, swap
+    neighbours), or limit + 1 once it is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+def _deletes(word: str, depth: int) -> set:
+    """Every string reachable from word by deleting up to depth characters."""
+    results = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        results |= frontier
+    return results
+
+class FuzzyIndex:
+    """
+    SymSpell-style index for typo-tolerant lookups of single-word terms.
+
+    Every term is stored under each string reachable by deleting up to
+    max_distance characters. A query generates its own deletes and only
+    verifies the terms that share one, so lookup cost depends on the
+    word's length, not on how many terms are indexed. Candidates must share
+    the first letter, which rules out most accidental near-misses.
+    """
+
+    # Bound on memoized lookups; message words repeat heavily
+    _CACHE_LIMIT = 50000
+
+    def __init__(self, terms: Sequence[str], max_distance: int):
+        self.max_distance = max_distance
+        self.deletes: Dict[str, List[str]] = {}
+        for term in terms:
+            depth = _allowed_distance(len(term), max_distance)
+            if " " in term or depth == 0:
+                continue
+            for variant in _deletes(term, depth):
+                self.deletes.setdefault(variant, []).append(term)
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Return the closest indexed term within the word's allowed distance, or None."""
+        if word in self._cache:
+            return self._cache[word]
+        limit = _allowed_distance(len(word), self.max_distance)
+        best: Optional[str] = None
+        best_distance = limit + 1
+        if limit:
+            seen = set()
+            for variant in _deletes(word, limit):
+                for term in self.deletes.get(variant, ()):
+                    if term in seen or term[0] != word[0]:
+                        continue
+                    seen.add(term)
+                    distance = _edit_distance(word, term, min(limit, best_distance))
+                    # Ties go to the term closest in length ("robotix" -> "robotics", not "robot")
+                    if distance < best_distance or (
+                        distance == best_distance <= limit and abs(len(term) - len(word)) < abs(len(best) - len(word))
+                    ):
+                        best, best_distance = term, distance
+        if len(self._cache) >= self._CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[word] = best
+        return best
+
+class KeywordMatcher:
+    """
+    Keyword matcher compiled from a term -> tags table.
+
+    Every keyword is expanded ahead of time into its inflected forms
+    ("robot", "robots", "roboting", ...), so matching a normalized message is
+    one dict lookup per word, and "art" never matches inside "start" or
+    "party". Multi-word terms are found from the message's bigrams, longest
+    phrase first. Words that still miss are looked up in a FuzzyIndex, so
+    "progamming" counts as "programming", unless they are known words:
+    "smart" is a word in its own right, not a typo of "start".
+    """
+
+    def __init__(
+        self,
+        term_tags: Dict[str, FrozenSet[Tag]],
+        fuzzy_distance: int = FUZZY_MAX_DISTANCE,
+        known_words: FrozenSet[str] = frozenset(),
+    ):
+        self.term_tags = term_tags
+        self.word_forms: Dict[str, str] = {}
+        # First two words of each inflected multi-word term -> [(words, term)]
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        # Longest terms claim shared forms first, so "coding" isn't read as "cod" + "ing"
+        terms = sorted(term_tags, key=len, reverse=True)
+        for term in terms:
+            words = term.split(" ")
+            for suffix in _SUFFIXES:
+                forms = tuple(words[:-1]) + (words[-1] + suffix,)
+                if len(forms) == 1:
+                    self.word_forms.setdefault(forms[0], term)
+                else:
+                    self.phrases.setdefault(" ".join(forms[:2]), []).append((forms, term))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+        self.phrase_keys = frozenset(self.phrases)
+        self.fuzzy = FuzzyIndex(terms, fuzzy_distance) if fuzzy_distance > 0 else None
+        self.known_words = known_words
+
+    def find(self, message: NormalizedMessage) -> List[Span]:
+        """Return a Span for every keyword hit in a normalized message, typos included."""
+        words, offsets = message.words, message.offsets
+        check_phrases = not message.bigram_set.isdisjoint(self.phrase_keys)
+        spans = []
+        i = 0
+        while i < len(words):
+            if check_phrases and i + 1 < len(words):
+                phrase = self._phrase_at(words, i)
+                if phrase is not None:
+                    length, term = phrase
+                    spans.append(Span(term, offsets[i][0], offsets[i + length - 1][1]))
+                    i += length
+                    continue
+            word = words[i]
+            term = self.word_forms.get(word)
+            if term is not None:
+                spans.append(Span(term, offsets[i][0], offsets[i][1]))
+            elif self.fuzzy is not None and len(word) >= FUZZY_MIN_LENGTH and word not in self.known_words:
+                term = self.fuzzy.lookup(word)
+                if term is not None:
+                    spans.append(Span(term, offsets[i][0], offsets[i][1], True))
+            i += 1
+        return spans
+
+    def _phrase_at(self, words: Tuple[str, ...], i: int) -> Optional[Tuple[int, str]]:
+        for forms, term in self.phrases.get(f"{words[i]} {words[i + 1]}", ()):
+            if words[i:i + len(forms)] == forms:
+                return len(forms), term
+        return None
+
+    def tags(self, message: NormalizedMessage) -> FrozenSet[Tag]:
+        """Return the union of tags for every keyword hit in a normalized message."""
+        return self.tags_for(self.find(message))
+
+    def tags_for(self, spans: List[Span]) -> FrozenSet[Tag]:
+        """Return the union of tags for hits already returned by find()."""
+        found = set()
+        for span in spans:
+            found |= self.term_tags[span.term]
+        return frozenset(found)
+
+def _build_matcher(rule_mappings: Mapping) -> KeywordMatcher:
+    """Compile rule mappings and WORD_LISTS into a single KeywordMatcher."""
+    term_tags: Dict[str, set] = {}
+    for club_type, rule_data in rule_mappings.items():
+        for keyword in rule_data["keywords"]:
+            term_tags.setdefault(keyword, set()).add(("rule", club_type))
+    for list_name, list_words in WORD_LISTS.items():
+        for word in list_words:
+            term_tags.setdefault(normalize_term(word), set()).add(("words", list_name))
+    vocabulary = (KNOWN_WORDS_FILE, FUZZY_VOCABULARY_FILE) if FUZZY_VOCABULARY_FILE else (KNOWN_WORDS_FILE,)
+    return KeywordMatcher(
+        {term: frozenset(tags) for term, tags in term_tags.items()},
+        known_words=load_known_words(vocabulary),
+    )
+
+class ClubScorer:
+    """
+    Ranks every club at once from keyword hits.
+
+    Each club is a row in a TF-IDF-style term-weight matrix over the matcher's
+    terms: keywords shared by several clubs weigh less, and rows are
+    L2-normalized so clubs with long keyword lists don't win by volume. The
+    matrix is stored by term, as the (clubs, weights) columns each keyword
+    feeds, so scoring a message only touches the terms it hit: a message
+    with no hits costs nothing and one with a few hits costs the same at
+    8 rules or 2000.
+    """
+
+    def __init__(self, rule_mappings: Mapping):
+        self.club_types = list(rule_mappings)
+        self.club_index = {club_type: index for index, club_type in enumerate(self.club_types)}
+        document_frequency: Dict[str, int] = {}
+        for rule_data in rule_mappings.values():
+            for keyword in rule_data["keywords"]:
+                document_frequency[keyword] = document_frequency.get(keyword, 0) + 1
+        idf = {term: np.log1p(len(self.club_types) / count) for term, count in document_frequency.items()}
+        columns: Dict[str, Tuple[List[int], List[float]]] = {}
+        for row, rule_data in enumerate(rule_mappings.values()):
+            norm = np.sqrt(sum(idf[keyword] ** 2 for keyword in rule_data["keywords"])) or 1.0
+            for keyword in rule_data["keywords"]:
+                clubs, weights = columns.setdefault(keyword, ([], []))
+                clubs.append(row)
+                weights.append(idf[keyword] / norm)
+        # Columns packed end to end: term t feeds clubs[starts[t]:ends[t]];
+        # terms only in WORD_LISTS have no column and feed no club
+        self.term_columns = {term: index for index, term in enumerate(columns)}
+        lengths = np.array([len(clubs) for clubs, _ in columns.values()], dtype=np.intp)
+        self.ends = np.cumsum(lengths)
+        self.starts = self.ends - lengths
+        self.clubs = np.array([club for clubs, _ in columns.values() for club in clubs], dtype=np.intp)
+        self.weights = np.array([weight for _, weights in columns.values() for weight in weights])
+
+    def column(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The (club rows, weights) a keyword hit on term adds to; empty for terms no club lists."""
+        index = self.term_columns.get(term)
+        if index is None:
+            return self.clubs[:0], self.weights[:0]
+        return self.clubs[self.starts[index]:self.ends[index]], self.weights[self.starts[index]:self.ends[index]]
+
+    def score(
+        self,
+        spans_list: Sequence[List[Span]],
+        interests_list: Sequence[Sequence[str]],
+    ) -> np.ndarray:
+        """
+        Score every club for every message.
+
+        The hits of a whole batch are gathered from the packed columns and
+        summed into the (messages, clubs) array with one bincount, rather than
+        one indexed add per hit.
+
+        Args:
+            spans_list: Keyword hits per message, as returned by KeywordMatcher.find
+            interests_list: The user's stated interests per message
+
+        Returns:
+            Array of shape (messages, clubs); zero means no keyword hit
+        """
+        club_count = len(self.club_types)
+        hit_rows, hit_columns = [], []
+        for row, spans in enumerate(spans_list):
+            for span in spans:
+                index = self.term_columns.get(span.term)
+                if index is not None:
+                    hit_rows.append(row)
+                    hit_columns.append(index)
+        if len(spans_list) == 1:
+            # A lone message has too few hits for the gather to pay off
+            scores = np.zeros((1, club_count))
+            for index in hit_columns:
+                start, end = self.starts[index], self.ends[index]
+                # A term lists each club once, so the fancy-indexed add is exact
+                scores[0, self.clubs[start:end]] += self.weights[start:end]
+        elif hit_columns:
+            starts = self.starts[hit_columns]
+            lengths = self.ends[hit_columns] - starts
+            # Positions of every (hit, club) entry in the packed columns
+            offsets = np.cumsum(lengths) - lengths
+            positions = np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+            cells = np.repeat(np.array(hit_rows, dtype=np.intp) * club_count, lengths) + self.clubs[positions]
+            scores = np.bincount(cells, weights=self.weights[positions], minlength=len(spans_list) * club_count)
+            scores = scores.reshape(len(spans_list), club_count)
+        else:
+            scores = np.zeros((len(spans_list), club_count))
+        for row, interests in enumerate(interests_list):
+            for interest in interests or []:
+                column = self.club_index.get(interest.lower())
+                if column is not None:
+                    scores[row, column] *= 1.0 + INTEREST_BOOST
+        return scores
+
+    def rank(self, scores: np.ndarray, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return (club_type, score) for clubs with a positive score, best first."""
+        hits = np.flatnonzero(scores > 0)
+        # Stable sort keeps rule table order between equal scores
+        order = hits[np.argsort(-scores[hits], kind="stable")]
+        ranked = [(self.club_types[i], round(float(scores[i]), 4)) for i in order]
+        return ranked if top_k is None else ranked[:top_k]
+
+@dataclass(frozen=True)
+class RuleSnapshot:
+    """Immutable, compiled view of the rule table. Readers never see a partial update."""
+    version: int
+    rule_mappings: Mapping[str, Mapping]
+    keyword_signature: Tuple
+    matcher: KeywordMatcher
+    scorer: ClubScorer
+    # Content hash of the normalized table: equal across workers and restarts for the same rules
+    fingerprint: str
+
+def _compile_snapshot(rule_mappings: Mapping, version: int, previous: Optional[RuleSnapshot] = None) -> RuleSnapshot:
+    """
+    Normalize and compile a rule table into a snapshot.
+    
+    The matcher and scorer depend only on club names and keywords, so they are
+    reused from the previous snapshot when only reply text changed. Any keyword
+    change rebuilds both in full (about 50 ms at 2000 rules): inflected forms
+    are claimed longest-term first across all clubs, and every TF-IDF weight
+    depends on how many clubs share a term, so one club can't be patched alone.
+    """
+    normalized = {}
+    for club_type, rule_data in rule_mappings.items():
+        keywords = list(dict.fromkeys(filter(None, (normalize_term(str(keyword)) for keyword in rule_data["keywords"]))))
+        if not keywords or not isinstance(rule_data["response"], str):
+            raise ValueError(f"Rule '{club_type}' needs keywords and a response")
+        normalized[str(club_type).lower()] = MappingProxyType({
+            "keywords": tuple(keywords),
+            "response": rule_data["response"]
+        })
+    signature = tuple((club_type, rule_data["keywords"]) for club_type, rule_data in normalized.items())
+    fingerprint = hashlib.sha1(json.dumps(
+        [[club_type, rule_data["keywords"], rule_data["response"]] for club_type, rule_data in normalized.items()],
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")).hexdigest()[:12]
+    
+    if previous is not None and previous.keyword_signature == signature:
+        matcher, scorer = previous.matcher, previous.scorer
+    else:
+        matcher = _build_matcher(normalized)
+        scorer = ClubScorer(normalized)
+    return RuleSnapshot(version, MappingProxyType(normalized), signature, matcher, scorer, fingerprint)
+
+class RuleStore:
+    """
+    Versioned holder of the current RuleSnapshot.
+    
+    Rules load from an optional JSON file shaped like RULE_MAPPINGS. Updates
+    compile a new snapshot and swap it in with a single reference assignment,
+    so readers take no lock; writers serialize on an internal lock. The first
+    snapshot is compiled by warm_up(), or on first use if that hasn't run.
+    """
+
+    def __init__(self, defaults: Mapping, path: Optional[str] = None):
+        """
+        Args:
+            defaults: Rule table used when the file is missing or not configured
+            path: JSON rules file to load from and persist to
+        """
+        self.path = path
+        self._defaults = defaults
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._snapshot: Optional[RuleSnapshot] = None
+
+    @property
+    def snapshot(self) -> RuleSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.warm_up()
+        return snapshot
+
+    def warm_up(self) -> RuleSnapshot:
+        """Compile the initial snapshot from the defaults and the rules file, once."""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = _compile_snapshot(self._defaults, 1)
+                if self.path:
+                    self._reload_locked(False)
+            return self._snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the rules file if it changed since the last load.
+        
+        Args:
+            force: Reload even if the file's modification time is unchanged
+            
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        if not self.path:
+            return False
+        self.warm_up()
+        with self._lock:
+            return self._reload_locked(force)
+
+    def _reload_locked(self, force: bool) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if not force and mtime == self._mtime:
+            return False
+        with open(self.path, "r", encoding="utf-8") as rules_file:
+            rule_mappings = json.load(rules_file)
+        self._swap(rule_mappings)
+        self._mtime = mtime
+        return True
+
+    def add_rule(self, club_type: str, keywords: List[str], response: str) -> RuleSnapshot:
+        """Add or replace one rule, persisting the table when a file is configured."""
+        self.warm_up()
+        with self._lock:
+            rule_mappings = {name: dict(rule_data) for name, rule_data in self._snapshot.rule_mappings.items()}
+            rule_mappings[club_type.lower()] = {"keywords": keywords, "response": response}
+            snapshot = self._swap(rule_mappings)
+            if self.path:
+                self._persist(snapshot)
+            return snapshot
+
+    def _swap(self, rule_mappings: Mapping) -> RuleSnapshot:
+        snapshot = _compile_snapshot(rule_mappings, self._snapshot.version + 1, self._snapshot)
+        self._snapshot = snapshot
+        return snapshot
+
+    def _persist(self, snapshot: RuleSnapshot) -> None:
+        # Write to a temp file and rename so the file is never seen half-written
+        data = {
+            club_type: {"keywords": list(rule_data["keywords"]), "response": rule_data["response"]}
+            for club_type, rule_data in snapshot.rule_mappings.items()
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as rules_file:
+            json.dump(data, rules_file, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime
+
+rule_store = RuleStore(RULE_MAPPINGS, os.getenv("RULES_FILE") or None)
+
+@dataclass
+class MatchResult:
+    """Outcome of a single rule-engine pass over a message."""
+    rule_id: Optional[str] = None  # Club type or GENERAL_RESPONSES key that produced the reply
+    is_club: bool = False
+    matched_rules: List[str] = field(default_factory=list)  # Every club type whose keywords hit, best first
+    ranked: List[Tuple[str, float]] = field(default_factory=list)  # (club_type, score), best first
+    spans: List[Span] = field(default_factory=list)  # Keyword hits, in message order
+    interest_aligned: bool = False
+    fuzzy: bool = False  # The winning rule was only reached through typo-corrected words
+    confidence: str = "none"
+    response: Optional[str] = None  # Reply template of the matched club, from the same snapshot
+
+    @property
+    def matched(self) -> bool:
+        return self.rule_id is not None
+
+def evaluate_message(message: str, session_data: Dict) -> MatchResult:
+    """
+    Run the rule engine once over a message.
     
     Args:
         message: User's input message
         session_data: Dictionary containing user session information
         
     Returns:
-        String with club recommendation if match found, None otherwise
+        MatchResult describing the winning rule and every keyword hit
     """
     if not message:
-        return None
+        return MatchResult()
+    
+    snapshot = rule_store.snapshot
+    spans = snapshot.matcher.find(normalize(message))
+    scores = snapshot.scorer.score([spans], [session_data.get("interests")])
+    return _evaluate_spans(snapshot, spans, session_data, scores[0])
+
+def evaluate_messages(messages: List[str], session_datas: List[Dict]) -> List[MatchResult]:
+    """
+    Run the rule engine over a batch of messages.
     
-    message_lower = message.lower()
+    Keyword matching is per message (repeats hit the normalization memo);
+    scoring then runs once for the whole batch (see ClubScorer.score).
     
-    # Check for direct keyword matches
-    for club_type, rule_data in RULE_MAPPINGS.items():
-        keywords = rule_data["keywords"]
+    Args:
+        messages: User input messages
+        session_datas: Session dictionaries, one per message
         
-        # Check if any keyword appears in the message
-        if any(keyword in message_lower for keyword in keywords):
-            # Check if user's interests align with this club type
-            user_interests = session_data.get("interests", [])
-            if club_type in [interest.lower() for interest in user_interests]:
-                # Strong match - user explicitly mentioned this interest
-                return f"{rule_data['response']} (Perfect match based on your interests!)"
-            else:
-                # Good match - keyword found but not in user's stated interests
-                return f"{rule_data['response']} (This might interest you based on your message!)"
+    Returns:
+        One MatchResult per message, in input order
+    """
+    snapshot = rule_store.snapshot
+    spans_by_message = [snapshot.matcher.find(normalize(message)) for message in messages]
+    scores = snapshot.scorer.score(spans_by_message, [session_data.get("interests") for session_data in session_datas])
+    return [
+        _evaluate_spans(snapshot, spans, session_data, row) if message else MatchResult()
+        for message, spans, session_data, row in zip(messages, spans_by_message, session_datas, scores)
+    ]
+
+def _evaluate_spans(
+    snapshot: RuleSnapshot,
+    spans: List[Span],
+    session_data: Dict,
+    scores: np.ndarray
+) -> MatchResult:
+    """Decide the winning rule from keyword hits and club scores for one message."""
+    hits = snapshot.matcher.tags_for(spans)
+    ranked = snapshot.scorer.rank(scores)
+    matched_rules = [club_type for club_type, _ in ranked]
+    result = MatchResult(matched_rules=matched_rules, ranked=ranked[:DEFAULT_TOP_K], spans=spans)
+    
+    # Check for direct keyword matches, taking the highest-scoring club
+    if matched_rules:
+        club_type = matched_rules[0]
+        # Check if user's interests align with this club type
+        user_interests = session_data.get("interests") or []
+        result.rule_id = club_type
+        result.is_club = True
+        result.response = snapshot.rule_mappings[club_type]["response"]
+        result.interest_aligned = club_type in [interest.lower() for interest in user_interests]
+        result.fuzzy = _only_fuzzy(snapshot, spans, ("rule", club_type))
+        result.confidence = "low" if result.fuzzy else "high" if result.interest_aligned else "medium"
+        return result
     
     # Check for grade-specific recommendations
     grade = session_data.get("grade")
     if grade:
-        if grade <= 9:
+        if grade <= 9 and ("words", "newer_student") in hits:
             # Freshman/sophomore recommendations
-            if any(word in message_lower for word in ["new", "beginner", "start", "learn", "explore"]):
-                return "🌟 As a newer student, I recommend starting with clubs that match your interests. The Coding Club, Art Club, or Science Club are great for exploring new passions and making friends!"
-        elif grade >= 11:
+            result.rule_id = "newer_student"
+        elif grade >= 11 and ("words", "upperclassman") in hits:
             # Junior/senior recommendations
-            if any(word in message_lower for word in ["leadership", "lead", "mentor", "college", "career"]):
-                return "🎓 As an upperclassman, consider leadership roles in clubs! The Business Club, Debate Club, or becoming a mentor in Coding Club could be great for college applications and personal growth."
+            result.rule_id = "upperclassman"
     
     # Check for specific question patterns
-    if any(word in message_lower for word in ["what", "which", "recommend", "suggest", "help"]):
-        if "club" in message_lower:
-            return "🤔 I'd be happy to help you find the right club! What are your main interests or hobbies? I can suggest clubs that match your passions and goals."
+    if result.rule_id is None and ("words", "question") in hits and ("words", "club") in hits:
+        result.rule_id = "question"
     
     # Check for experience level indicators
-    if any(word in message_lower for word in ["experienced", "advanced", "expert", "pro"]):
-        return "🚀 For experienced students, consider taking on leadership roles or starting new initiatives in clubs that match your expertise! You could mentor others and make a real impact."
+    if result.rule_id is None:
+        for list_name in ("experienced", "beginner"):
+            if ("words", list_name) in hits:
+                result.rule_id = list_name
+                break
     
-    if any(word in message_lower for word in ["beginner", "new", "learning", "start"]):
-        return "🌱 Great! Many clubs welcome beginners and offer mentorship programs. Consider joining clubs that align with your interests - it's a great way to learn and meet new people!"
+    if result.rule_id is not None:
+        result.fuzzy = _only_fuzzy(snapshot, spans, ("words", result.rule_id))
+        result.confidence = "low" if result.fuzzy else "medium"
+        result.response = GENERAL_RESPONSES[result.rule_id]
+    return result
+
+def _only_fuzzy(snapshot: RuleSnapshot, spans: List[Span], tag: Tag) -> bool:
+    """True when every hit carrying tag was a typo correction."""
+    return all(span.fuzzy for span in spans if tag in snapshot.matcher.term_tags[span.term])
+
+def render_reply(result: MatchResult) -> Optional[str]:
+    """Render the reply text for a MatchResult, or None when nothing matched."""
+    if not result.matched:
+        return None
+    if not result.is_club:
+        return result.response
+    if result.interest_aligned and not result.fuzzy:
+        # Strong match - user explicitly mentioned this interest
+        return f"{result.response} (Perfect match based on your interests!)"
+    # Good match - keyword found but not in user's stated interests
+    return f"{result.response} (This might interest you based on your message!)"
+
+def match_club(message: str, session_data: Dict) -> Optional[str]:
+    """
+    Match user message against rule-based patterns to find club recommendations.
     
-    # No specific match found
-    return None
+    Args:
+        message: User's input message
+        session_data: Dictionary containing user session information
+        
+    Returns:
+        String with club recommendation if match found, None otherwise
+    """
+    return render_reply(evaluate_message(message, session_data))
 
+def rank_clubs(message: str, session_data: Dict, top_k: int = DEFAULT_TOP_K) -> List[Dict]:
+    """
+    Rank clubs for a message by keyword score, boosted by the user's interests.
+    
+    Args:
+        message: User's input message
+        session_data: Dictionary containing user session information
+        top_k: Maximum number of clubs to return
+        
+    Returns:
+        List of {"club": club_type, "score": score} dictionaries, best first
+    """
+    if not message:
+        return []
+    snapshot = rule_store.snapshot
+    spans = snapshot.matcher.find(normalize(message))
+    scores = snapshot.scorer.score([spans], [session_data.get("interests")])
+    return [{"club": club_type, "score": score} for club_type, score in snapshot.scorer.rank(scores[0], top_k)]
+
+@metrics.instrument("rules", on_outcome=metrics.record_rule_outcome)
 def get_rule_based_recommendations(message: str, session_data: Dict) -> Dict:
     """
     Get rule-based recommendations with metadata.
@@ -110,14 +710,30 @@ def get_rule_based_recommendations(message: str, session_data: Dict) -> Dict:
     Returns:
         Dictionary with recommendation data
     """
-    recommendation = match_club(message, session_data)
+    return _recommendation_from_result(evaluate_message(message, session_data))
+
+@metrics.instrument("rules_batch", on_outcome=metrics.record_rule_outcomes)
+def get_batch_rule_based_recommendations(messages: List[str], session_datas: List[Dict]) -> List[Dict]:
+    """
+    Get rule-based recommendations for a batch of messages.
     
-    if recommendation:
+    Args:
+        messages: User input messages
+        session_datas: Session dictionaries, one per message
+        
+    Returns:
+        One recommendation dictionary per message, in input order
+    """
+    return [_recommendation_from_result(result) for result in evaluate_messages(messages, session_datas)]
+
+def _recommendation_from_result(result: MatchResult) -> Dict:
+    """Render a MatchResult into the recommendation dictionary used by the API."""
+    if result.matched:
         return {
             "source": "rules",
-            "reply": recommendation,
-            "confidence": "high" if "🎯" in recommendation else "medium",
-            "matched_patterns": _extract_matched_patterns(message)
+            "reply": render_reply(result),
+            "confidence": result.confidence,
+            "matched_patterns": result.matched_rules
         }
     
     return {
@@ -127,21 +743,48 @@ def get_rule_based_recommendations(message: str, session_data: Dict) -> Dict:
         "matched_patterns": []
     }
 
-def _extract_matched_patterns(message: str) -> List[str]:
-    """Extract which patterns matched in the message."""
-    message_lower = message.lower()
-    matched = []
+def get_degraded_recommendation(message: str, session_data: Dict) -> Dict:
+    """
+    Best reply available without the AI fallback, used when it is overloaded.
     
-    for club_type, rule_data in RULE_MAPPINGS.items():
-        keywords = rule_data["keywords"]
-        if any(keyword in message_lower for keyword in keywords):
-            matched.append(club_type)
+    Recommends the first stated interest that names a known club, otherwise
+    asks the user about their interests.
+    
+    Args:
+        message: User's input message
+        session_data: Dictionary containing user session information
+        
+    Returns:
+        Dictionary with recommendation data, source "rules-degraded"
+    """
+    rule_mappings = rule_store.snapshot.rule_mappings
+    for interest in session_data.get("interests") or []:
+        rule_data = rule_mappings.get(interest.lower())
+        if rule_data is not None:
+            return {
+                "source": "rules-degraded",
+                "reply": f"{rule_data['response']} (Based on your interests!)",
+                "confidence": "low",
+                "matched_patterns": [interest.lower()]
+            }
     
-    return matched
+    return {
+        "source": "rules-degraded",
+        "reply": GENERAL_RESPONSES["question"],
+        "confidence": "low",
+        "matched_patterns": []
+    }
+
+def _extract_matched_patterns(message: str) -> List[str]:
+    """Extract which patterns matched in the message."""
+    snapshot = rule_store.snapshot
+    clubs = [value for kind, value in snapshot.matcher.tags(normalize(message)) if kind == "rule"]
+    # Report in rule table order
+    return sorted(clubs, key=snapshot.scorer.club_index.__getitem__)
 
 def get_available_clubs() -> List[str]:
     """Get list of available club types for reference."""
-    return list(RULE_MAPPINGS.keys())
+    return list(rule_store.snapshot.rule_mappings.keys())
 
 def add_custom_rule(club_type: str, keywords: List[str], response: str) -> bool:
     """
@@ -156,10 +799,7 @@ def add_custom_rule(club_type: str, keywords: List[str], response: str) -> bool:
         True if successfully added, False otherwise
     """
     try:
-        RULE_MAPPINGS[club_type.lower()] = {
-            "keywords": [kw.lower() for kw in keywords],
-            "response": response
-        }
+        rule_store.add_rule(club_type, keywords, response)
         return True
     except Exception:
         return False
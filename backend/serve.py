@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Multi-worker production launcher for the FastAPI backend.
+The app (rule tables, compiled matcher and scoring matrix, club catalog) is
+imported and warmed up once in this parent process, which then forks the
+workers, so those pages are shared copy-on-write instead of being rebuilt per
+worker. All workers accept on one listening socket.
+
+Signals sent to the launcher:
+    SIGHUP           Rolling restart: replace workers one at a time, each old
+                     worker draining its in-flight requests after its
+                     replacement is accepting
+    SIGTERM/SIGINT   Graceful shutdown of every worker
+
+Code changes need a full restart, since replacements are forked from the
+already-imported app.
+
+Usage: python serve.py [--workers N] [--host HOST] [--port PORT]
+"""
+
+import argparse
+import gc
+import importlib
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+import shared_state
+
+logger = logging.getLogger("serve")
+
+# Seconds a new worker may take to start accepting before the restart is abandoned
+WORKER_READY_TIMEOUT = 30.0
+
+class _Worker(uvicorn.Server):
+    """uvicorn server that tells the launcher once it is accepting connections."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        try:
+            await super().startup(sockets=sockets)
+            if not self.should_exit:
+                os.write(self.ready_fd, b"1")
+        finally:
+            os.close(self.ready_fd)
+
+class Launcher:
+    """Pre-fork supervisor: spawns, replaces and reaps worker processes."""
+
+    def __init__(self, app, listener: socket.socket, workers: int, graceful_timeout: float):
+        """
+        Args:
+            app: The already-imported ASGI app
+            listener: Bound, listening socket shared by every worker
+            workers: Number of worker processes
+            graceful_timeout: Seconds a stopping worker may spend draining requests
+        """
+        self.app = app
+        self.listener = listener
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, int] = {}  # pid -> worker generation
+        self.generation = 0
+        self.stopping = False
+        self.restart_requested = False
+        # REPLY_CACHE_WARM_FILE is warmed by the first worker only, not once per worker
+        self.cache_warming_assigned = False
+
+    def spawn(self) -> Optional[int]:
+        """Fork one worker and wait until it accepts connections; returns its pid or None."""
+        read_fd, write_fd = os.pipe()
+        warm_cache, self.cache_warming_assigned = not self.cache_warming_assigned, True
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            if not warm_cache:
+                os.environ.pop("REPLY_CACHE_WARM_FILE", None)
+            self._run_worker(write_fd)
+        os.close(write_fd)
+        self.children[pid] = self.generation
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_READY_TIMEOUT)
+            started = bool(ready) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+        if not started:
+            logger.error("Worker %s failed to start", pid)
+            self._stop(pid)
+            return None
+        logger.info("Worker %s ready", pid)
+        return pid
+
+    def _run_worker(self, ready_fd: int) -> None:
+        # Child process: restore default signal handling and let uvicorn install its own
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app,
+            timeout_graceful_shutdown=self.graceful_timeout,
+            log_config=None,
+        )
+        code = 0
+        try:
+            _Worker(config, ready_fd).run(sockets=[self.listener])
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _stop(self, pid: int) -> None:
+        """SIGTERM a worker and wait for it to drain and exit."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            time.sleep(0.1)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.children.pop(pid, None)
+
+    def rolling_restart(self) -> None:
+        """Replace every current worker, one at a time, without dropping capacity."""
+        # Pick up the latest rules so replacements are forked with them preloaded
+        from main import rule_store
+        try:
+            rule_store.reload()
+        except Exception:
+            logger.exception("Failed to reload rules before restart; forking with version %s", rule_store.snapshot.version)
+        gc.freeze()
+
+        self.generation += 1
+        old_workers = [pid for pid, generation in self.children.items() if generation < self.generation]
+        logger.info("Rolling restart of %d workers", len(old_workers))
+        for pid in old_workers:
+            if self.stopping:
+                return
+            if self.spawn() is None:
+                logger.error("Rolling restart abandoned; keeping remaining old workers")
+                return
+            self._stop(pid)
+
+    def reap(self) -> None:
+        """Collect exited workers and replace any that died unexpectedly."""
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            if self.children.pop(pid, None) is not None and not self.stopping:
+                logger.warning("Worker %s exited with status %s; replacing it", pid, status)
+                self.spawn()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "restart_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stopping", True))
+
+        for _ in range(self.workers):
+            self.spawn()
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap()
+            time.sleep(0.5)
+
+        logger.info("Shutting down %d workers", len(self.children))
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.children):
+            self._stop(pid)
+
+def bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(2048)
+    listener.set_inheritable(True)
+    return listener
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the backend with several worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+    if args.workers > 1 and not os.getenv("SESSION_STORE_PATH"):
+        logger.warning(
+            "SESSION_STORE_PATH is not set: each of the %d workers keeps its own sessions, so a turn "
+            "routed to another worker starts a new session and loses the conversation. "
+            "Set SESSION_STORE_PATH to share sessions between workers.", args.workers
+        )
+
+    # The channel must exist before main is imported and before any fork
+    shared_state.install()
+    started = time.perf_counter()
+    import main as backend
+    # Build the rules and catalog once here for every worker to share. The app
+    # defers the openai import to the first AI request so single-process starts
+    # stay fast; under the launcher it is imported before forking instead, so
+    # its modules sit in copy-on-write pages rather than being loaded per worker
+    backend.warm_up()
+    importlib.import_module("openai")
+    logger.info("Preloaded app in %.0f ms", (time.perf_counter() - started) * 1000)
+
+    # Forked workers must not share the parent's SQLite connections
+    if backend.disk_cache is not None:
+        backend.disk_cache.close()
+    backend.session_store.close()
+    # Keep the preloaded objects out of later GC passes so collections don't dirty shared pages
+    gc.collect()
+    gc.freeze()
+
+    listener = bind(args.host, args.port)
+    logger.info("Serving on %s:%d with %d workers", args.host, args.port, args.workers)
+    Launcher(backend.app, listener, args.workers, args.graceful_timeout).run()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Server-side conversation sessions.
+Clients create a session once and then send only a session id plus small
+deltas, instead of the whole SessionData on every turn. Records are compact,
+lists are bounded, idle sessions are evicted, and each record renders its
+prompt context lazily, the first time a request reads it, so a turn renders
+it once.
+
+Sessions live in process memory. With SESSION_STORE_PATH set they are also
+written through to a local SQLite file (WAL mode), which survives restarts
+and lets the workers started by serve.py share sessions; callers on the
+event loop then run store calls in a thread (see main.run_session_call).
+A conversation turn costs one version check and one write. Writes are a
+compare-and-set on the record version: when another worker updated the
+session first, the delta is reapplied to its record and written again, so
+concurrent turns never drop each other's queries.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import prompts
+
+# Bounds on the per-session lists
+HISTORY_LIMIT = int(os.getenv("SESSION_HISTORY_LIMIT", "20"))
+CLUBS_VIEWED_LIMIT = 50
+INTERESTS_LIMIT = 20
+
+class SessionRecord:
+    """One conversation's state plus its pre-rendered prompt context."""
+
+    __slots__ = ("session_id", "version", "grade", "interests", "experience_types",
+                 "clubs_viewed", "query_history", "last_seen", "_context", "_data")
+
+    def __init__(
+        self,
+        session_id: str,
+        version: int = 0,
+        grade: Optional[int] = None,
+        interests: Tuple[str, ...] = (),
+        experience_types: Tuple[str, ...] = (),
+        clubs_viewed: Tuple[str, ...] = (),
+        query_history: Tuple[str, ...] = (),
+        last_seen: float = 0.0,
+    ):
+        self.session_id = session_id
+        self.version = version
+        self.grade = grade
+        self.interests = interests
+        self.experience_types = experience_types
+        self.clubs_viewed = clubs_viewed
+        self.query_history = query_history
+        self.last_seen = last_seen
+        self._context: Optional[str] = None
+        self._data: Optional[Dict] = None
+
+    @property
+    def context(self) -> str:
+        """Token-budgeted prompt context, rendered on first use."""
+        if self._context is None:
+            self._context = prompts.build_session_context(
+                self.grade, self.interests, self.experience_types, self.clubs_viewed, self.query_history
+            )
+        return self._context
+
+    def as_session_data(self) -> Dict:
+        """The session in SessionData form; shared, so callers must not mutate it."""
+        if self._data is None:
+            self._data = {
+                "grade": self.grade,
+                "interests": list(self.interests),
+                "experience_types": list(self.experience_types),
+                "clubs_viewed": list(self.clubs_viewed),
+                "query_history": list(self.query_history),
+            }
+        return self._data
+
+    def before_latest_query(self) -> "SessionRecord":
+        """This session as the turn that added the newest query sees it: without that query."""
+        return SessionRecord(
+            self.session_id, self.version, self.grade, self.interests, self.experience_types,
+            self.clubs_viewed, self.query_history[:-1], self.last_seen,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "v": self.version, "g": self.grade, "i": self.interests, "e": self.experience_types,
+            "c": self.clubs_viewed, "q": self.query_history, "t": self.last_seen,
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, session_id: str, raw: str) -> "SessionRecord":
+        data = json.loads(raw)
+        return cls(
+            session_id, data["v"], data["g"], tuple(data["i"]), tuple(data["e"]),
+            tuple(data["c"]), tuple(data["q"]), data["t"],
+        )
+
+def _merge(existing: Tuple[str, ...], added: Iterable[str], limit: int) -> Tuple[str, ...]:
+    """Append new items (moving repeats to the end), keeping the newest limit."""
+    items = list(existing)
+    for item in added:
+        if item in items:
+            items.remove(item)
+        items.append(item)
+    return tuple(items[-limit:])
+
+class _SqliteBackend:
+    """Write-through SQLite persistence for session records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process; connections must not cross fork()
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                "last_seen REAL NOT NULL, record TEXT NOT NULL)"
+            )
+        return self._conn
+
+    def version(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection().execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            row = self._connection().execute("SELECT record FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return SessionRecord.from_json(session_id, row[0]) if row else None
+
+    def save(self, record: SessionRecord, expected_version: int) -> bool:
+        """
+        Write record if the stored row is still at expected_version (0 for a new session).
+
+        Returns:
+            False when another writer moved the session on first
+        """
+        with self._lock:
+            if expected_version == 0:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO sessions (id, version, last_seen, record) VALUES (?, ?, ?, ?)",
+                    (record.session_id, record.version, record.last_seen, record.to_json())
+                )
+                return True
+            cursor = self._connection().execute(
+                "UPDATE sessions SET version = ?, last_seen = ?, record = ? WHERE id = ? AND version = ?",
+                (record.version, record.last_seen, record.to_json(), record.session_id, expected_version)
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self, before: float) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM sessions WHERE last_seen < ?", (before,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+class SessionStore:
+    """LRU + idle-TTL store of SessionRecords, optionally persisted to SQLite. Thread-safe."""
+
+    # Purge idle rows from the persistent backend every N writes
+    _PURGE_EVERY = 256
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 2 * 3600, path: Optional[str] = None):
+        """
+        Args:
+            max_sessions: Sessions kept in memory; least recently used are evicted beyond it
+            idle_ttl: Seconds without activity before a session expires
+            path: SQLite file to persist sessions to, or None for memory only
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.backend = _SqliteBackend(path) if path else None
+        self._lock = threading.RLock()
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._writes = 0
+        self.created = 0
+        self.updated = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @property
+    def persistent(self) -> bool:
+        """True when store calls do SQLite I/O."""
+        return self.backend is not None
+
+    def create(self, **changes) -> SessionRecord:
+        """Start a new session, optionally seeded with apply() changes, in a single write."""
+        with self._lock:
+            record = self._updated(SessionRecord(uuid.uuid4().hex), **changes)
+            self.created += 1
+            self._store(record, 0)
+            return record
+
+    def begin_turn(self, session_id: str, message: str, changes: Dict, seed: Dict) -> SessionRecord:
+        """
+        Bring a session up to date for one conversation turn, with a single write.
+
+        Args:
+            session_id: The client's session id
+            message: This turn's message, appended to the stored query history
+            changes: apply() changes sent with this turn
+            seed: apply() changes that seed a new session when session_id is unknown or expired
+
+        Returns:
+            The session as of this turn, without message in its history
+        """
+        with self._lock:
+            while True:
+                record = self.get(session_id)
+                turn_changes = changes
+                if record is None:
+                    record = SessionRecord(uuid.uuid4().hex)
+                    turn_changes = {**seed, **changes}
+                # One update applies the delta and appends this turn's message
+                queries = [*turn_changes.get("add_queries", ()), message]
+                stored = self._updated(record, **{**turn_changes, "add_queries": queries})
+                # On a conflict, get() reloads the other worker's record and the turn is redone on it
+                if self._store(stored, record.version):
+                    break
+            if record.version == 0:
+                self.created += 1
+            self.updated += 1
+            return stored.before_latest_query()
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        """Return a live session, or None if it is unknown or expired."""
+        with self._lock:
+            now = time.time()
+            record = self._sessions.get(session_id)
+            if self.backend is not None:
+                # Another worker may have moved the session on; reload only if so
+                version = self.backend.version(session_id)
+                if version is None:
+                    record = None
+                elif record is None or record.version != version:
+                    record = self.backend.load(session_id)
+            if record is None:
+                self._sessions.pop(session_id, None)
+                return None
+            if now - record.last_seen > self.idle_ttl:
+                self.expired += 1
+                self.delete(session_id)
+                return None
+            self._sessions[session_id] = record
+            self._sessions.move_to_end(session_id)
+            self._evict()
+            return record
+
+    def apply(
+        self,
+        record: SessionRecord,
+        grade: Optional[int] = None,
+        interests: Optional[List[str]] = None,
+        add_interests: Iterable[str] = (),
+        experience_types: Optional[List[str]] = None,
+        add_clubs_viewed: Iterable[str] = (),
+        add_queries: Iterable[str] = (),
+    ) -> SessionRecord:
+        """
+        Apply a delta and return the new record; the old record is left untouched.
+
+        Args:
+            record: Current session record
+            grade: New grade, if changed
+            interests: Replacement interest list
+            add_interests: Interests to add
+            experience_types: Replacement experience types
+            add_clubs_viewed: Clubs the student just looked at
+            add_queries: Messages to append to the query history
+        """
+        with self._lock:
+            while True:
+                updated = self._updated(
+                    record, grade, interests, add_interests, experience_types, add_clubs_viewed, add_queries
+                )
+                if self._store(updated, record.version):
+                    break
+                # Another worker wrote first: apply the delta to its record instead
+                record = self.get(record.session_id) or SessionRecord(record.session_id)
+            self.updated += 1
+            return updated
+
+    def _updated(
+        self,
+        record: SessionRecord,
+        grade: Optional[int] = None,
+        interests: Optional[List[str]] = None,
+        add_interests: Iterable[str] = (),
+        experience_types: Optional[List[str]] = None,
+        add_clubs_viewed: Iterable[str] = (),
+        add_queries: Iterable[str] = (),
+    ) -> SessionRecord:
+        return SessionRecord(
+            record.session_id,
+            record.version + 1,
+            grade if grade is not None else record.grade,
+            _merge(tuple(interests) if interests is not None else record.interests, add_interests, INTERESTS_LIMIT),
+            tuple(experience_types) if experience_types is not None else record.experience_types,
+            _merge(record.clubs_viewed, add_clubs_viewed, CLUBS_VIEWED_LIMIT),
+            (record.query_history + tuple(add_queries))[-HISTORY_LIMIT:],
+            time.time(),
+        )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self.backend is not None:
+                self.backend.delete(session_id)
+
+    def _store(self, record: SessionRecord, expected_version: int) -> bool:
+        """Keep record unless the persisted session has moved past expected_version; returns whether it was kept."""
+        if self.backend is not None:
+            if not self.backend.save(record, expected_version):
+                return False
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                self.backend.purge(time.time() - self.idle_ttl)
+        self._sessions[record.session_id] = record
+        self._sessions.move_to_end(record.session_id)
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        # Drop idle sessions from the cold end
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_seen >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> Dict:
+        """Counters only; never touches SQLite."""
+        return {
+            "sessions": len(self._sessions),
+            "persistent": self.backend is not None,
+            "created": self.created,
+            "updated": self.updated,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+def create_session_store() -> SessionStore:
+    """Build a SessionStore from environment configuration."""
+    return SessionStore(
+        max_sessions=int(os.getenv("SESSION_MAX_ENTRIES", "10000")),
+        idle_ttl=float(os.getenv("SESSION_IDLE_TTL_SECONDS", str(2 * 3600))),
+        path=os.getenv("SESSION_STORE_PATH") or None,
+    )
@@ -0,0 +1,45 @@
+"""
+Cross-worker invalidation channel.
+The production launcher (serve.py) allocates a few generation counters in
+shared memory before forking its workers. A worker that reloads rules or
+clears its caches bumps the matching counter; every other worker polls the
+counters and repeats the action when it sees a new generation. In a
+single-process run there is no channel and publishing is a no-op.
+"""
+
+import multiprocessing
+from typing import Optional
+
+# Counter slots
+RULES = 0
+REPLY_CACHE = 1
+_CHANNELS = 2
+
+class SharedGenerations:
+    """Generation counters in shared memory, inherited by forked workers."""
+
+    def __init__(self):
+        # lock=True wraps the array in a process-shared lock for the increments
+        self._counters = multiprocessing.Array("Q", _CHANNELS)
+
+    def bump(self, channel: int) -> int:
+        """Advance a channel's generation and return the new value."""
+        with self._counters.get_lock():
+            self._counters[channel] += 1
+            return self._counters[channel]
+
+    def get(self, channel: int) -> int:
+        return self._counters[channel]
+
+# Set by serve.py before forking; None when running a single process
+channel: Optional[SharedGenerations] = None
+
+def install() -> SharedGenerations:
+    """Create the shared channel. Must be called in the parent before forking workers."""
+    global channel
+    channel = SharedGenerations()
+    return channel
+
+def publish(slot: int) -> Optional[int]:
+    """Tell the other workers about a local reload or invalidation, if a channel exists."""
+    return channel.bump(slot) if channel is not None else None
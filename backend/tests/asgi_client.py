@@ -0,0 +1,65 @@
+"""
+Minimal in-process ASGI client for endpoint tests.
+Drives an app with one HTTP request and collects the response, without the
+httpx dependency that starlette's TestClient needs.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, NamedTuple, Optional
+
+class ASGIResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+async def send_request(app, method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None) -> ASGIResponse:
+    """Send one request through the app; body, when given, is sent as JSON."""
+    raw_body = b"" if body is None else json.dumps(body).encode("utf-8")
+    raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+    if body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "query_string": query.encode("latin-1"),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            # Nothing more to send; wait like a client keeping the connection open
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": raw_body, "more_body": False}
+
+    status, response_headers, chunks = 0, {}, []
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return ASGIResponse(status, response_headers, b"".join(chunks))
+
+def call(app, method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None) -> ASGIResponse:
+    """Synchronous send_request, for tests that don't run their own event loop."""
+    return asyncio.run(send_request(app, method, path, body, headers))
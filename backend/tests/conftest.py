@@ -0,0 +1,10 @@
+"""
+Shared pytest setup for the backend unit tests.
+The backend modules import each other by bare name (as main.py and serve.py
+run them), so the backend directory goes on sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
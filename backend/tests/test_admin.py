@@ -0,0 +1,41 @@
+"""Tests for admin endpoint and profiling header authorization."""
+
+import pytest
+
+import main
+from asgi_client import call
+from profiling import ProfilingMiddleware
+
+ADMIN_ENDPOINTS = ["/api/admin/rules/reload", "/api/admin/cache/clear"]
+
+@pytest.mark.parametrize("path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_are_closed_without_admin_token(monkeypatch, path):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert call(main.app, "POST", path).status == 403
+    assert call(main.app, "POST", path, headers={"X-Admin-Token": ""}).status == 403
+
+@pytest.mark.parametrize("path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_reject_wrong_token(monkeypatch, path):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert call(main.app, "POST", path).status == 403
+    assert call(main.app, "POST", path, headers={"X-Admin-Token": "guess"}).status == 403
+
+def test_cache_clear_accepts_admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    response = call(main.app, "POST", "/api/admin/cache/clear", headers={"X-Admin-Token": "secret"})
+    assert response.status == 200
+    assert response.json() == {"cleared": True}
+
+def wants_profile(monkeypatch, token, header):
+    if token is None:
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    else:
+        monkeypatch.setenv("ADMIN_TOKEN", token)
+    middleware = ProfilingMiddleware(None, sample_every=0, header_enabled=True)
+    return middleware._wants_profile({b"x-profile": header})
+
+def test_profile_header_is_ignored_without_admin_token(monkeypatch):
+    assert not wants_profile(monkeypatch, None, b"1")
+    assert not wants_profile(monkeypatch, None, b"")
+    assert not wants_profile(monkeypatch, "secret", b"guess")
+    assert wants_profile(monkeypatch, "secret", b"secret")
@@ -0,0 +1,79 @@
+"""Tests for AI fallback admission control and the degraded reply path."""
+
+import asyncio
+import json
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+async def hold(controller, started, release):
+    async with controller.slot():
+        started.set()
+        await release.wait()
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold(controller, started, release))
+        await started.wait()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot():
+                pass
+        release.set()
+        await holder
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.reason == "queue full"
+    assert controller.stats()["shedQueueFull"] == 1
+    assert controller.stats()["active"] == 0
+
+def test_sheds_after_queue_timeout():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold(controller, started, release))
+        await started.wait()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot():
+                pass
+        release.set()
+        await holder
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.reason == "queue timeout"
+    assert controller.stats()["queued"] == 0
+
+def test_queued_call_runs_when_a_slot_frees():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold(controller, started, release))
+        await started.wait()
+        asyncio.get_running_loop().call_later(0.01, release.set)
+        async with controller.slot():
+            pass
+        await holder
+        return controller
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)).stats()["admitted"] == 2
+
+class RejectingLLM:
+    async def complete(self, system_message, message):
+        raise AdmissionRejected("queue full")
+
+def test_ai_endpoint_marks_degraded_replies(monkeypatch):
+    import main
+    from benchmarks.asgi import request
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(main.app.state, "llm", RejectingLLM(), raising=False)
+    body = {"message": "anything fun?", "sessionData": {"interests": ["Robotics"]}}
+    status, payload = asyncio.run(request(main.app, "POST", "/api/ai", body))
+    data = json.loads(payload)
+    assert status == 200
+    assert data["source"] == "rules-degraded"
+    assert "Robotics Club" in data["reply"]
@@ -0,0 +1,56 @@
+"""Tests for batch rule evaluation and /api/recommend/batch."""
+
+import pytest
+
+import main
+from asgi_client import call
+from rules import evaluate_message, evaluate_messages
+
+MESSAGES = [
+    "I love coding and robotics",
+    "",
+    "something with no keyword at all",
+    "music and art",
+    "I love coding and robotics",
+]
+
+def test_batch_matches_one_message_at_a_time():
+    sessions = [{"interests": ["music"]}] * len(MESSAGES)
+    batch = evaluate_messages(MESSAGES, sessions)
+    single = [evaluate_message(message, session) for message, session in zip(MESSAGES, sessions)]
+    assert [(result.rule_id, result.ranked, result.confidence) for result in batch] == [
+        (result.rule_id, result.ranked, result.confidence) for result in single
+    ]
+
+def test_results_keep_input_order(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    items = [{"message": "I want to join a music band"}, {"message": "coding club please"}, {"message": "art and painting"}]
+    response = call(main.app, "POST", "/api/recommend/batch", items)
+    assert response.status == 200
+    results = response.json()["results"]
+    assert [result["matched_patterns"][0] for result in results] == ["music", "coding", "art"]
+    assert {result["source"] for result in results} == {"rules"}
+
+def test_failed_item_is_reported_without_failing_the_batch(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    items = [{"message": "coding club please"}, {"message": "zzyzx qwv plumbus"}]
+    response = call(main.app, "POST", "/api/recommend/batch", items)
+    assert response.status == 200
+    first, second = response.json()["results"]
+    assert first["source"] == "rules" and first["reply"]
+    assert second["source"] == "error"
+    assert "OpenAI API key not configured" in second["error"]
+    assert second["reply"] is None
+
+def test_oversized_batch_is_rejected(monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    response = call(main.app, "POST", "/api/recommend/batch", [{"message": "coding"}] * 3)
+    assert response.status == 413
+    assert "max 2" in response.json()["detail"]
+
+@pytest.mark.parametrize("size", [0, 2])
+def test_batch_up_to_the_limit_is_accepted(monkeypatch, size):
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    response = call(main.app, "POST", "/api/recommend/batch", [{"message": "coding"}] * size)
+    assert response.status == 200
+    assert len(response.json()["results"]) == size
@@ -0,0 +1,93 @@
+"""Tests for the indexed club catalog."""
+
+import pytest
+
+from catalog import ClubCatalog, load_club_data, meeting_days, parse_js_literal
+from normalize import stem
+
+SCHOOLS = [
+    {"school": "North High", "clubs": [
+        {"name": "Chess Club", "category": "Academic", "meetingDay": "Tuesdays", "description": "Strategy games"},
+        {"name": "Robotics Team", "category": "STEM", "meetingDay": "Mon & Wed", "activities": ["Building robots"]},
+        {"name": "Art Society", "category": "Arts", "meetingDay": "Friday", "description": "Painting and drawing"},
+    ]},
+    {"school": "South High", "clubs": [
+        {"name": "Coding Club", "category": "STEM", "meetingDay": "Tuesday", "description": "Programming robots"},
+        {"name": "Drama Club", "category": "Arts", "meetingDay": "Thursdays", "description": "Acting on stage"},
+    ]},
+]
+
+@pytest.fixture(scope="module")
+def catalog():
+    return ClubCatalog(SCHOOLS, "v1")
+
+def names(page):
+    return [club["name"] for club in page["clubs"]]
+
+def test_default_order_is_by_name(catalog):
+    assert names(catalog.query()) == ["Art Society", "Chess Club", "Coding Club", "Drama Club", "Robotics Team"]
+
+def test_filters_intersect(catalog):
+    page = catalog.query(school="north high", category="stem")
+    assert names(page) == ["Robotics Team"]
+    assert page["total"] == 1
+    assert names(catalog.query(day="tue")) == ["Chess Club", "Coding Club"]
+    assert names(catalog.query(school="Nowhere")) == []
+
+def test_search_ranks_by_relevance(catalog):
+    assert sorted(names(catalog.query(q="robots"))) == ["Coding Club", "Robotics Team"]
+    # A name match outweighs a description match
+    assert names(catalog.query(q="coding robots")) == ["Coding Club", "Robotics Team"]
+    assert names(catalog.query(q="robots", school="North High")) == ["Robotics Team"]
+
+def test_cursor_pages_through_every_club(catalog):
+    seen, cursor = [], None
+    while True:
+        page = catalog.query(limit=2, cursor=cursor)
+        seen += names(page)
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == names(catalog.query())
+
+def test_cursor_is_bound_to_query_and_version(catalog):
+    cursor = catalog.query(limit=1)["nextCursor"]
+    with pytest.raises(ValueError):
+        catalog.query(limit=1, cursor=cursor, school="North High")
+    with pytest.raises(ValueError):
+        ClubCatalog(SCHOOLS, "v2").query(limit=1, cursor=cursor)
+    with pytest.raises(ValueError):
+        catalog.query(cursor="not-a-cursor")
+
+def test_invalid_arguments(catalog):
+    with pytest.raises(ValueError):
+        catalog.query(sort="popularity")
+    with pytest.raises(ValueError):
+        catalog.query(day="someday")
+
+def test_meeting_days():
+    assert meeting_days("Mon & Wed") == {"monday", "wednesday"}
+    assert meeting_days("Thursdays after school") == {"thursday"}
+    assert meeting_days("") == set()
+
+def test_parse_js_literal():
+    text = """export const allClubData = [
+        // comment
+        { school: 'North', clubs: [{ name: "It's \\"fun\\"", size: 12, active: true, }], },
+    ];"""
+    data = parse_js_literal(text, text.index("["))
+    assert data == [{"school": "North", "clubs": [{"name": "It's \"fun\"", "size": 12, "active": True}]}]
+
+def test_load_club_data_versions_by_content(tmp_path):
+    path = tmp_path / "clubs.json"
+    path.write_text('[{"school": "North", "clubs": []}]')
+    schools, version = load_club_data(str(path))
+    assert schools == [{"school": "North", "clubs": []}]
+    path.write_text('[{"school": "South", "clubs": []}]')
+    assert load_club_data(str(path))[1] != version
+
+def test_stem_strips_one_suffix():
+    assert stem("clubs") == "club"
+    assert stem("volunteering") == "volunteer"
+    assert stem("activities") == "activity"
+    assert stem("bus") == "bus"
@@ -0,0 +1,63 @@
+"""Tests for the persistent SQLite reply cache."""
+
+import disk_cache
+from disk_cache import DiskReplyCache, prompt_hash
+
+def make_cache(tmp_path, **kwargs):
+    return DiskReplyCache(str(tmp_path / "replies.db"), **kwargs)
+
+def test_round_trip_and_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    key = prompt_hash("model", "system", "hi")
+    assert cache.get(key) is None
+    cache.set(key, "hello")
+    assert cache.get(key) == "hello"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_prompt_hash_separates_parts():
+    assert prompt_hash("m", "ab", "c") != prompt_hash("m", "a", "bc")
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=-1)
+    cache.set("key", "reply")
+    assert cache.get("key") is None
+
+def test_entries_are_shared_between_instances(tmp_path):
+    writer = make_cache(tmp_path)
+    writer.set("key", "reply")
+    assert make_cache(tmp_path).get("key") == "reply"
+
+def test_evicts_least_recently_used_beyond_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "_EVICT_EVERY", 1)
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.set("old", "12345")
+    cache.set("new", "67890")
+    cache.set("newest", "abcde")
+    assert cache.get("old") is None
+    assert cache.get("newest") == "abcde"
+    assert cache.evictions >= 1
+
+def test_stats_do_not_query_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "_COUNT_INTERVAL", 0.0)
+    cache = make_cache(tmp_path)
+    cache.set("key", "reply")
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (1, 5)
+
+    class NoQueries:
+        def execute(self, *args):
+            raise AssertionError("stats() queried SQLite")
+
+    monkeypatch.setattr(cache, "_conn", NoQueries())
+    assert cache.stats()["entries"] == 1
+
+def test_totals_are_recounted_periodically(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    other = make_cache(tmp_path)
+    other.set("key", "reply")
+    # Another process's write shows up after the next recount
+    assert cache.stats()["entries"] == 0
+    monkeypatch.setattr(disk_cache, "_COUNT_INTERVAL", 0.0)
+    cache.get("missing")
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,76 @@
+"""Tests for typo-tolerant keyword matching."""
+
+import pytest
+
+from normalize import normalize
+from rules import (
+    FuzzyIndex,
+    KeywordMatcher,
+    _allowed_distance,
+    evaluate_message,
+    render_reply,
+    rule_store,
+)
+
+@pytest.fixture(scope="module")
+def matcher():
+    return rule_store.snapshot.matcher
+
+def fuzzy_terms(matcher, message):
+    return [span.term for span in matcher.find(normalize(message)) if span.fuzzy]
+
+@pytest.mark.parametrize("message", [
+    "I love cooking",
+    "I want to go to medical school",
+    "maybe physical therapy",
+    "what sorts of clubs are there",
+    "any good spots to hang out",
+    "I'm pretty smart",
+    "how do I trace my schedule",
+])
+def test_ordinary_words_are_not_typo_corrected(matcher, message):
+    assert fuzzy_terms(matcher, message) == []
+
+@pytest.mark.parametrize("message, term", [
+    ("I like robtics", "robotics"),
+    ("I'm into programing", "programming"),
+    ("progamming is fun", "programming"),
+])
+def test_typos_match_their_keyword(matcher, message, term):
+    assert fuzzy_terms(matcher, message) == [term]
+
+def test_cooking_is_not_a_perfect_coding_match():
+    result = evaluate_message("I love cooking", {"interests": ["coding"]})
+    assert result.rule_id != "coding"
+
+def test_typo_hit_has_low_confidence():
+    result = evaluate_message("I love robtics", {"interests": ["robotics"]})
+    assert result.rule_id == "robotics"
+    assert result.fuzzy
+    assert result.confidence == "low"
+    assert "Perfect match based on your interests" not in render_reply(result)
+
+def test_exact_hit_keeps_high_confidence():
+    result = evaluate_message("I love robotics", {"interests": ["robotics"]})
+    assert not result.fuzzy
+    assert result.confidence == "high"
+
+@pytest.mark.parametrize("length, max_distance, expected", [
+    (4, 2, 0),
+    (5, 2, 1),
+    (7, 2, 1),
+    (8, 2, 2),
+    (12, 1, 1),
+])
+def test_allowed_distance(length, max_distance, expected):
+    assert _allowed_distance(length, max_distance) == expected
+
+def test_two_edits_only_for_long_words():
+    index = FuzzyIndex(["chemistry", "coding"], 2)
+    assert index.lookup("chemestri") == "chemistry"
+    assert index.lookup("cooking") is None
+
+def test_known_words_skip_the_fuzzy_index():
+    term_tags = {"start": frozenset({("words", "beginner")})}
+    assert [span.term for span in KeywordMatcher(term_tags).find(normalize("smart"))] == ["start"]
+    assert KeywordMatcher(term_tags, known_words=frozenset({"smart"})).find(normalize("smart")) == []
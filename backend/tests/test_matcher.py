@@ -0,0 +1,44 @@
+"""Tests for keyword matching: word boundaries, inflections and phrases."""
+
+import pytest
+
+from normalize import normalize
+from rules import _build_matcher, rule_store
+
+@pytest.fixture(scope="module")
+def matcher():
+    return rule_store.snapshot.matcher
+
+def terms(matcher, message):
+    return [span.term for span in matcher.find(normalize(message))]
+
+@pytest.mark.parametrize("message, keyword", [
+    ("I love partying", "art"),
+    ("full steam ahead", "team"),
+    ("let's start", "art"),
+    ("the codec is broken", "code"),
+])
+def test_keyword_inside_another_word_does_not_match(matcher, message, keyword):
+    assert keyword not in terms(matcher, message)
+
+@pytest.mark.parametrize("message, keyword", [
+    ("I love STEM", "stem"),
+    ("I'm into web-dev", "web dev"),
+    ("building robots", "robot"),
+    ("public speaking and debating", "public speaking"),
+])
+def test_keyword_variants_match(matcher, message, keyword):
+    assert keyword in terms(matcher, message)
+
+def test_spans_point_into_the_original_message(matcher):
+    message = "I enjoy Public Speaking!"
+    [span] = matcher.find(normalize(message))
+    assert span.term == "public speaking"
+    assert message[span.start:span.end] == "Public Speaking"
+    assert not span.fuzzy
+
+def test_longest_phrase_wins():
+    matcher = _build_matcher({
+        "art": {"keywords": ("art", "digital art"), "response": ""},
+    })
+    assert terms(matcher, "digital art classes") == ["digital art"]
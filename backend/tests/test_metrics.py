@@ -0,0 +1,105 @@
+"""Tests for Prometheus rendering, instrumentation and /api/metrics."""
+
+import asyncio
+
+import pytest
+
+import main
+import metrics
+from asgi_client import call
+
+pytestmark = pytest.mark.skipif(not metrics.ENABLED, reason="METRICS_ENABLED=0")
+
+def test_counter_renders_labelled_series():
+    registry = metrics.Registry()
+    counter = registry.counter("test_requests_total", "Requests by route", ("route", "status"))
+    counter.inc(1, "/b", "200")
+    counter.inc(2, "/a", "500")
+    counter.inc(1.5, "/a", "500")
+    assert registry.render().splitlines() == [
+        "# HELP test_requests_total Requests by route",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{route="/a",status="500"} 3.5',
+        'test_requests_total{route="/b",status="200"} 1',
+    ]
+
+def test_label_values_are_escaped():
+    registry = metrics.Registry()
+    registry.counter("test_total", "Escaping", ("value",)).inc(1, 'say "hi"\\\n')
+    assert 'test_total{value="say \\"hi\\"\\\\\\n"} 1' in registry.render()
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = metrics.Registry()
+    histogram = registry.histogram("test_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "rules")
+    assert registry.render().splitlines() == [
+        "# HELP test_seconds Latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="rules",le="0.1"} 2',
+        'test_seconds_bucket{stage="rules",le="1"} 3',
+        'test_seconds_bucket{stage="rules",le="+Inf"} 4',
+        'test_seconds_sum{stage="rules"} 3.65',
+        'test_seconds_count{stage="rules"} 4',
+    ]
+
+def test_collector_gauges_are_grouped_by_name():
+    registry = metrics.Registry()
+    registry.register_collector(lambda: [
+        ("test_cache", "Cache stats", 3, {"stat": "entries"}),
+        ("test_version", "Version", 7, {}),
+        ("test_cache", "Cache stats", 1024, {"stat": "bytes"}),
+        ("test_skipped", "Unknown values are left out", None, {}),
+    ])
+    assert registry.render().splitlines() == [
+        "# HELP test_cache Cache stats",
+        "# TYPE test_cache gauge",
+        'test_cache{stat="entries"} 3',
+        'test_cache{stat="bytes"} 1024',
+        "# HELP test_version Version",
+        "# TYPE test_version gauge",
+        "test_version 7",
+    ]
+
+def stage_count(stage):
+    series = metrics.STAGE_SECONDS._series.get((stage,))
+    return sum(series[:-1]) if series else 0
+
+def test_instrument_times_sync_functions_and_reports_outcomes():
+    outcomes = []
+
+    @metrics.instrument("test_sync", on_outcome=lambda result, error: outcomes.append((result, type(error))))
+    def divide(a, b):
+        return a / b
+
+    before = stage_count("test_sync")
+    assert divide(6, 3) == 2
+    with pytest.raises(ZeroDivisionError):
+        divide(1, 0)
+    assert stage_count("test_sync") == before + 2
+    assert outcomes == [(2, type(None)), (None, ZeroDivisionError)]
+    assert divide.__name__ == "divide"
+
+def test_instrument_times_async_functions():
+    outcomes = []
+
+    @metrics.instrument("test_async", on_outcome=lambda result, error: outcomes.append(result))
+    async def echo(value):
+        await asyncio.sleep(0)
+        return value
+
+    before = stage_count("test_async")
+    assert asyncio.run(echo("hi")) == "hi"
+    assert stage_count("test_async") == before + 1
+    assert outcomes == ["hi"]
+
+def test_metrics_endpoint_serves_prometheus_text():
+    assert call(main.app, "GET", "/api/health").status == 200
+    response = call(main.app, "GET", "/api/metrics")
+    assert response.status == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    text = response.body.decode("utf-8")
+    assert "# TYPE club_backend_http_request_seconds histogram" in text
+    assert 'club_backend_http_request_seconds_count{method="GET",route="/api/health",status="200"}' in text
+    assert "# TYPE club_backend_rules_version gauge" in text
+    assert '\nclub_backend_reply_cache{stat="' in text
@@ -0,0 +1,24 @@
+"""Tests for message normalization."""
+
+from normalize import normalize, normalize_term
+
+def test_words_offsets_and_bigrams():
+    message = "Hi, I like Web-Dev!"
+    normalized = normalize(message)
+    assert normalized.words == ("hi", "i", "like", "web", "dev")
+    assert normalized.text == "hi i like web dev"
+    assert [message[start:end] for start, end in normalized.offsets] == ["Hi", "I", "like", "Web", "Dev"]
+    assert "web dev" in normalized.bigram_set
+    assert normalized.token_set == frozenset(normalized.words)
+
+def test_empty_message():
+    normalized = normalize("  ?! ")
+    assert normalized.words == ()
+    assert normalized.bigram_set == frozenset()
+
+def test_repeated_messages_share_one_result():
+    assert normalize("I like robots") is normalize("I like robots")
+
+def test_terms_normalize_like_messages():
+    assert normalize_term("Web-Dev") == "web dev"
+    assert normalize_term("  STEM ") == "stem"
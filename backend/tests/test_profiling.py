@@ -0,0 +1,73 @@
+"""Tests for the per-request profiling middleware."""
+
+import asyncio
+
+import pytest
+
+from asgi_client import send_request
+from profiling import ProfilingMiddleware
+
+class SlowApp:
+    """Answers 200 after an optional gate opens."""
+
+    def __init__(self):
+        self.gate = None
+
+    async def __call__(self, scope, receive, send):
+        if self.gate is not None:
+            await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+def profiled(response):
+    return "x-profile-id" in response.headers
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+def run(middleware, *requests):
+    async def scenario():
+        return [await send_request(middleware, "GET", "/", headers=headers) for headers in requests]
+    return asyncio.run(scenario())
+
+def test_header_triggers_a_profile(admin_token, tmp_path):
+    middleware = ProfilingMiddleware(SlowApp(), sample_every=0, header_enabled=True, profile_dir=str(tmp_path))
+    plain, with_header = run(middleware, {}, {"X-Profile": "secret", "X-Request-Id": "req/1"})
+    assert not profiled(plain)
+    assert with_header.headers["x-profile-id"] == "req_1"
+    assert (tmp_path / "req_1.folded").exists()
+
+def test_header_is_ignored_when_disabled(admin_token, tmp_path):
+    middleware = ProfilingMiddleware(SlowApp(), sample_every=0, header_enabled=False, profile_dir=str(tmp_path))
+    (response,) = run(middleware, {"X-Profile": "secret"})
+    assert not profiled(response)
+    assert list(tmp_path.iterdir()) == []
+
+def test_sampling_profiles_every_nth_request(tmp_path):
+    middleware = ProfilingMiddleware(SlowApp(), sample_every=3, header_enabled=False, profile_dir=str(tmp_path))
+    responses = run(middleware, *([{}] * 6))
+    assert [profiled(response) for response in responses] == [False, False, True, False, False, True]
+    assert len(list(tmp_path.iterdir())) == 2
+
+def test_only_one_request_is_profiled_at_a_time(admin_token, tmp_path):
+    app = SlowApp()
+    middleware = ProfilingMiddleware(app, sample_every=0, header_enabled=True, profile_dir=str(tmp_path))
+
+    async def scenario():
+        app.gate = asyncio.Event()
+        first = asyncio.create_task(send_request(middleware, "GET", "/", headers={"X-Profile": "secret", "X-Request-Id": "first"}))
+        await asyncio.sleep(0.01)
+        # Overlaps the first profile, so it runs unprofiled rather than mixing samples
+        second = asyncio.create_task(send_request(middleware, "GET", "/", headers={"X-Profile": "secret", "X-Request-Id": "second"}))
+        await asyncio.sleep(0.01)
+        app.gate.set()
+        results = await asyncio.gather(first, second)
+        app.gate = None
+        # Once the first profile is written, the next request can be profiled again
+        third = await send_request(middleware, "GET", "/", headers={"X-Profile": "secret", "X-Request-Id": "third"})
+        return results + [third]
+
+    first, second, third = asyncio.run(scenario())
+    assert profiled(first) and not profiled(second) and profiled(third)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["first.folded", "third.folded"]
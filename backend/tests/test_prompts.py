@@ -0,0 +1,34 @@
+"""Tests for AI system prompt construction."""
+
+from prompts import SYSTEM_PREFIX, build_session_context, build_system_message, count_tokens
+
+def test_prefix_is_identical_across_users():
+    first = build_system_message(build_session_context(9, ["art"], [], [], []))
+    second = build_system_message(build_session_context(12, ["coding"], ["competitive"], ["Chess"], ["hi"]))
+    assert first.startswith(SYSTEM_PREFIX)
+    assert second.startswith(SYSTEM_PREFIX)
+
+def test_context_goes_last():
+    message = build_system_message("User is in grade 10. ", hybrid=True)
+    assert message.endswith("Context about the user: User is in grade 10.\n")
+
+def test_empty_context_adds_nothing():
+    assert build_system_message("") == SYSTEM_PREFIX
+
+def test_context_orders_facts_by_importance():
+    context = build_session_context(10, ["art"], ["creative"], ["Art Club"], ["hello"])
+    assert context.index("grade 10") < context.index("art") < context.index("creative") < context.index("Art Club")
+    assert context.endswith("Previous queries: hello. ")
+
+def test_context_respects_budget_keeping_newest_items():
+    history = [f"question number {index} about clubs" for index in range(10)]
+    context = build_session_context(11, ["music"], [], [], history, budget=30)
+    assert count_tokens(context) <= 30
+    assert "grade 11" in context
+    # Only the newest queries are considered, and older ones are dropped first
+    assert "question number 6" not in context
+    if "Previous queries" in context:
+        assert "question number 9" in context
+
+def test_tiny_budget_drops_everything_that_does_not_fit():
+    assert build_session_context(9, ["art"], [], [], [], budget=1) == ""
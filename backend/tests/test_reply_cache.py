@@ -0,0 +1,69 @@
+"""Tests for the in-memory AI reply cache and its near-duplicate index."""
+
+import pytest
+
+import reply_cache
+from reply_cache import ReplyCache, make_cache_key
+
+def test_key_ignores_case_punctuation_and_order_of_interests():
+    assert make_cache_key("What CLUB?", 9, ["Music", "art"]) == make_cache_key("what club", 9, ["art", "music"])
+    assert make_cache_key("what club", 9) != make_cache_key("what club", 10)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ReplyCache(max_entries=2)
+    cache.set(("a",), "A")
+    cache.set(("b",), "B")
+    cache.get(("a",))
+    cache.set(("c",), "C")
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == "A"
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(reply_cache.time, "monotonic", lambda: now[0])
+    cache = ReplyCache(ttl_seconds=10)
+    cache.set(("a",), "A")
+    now[0] += 11
+    assert cache.get(("a",)) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_byte_budget_is_respected():
+    cache = ReplyCache(max_bytes=2000)
+    for index in range(20):
+        cache.set((f"message {index}",), "x" * 200)
+    assert cache.stats()["bytes"] <= 2000
+    assert len(cache) < 20
+
+def near_lookup(cached, message, **session):
+    cache = ReplyCache(near_threshold=0.8)
+    cache.set(make_cache_key(cached, **session), "reply")
+    return cache.lookup(make_cache_key(message, **session))[1]
+
+@pytest.mark.parametrize("cached, message", [
+    ("what club should i join?", "Which clubs should I join"),
+    ("what clubs are good for someone who likes music and art", "which clubs are good for someone who likes art and music"),
+    ("I'm interested in robotics and coding clubs", "interested in coding and robotics clubs"),
+])
+def test_rewordings_hit(cached, message):
+    assert near_lookup(cached, message) == "near"
+
+@pytest.mark.parametrize("cached, message", [
+    ("is there a club about hiking", "is there a club about fishing"),
+    ("clubs for people who like chess", "clubs for people who like drama"),
+    ("i like sports clubs", "i dont like sports clubs"),
+    ("any good clubs for grade 9", "any good clubs for grade 10"),
+])
+def test_topic_swaps_miss(cached, message):
+    assert near_lookup(cached, message) == "miss"
+
+def test_near_matches_stay_within_session_fields():
+    cache = ReplyCache(near_threshold=0.8)
+    cache.set(make_cache_key("what club should i join?", grade=9), "reply")
+    assert cache.lookup(make_cache_key("which clubs should I join", grade=12))[1] == "miss"
+
+def test_removed_entries_leave_the_near_index():
+    cache = ReplyCache(max_entries=1, near_threshold=0.8)
+    cache.set(make_cache_key("what club should i join?"), "reply")
+    cache.set(make_cache_key("something else entirely here"), "other")
+    assert cache.lookup(make_cache_key("which clubs should I join"))[1] == "miss"
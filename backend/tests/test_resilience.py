@@ -0,0 +1,149 @@
+"""Tests for the LLM resilience policy: deadline, hedging and circuit breaker."""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController
+from resilience import CircuitBreaker, HedgeBudget, ResiliencePolicy, UpstreamUnavailable
+
+class Upstream:
+    """Attempt factory whose calls take the given delays in turn."""
+
+    def __init__(self, *delays, error=None):
+        self.delays = list(delays)
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        return self._attempt(self.calls, delay)
+
+    async def _attempt(self, number, delay):
+        await asyncio.sleep(delay)
+        if self.error is not None:
+            raise self.error
+        return number
+
+def warmed_budget(policy, calls=20):
+    for _ in range(calls):
+        policy.budget.record(False)
+
+def test_deadline_raises_upstream_unavailable():
+    policy = ResiliencePolicy(deadline=0.05, hedge=False)
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(policy.call(Upstream(1.0)))
+    assert policy.deadline_exceeded == 1
+    assert policy.breaker.consecutive_failures == 1
+
+def test_slow_call_is_hedged_and_the_hedge_wins():
+    policy = ResiliencePolicy(deadline=2.0, default_hedge_delay=0.02)
+    warmed_budget(policy)
+    upstream = Upstream(1.0, 0.0)
+    assert asyncio.run(policy.call(upstream)) == 2
+    assert upstream.calls == 2
+    assert policy.hedges == 1
+
+def test_fast_call_is_not_hedged():
+    policy = ResiliencePolicy(deadline=2.0, default_hedge_delay=0.5)
+    warmed_budget(policy)
+    upstream = Upstream(0.0)
+    assert asyncio.run(policy.call(upstream)) == 1
+    assert upstream.calls == 1
+    assert policy.hedges == 0
+
+def test_hedges_stay_within_budget():
+    policy = ResiliencePolicy(deadline=2.0, default_hedge_delay=0.0, hedge_budget=0.1)
+
+    async def scenario():
+        for _ in range(50):
+            await policy.call(Upstream(0.001))
+
+    asyncio.run(scenario())
+    assert 0 < policy.hedges <= 5
+    assert policy.hedges_skipped > 0
+
+def test_hedge_budget_window():
+    budget = HedgeBudget(ratio=0.1, window=10)
+    assert not budget.allows()
+    for _ in range(9):
+        budget.record(False)
+    assert budget.allows()
+    budget.record(True)
+    assert not budget.allows()
+    for _ in range(10):
+        budget.record(False)
+    assert budget.allows()
+
+def test_hedge_needs_a_free_admission_slot():
+    admission = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+    policy = ResiliencePolicy(deadline=0.2, default_hedge_delay=0.01, admission=admission)
+    warmed_budget(policy)
+    upstream = Upstream(0.05)
+
+    async def scenario():
+        # The primary call holds the only slot, as LLMClient does
+        async with admission.slot():
+            return await policy.call(upstream)
+
+    assert asyncio.run(scenario()) == 1
+    assert upstream.calls == 1
+    assert policy.hedges_skipped == 1
+    assert admission.stats()["active"] == 0
+
+def test_hedge_releases_its_admission_slot():
+    admission = AdmissionController(max_concurrent=2, max_queue=4, queue_timeout=1.0)
+    policy = ResiliencePolicy(deadline=2.0, default_hedge_delay=0.01, admission=admission)
+    warmed_budget(policy)
+
+    async def scenario():
+        async with admission.slot():
+            result = await policy.call(Upstream(1.0, 0.0))
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == 2
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["admitted"] == 2
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    policy = ResiliencePolicy(deadline=1.0, hedge=False, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            asyncio.run(policy.call(Upstream(0.0, error=asyncio.TimeoutError())))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    upstream = Upstream(0.0)
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(policy.call(upstream))
+    assert upstream.calls == 0
+
+def test_breaker_half_open_trial_closes_or_reopens(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock[0] += 30.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock[0] += 30.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_request_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+    policy = ResiliencePolicy(deadline=1.0, hedge=False, breaker=breaker)
+    with pytest.raises(ValueError):
+        asyncio.run(policy.call(Upstream(0.0, error=ValueError("bad request"))))
+    assert breaker.state == CircuitBreaker.CLOSED
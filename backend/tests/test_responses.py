@@ -0,0 +1,84 @@
+"""Tests for ETag revalidation through the compression middleware."""
+
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from responses import CompressionMiddleware, cached_json, choose_encoding, make_etag, matching_etag
+
+BODY = {"clubs": ["Chess Club"] * 200}
+ETAG = make_etag("clubs", "v1")
+
+def scope_for(**headers):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    }
+
+def call(**headers):
+    """Run one request through CompressionMiddleware; returns (status, headers)."""
+    async def app(scope, receive, send):
+        await cached_json(Request(scope), BODY, ETAG)(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope_for(**headers), receive, send))
+    start = sent[0]
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}
+
+def test_matching_etag_returns_the_clients_tag():
+    tag = ETAG.strip('"')
+    assert matching_etag(f'"{tag}-gzip"', ETAG) == f'"{tag}-gzip"'
+    assert matching_etag(f'"other", W/"{tag}-br"', ETAG) == f'"{tag}-br"'
+    assert matching_etag(ETAG, ETAG) == ETAG
+    assert matching_etag("*", ETAG) == ETAG
+    assert matching_etag('"other"', ETAG) is None
+    assert matching_etag(None, ETAG) is None
+
+def test_not_modified_repeats_the_compressed_validator():
+    status, headers = call(accept_encoding="gzip")
+    assert status == 200
+    assert headers["etag"] == ETAG[:-1] + '-gzip"'
+
+    status, revalidated = call(accept_encoding="gzip", if_none_match=headers["etag"])
+    assert status == 304
+    assert revalidated["etag"] == headers["etag"]
+    assert revalidated["vary"] == "Accept-Encoding"
+
+def test_uncompressed_revalidation_keeps_plain_etag():
+    status, headers = call()
+    assert status == 200 and headers["etag"] == ETAG
+    status, revalidated = call(if_none_match=ETAG)
+    assert status == 304
+    assert revalidated["etag"] == ETAG
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("BR;Q=1", "br"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity", None),
+    ("xbrotli, brx, gzipped", None),
+    ("", None),
+])
+def test_choose_encoding_honours_q_values(header, expected):
+    assert choose_encoding(header) == expected
+
+def test_refused_encoding_is_not_used():
+    status, headers = call(accept_encoding="br;q=0, gzip;q=0")
+    assert status == 200
+    assert "content-encoding" not in headers
+    assert headers["etag"] == ETAG
@@ -0,0 +1,75 @@
+"""Tests for RuleStore snapshots, reloads and persistence."""
+
+import json
+import os
+
+import pytest
+
+from rules import RULE_MAPPINGS, RuleStore
+
+def write_rules(path, rule_mappings):
+    with open(path, "w", encoding="utf-8") as rules_file:
+        json.dump(rule_mappings, rules_file)
+
+def test_snapshot_is_compiled_lazily():
+    store = RuleStore(RULE_MAPPINGS)
+    assert store._snapshot is None
+    assert store.snapshot.version == 1
+    assert store.snapshot is store.snapshot
+
+def test_reply_text_change_reuses_matcher_and_scorer():
+    store = RuleStore(RULE_MAPPINGS)
+    before = store.snapshot
+    after = store.add_rule("coding", list(RULE_MAPPINGS["coding"]["keywords"]), "New reply")
+    assert after.version == before.version + 1
+    assert after.matcher is before.matcher
+    assert after.scorer is before.scorer
+    assert after.rule_mappings["coding"]["response"] == "New reply"
+
+def test_keyword_change_rebuilds_matcher():
+    store = RuleStore(RULE_MAPPINGS)
+    before = store.snapshot
+    after = store.add_rule("chess", ["chess", "checkmate"], "Try the Chess Club!")
+    assert after.matcher is not before.matcher
+    assert "chess" in after.scorer.club_index
+    # Readers holding the old snapshot keep a consistent view
+    assert "chess" not in before.rule_mappings
+
+def test_invalid_rule_is_rejected_and_snapshot_kept():
+    store = RuleStore(RULE_MAPPINGS)
+    before = store.snapshot
+    with pytest.raises(ValueError):
+        store.add_rule("empty", [], "No keywords")
+    assert store.snapshot is before
+
+def test_reload_picks_up_file_changes(tmp_path):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, {"chess": {"keywords": ["chess"], "response": "Chess!"}})
+    store = RuleStore(RULE_MAPPINGS, path)
+    assert list(store.snapshot.rule_mappings) == ["chess"]
+    assert not store.reload()
+
+    write_rules(path, {"go": {"keywords": ["baduk"], "response": "Go!"}})
+    os.utime(path, (0, 12345))
+    assert store.reload()
+    assert list(store.snapshot.rule_mappings) == ["go"]
+
+def test_add_rule_persists_to_file(tmp_path):
+    path = str(tmp_path / "rules.json")
+    store = RuleStore(RULE_MAPPINGS, path)
+    store.add_rule("Chess", ["Chess"], "Chess!")
+    with open(path, encoding="utf-8") as rules_file:
+        saved = json.load(rules_file)
+    assert saved["chess"] == {"keywords": ["chess"], "response": "Chess!"}
+    assert not store.reload()
+
+def test_fingerprint_tracks_content_not_version():
+    store, other = RuleStore(RULE_MAPPINGS), RuleStore(RULE_MAPPINGS)
+    coding = RULE_MAPPINGS["coding"]
+    # Rewriting a rule with the same content bumps the version but not the fingerprint
+    same = other.add_rule("coding", list(coding["keywords"]), coding["response"])
+    assert same.version != store.snapshot.version
+    assert same.fingerprint == store.snapshot.fingerprint
+
+    changed = other.add_rule("coding", list(coding["keywords"]), "New reply")
+    assert changed.fingerprint != store.snapshot.fingerprint
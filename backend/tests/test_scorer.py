@@ -0,0 +1,73 @@
+"""Tests for ClubScorer ranking."""
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_rule_table
+from normalize import normalize
+from rules import RULE_MAPPINGS, RuleStore
+
+def compile_rules(rule_mappings):
+    return RuleStore(rule_mappings).warm_up()
+
+def spans(snapshot, message):
+    return snapshot.matcher.find(normalize(message))
+
+def dense_scores(snapshot, message_spans):
+    """Reference TF-IDF scores from the full club x term matrix."""
+    terms = list(snapshot.matcher.term_tags)
+    clubs = list(snapshot.rule_mappings)
+    weights = np.zeros((len(clubs), len(terms)))
+    for row, rule_data in enumerate(snapshot.rule_mappings.values()):
+        for keyword in rule_data["keywords"]:
+            weights[row, terms.index(keyword)] = 1.0
+    weights *= np.log1p(len(clubs) / np.maximum(weights.sum(axis=0), 1.0))
+    weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+    counts = np.zeros(len(terms))
+    for span in message_spans:
+        counts[terms.index(span.term)] += 1.0
+    return weights @ counts
+
+@pytest.mark.parametrize("message", [
+    "I like coding and robotics",
+    "STEM research in the lab",
+    "music, music and more music",
+    "nothing relevant here",
+])
+def test_scores_match_the_dense_matrix_product(message):
+    snapshot = compile_rules(RULE_MAPPINGS)
+    message_spans = spans(snapshot, message)
+    scores = snapshot.scorer.score([message_spans], [None])
+    np.testing.assert_allclose(scores[0], dense_scores(snapshot, message_spans))
+
+def test_shared_keyword_ranks_both_clubs_in_table_order():
+    snapshot = compile_rules(RULE_MAPPINGS)
+    ranked = snapshot.scorer.rank(snapshot.scorer.score([spans(snapshot, "STEM")], [None])[0])
+    assert [club for club, _ in ranked] == ["robotics", "science"]
+
+def test_interest_boost_breaks_ties():
+    snapshot = compile_rules(RULE_MAPPINGS)
+    scores = snapshot.scorer.score([spans(snapshot, "STEM")], [["Science"]])
+    assert snapshot.scorer.rank(scores[0], 1)[0][0] == "science"
+
+def test_no_hits_ranks_nothing():
+    snapshot = compile_rules(RULE_MAPPINGS)
+    scores = snapshot.scorer.score([[]], [["coding"]])
+    assert not scores.any()
+    assert snapshot.scorer.rank(scores[0]) == []
+
+def test_scoring_touches_only_the_clubs_listing_each_hit_term():
+    # Per-span work is one column: the clubs that list the term, not the whole rule table
+    small = compile_rules(RULE_MAPPINGS)
+    large = compile_rules(synthetic_rule_table(2000))
+    message = "I like coding and music"
+    for snapshot in (small, large):
+        scorer = snapshot.scorer
+        for span in spans(snapshot, message):
+            clubs, weights = scorer.column(span.term)
+            listing = [row for row, rule_data in enumerate(snapshot.rule_mappings.values()) if span.term in rule_data["keywords"]]
+            assert sorted(clubs.tolist()) == listing
+            assert len(weights) == len(listing)
+        scores = scorer.score([spans(snapshot, message)], [None])[0]
+        assert np.count_nonzero(scores) <= sum(len(scorer.column(span.term)[0]) for span in spans(snapshot, message))
+    assert sum(len(large.scorer.column(span.term)[0]) for span in spans(large, message)) == 2
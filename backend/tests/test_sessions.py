@@ -0,0 +1,162 @@
+"""Tests for server-side conversation sessions."""
+
+import asyncio
+
+import pytest
+
+import sessions
+from sessions import SessionRecord, SessionStore
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+def test_apply_merges_bounded_lists():
+    store = SessionStore()
+    record = store.create(interests=["art"], add_clubs_viewed=["Chess"])
+    updated = store.apply(record, add_interests=["music", "art"], add_clubs_viewed=["Drama"], grade=10)
+    assert updated.interests == ("music", "art")
+    assert updated.clubs_viewed == ("Chess", "Drama")
+    assert updated.grade == 10
+    assert updated.version == record.version + 1
+    # The old record is left untouched
+    assert record.interests == ("art",)
+
+def test_query_history_is_bounded(monkeypatch):
+    monkeypatch.setattr(sessions, "HISTORY_LIMIT", 3)
+    store = SessionStore()
+    record = store.create()
+    for index in range(5):
+        record = store.begin_turn(record.session_id, f"message {index}", {}, {})
+    assert store.get(record.session_id).query_history == ("message 2", "message 3", "message 4")
+
+def test_context_is_rendered_with_the_record():
+    record = SessionStore().create(grade=9, interests=["robotics"])
+    assert "grade 9" in record.context
+    assert record.as_session_data()["interests"] == ["robotics"]
+
+def test_turn_renders_context_once(monkeypatch):
+    store = SessionStore()
+    record = store.create(interests=["art"])
+    renders = []
+    original = sessions.prompts.build_session_context
+    monkeypatch.setattr(sessions.prompts, "build_session_context", lambda *args: renders.append(args) or original(*args))
+    current = store.begin_turn(record.session_id, "any clubs?", {"add_interests": ["music"]}, {})
+    assert renders == []
+    assert current.context == current.context
+    assert len(renders) == 1
+
+def test_json_round_trip():
+    record = SessionRecord("abc", 3, 11, ("art",), ("creative",), ("Art Club",), ("hi",), 123.0)
+    loaded = SessionRecord.from_json("abc", record.to_json())
+    assert loaded.as_session_data() == record.as_session_data()
+    assert (loaded.version, loaded.last_seen) == (3, 123.0)
+
+def test_begin_turn_applies_delta_then_appends_message():
+    store = SessionStore()
+    record = store.create(interests=["art"])
+    current = store.begin_turn(record.session_id, "any clubs?", {"add_interests": ["music"]}, {})
+    assert current.interests == ("art", "music")
+    # The turn sees history without its own message; the stored record has it
+    assert current.query_history == ()
+    assert store.get(record.session_id).query_history == ("any clubs?",)
+
+def test_begin_turn_seeds_unknown_sessions():
+    store = SessionStore()
+    current = store.begin_turn("unknown", "hello", {"grade": 12}, {"grade": 9, "interests": ["art"]})
+    assert current.session_id != "unknown"
+    assert (current.grade, current.interests) == (12, ("art",))
+    assert store.stats()["created"] == 1
+
+def test_begin_turn_writes_once(sqlite_path, monkeypatch):
+    store = SessionStore(path=sqlite_path)
+    record = store.create()
+    saves = []
+    original = store.backend.save
+    monkeypatch.setattr(store.backend, "save", lambda saved, expected: saves.append(saved) or original(saved, expected))
+    store.begin_turn(record.session_id, "hi", {"add_interests": ["art"]}, {})
+    assert len(saves) == 1
+    assert saves[0].interests == ("art",) and saves[0].query_history == ("hi",)
+
+def test_idle_sessions_expire(monkeypatch):
+    store = SessionStore(idle_ttl=60)
+    record = store.create()
+    now = sessions.time.time()
+    monkeypatch.setattr(sessions.time, "time", lambda: now + 61)
+    assert store.get(record.session_id) is None
+    assert store.stats()["expired"] == 1
+
+def test_least_recently_used_sessions_are_evicted():
+    store = SessionStore(max_sessions=2)
+    first, second = store.create(), store.create()
+    store.get(first.session_id)
+    store.create()
+    assert store.get(second.session_id) is None
+    assert store.get(first.session_id) is not None
+    assert store.stats()["evicted"] == 1
+
+def test_persistent_sessions_are_shared(sqlite_path):
+    # Two stores on one file behave like two workers
+    first, second = SessionStore(path=sqlite_path), SessionStore(path=sqlite_path)
+    record = first.create(interests=["art"])
+    assert second.get(record.session_id).interests == ("art",)
+    second.apply(second.get(record.session_id), add_interests=["music"])
+    assert first.get(record.session_id).interests == ("art", "music")
+    first.delete(record.session_id)
+    assert second.get(record.session_id) is None
+
+def test_concurrent_turns_on_two_workers_keep_both_queries(sqlite_path):
+    first, second = SessionStore(path=sqlite_path), SessionStore(path=sqlite_path)
+    record = first.create()
+    # Both workers have the session cached at the same version
+    assert second.get(record.session_id).version == record.version
+    original = second.backend.version
+
+    def version(session_id):
+        # The first worker's turn lands between the second's read and its write
+        current = original(session_id)
+        if not turns:
+            turns.append(first.begin_turn(record.session_id, "from first", {"add_interests": ["art"]}, {}))
+        return current
+
+    turns = []
+    second.backend.version = version
+    second.begin_turn(record.session_id, "from second", {"add_interests": ["music"]}, {})
+    stored = first.get(record.session_id)
+    assert stored.query_history == ("from first", "from second")
+    assert stored.interests == ("art", "music")
+    assert stored.version == record.version + 2
+
+def test_stale_apply_is_reapplied_to_the_newer_record(sqlite_path):
+    first, second = SessionStore(path=sqlite_path), SessionStore(path=sqlite_path)
+    record = first.create(interests=["art"])
+    stale = second.get(record.session_id)
+    first.apply(first.get(record.session_id), add_interests=["chess"])
+    second.apply(stale, add_interests=["music"])
+    assert first.get(record.session_id).interests == ("art", "chess", "music")
+
+def test_resolve_session_runs_sqlite_off_the_event_loop(sqlite_path, monkeypatch):
+    import main
+
+    store = SessionStore(path=sqlite_path)
+    monkeypatch.setattr(main, "session_store", store)
+    record = store.create(interests=["art"])
+    on_loop = []
+
+    def version(session_id, original=store.backend.version):
+        on_loop.append(_on_event_loop())
+        return original(session_id)
+
+    monkeypatch.setattr(store.backend, "version", version)
+    request = main.AIRequest(message="hi", sessionId=record.session_id)
+    current = asyncio.run(main.resolve_session(request))
+    assert current.interests == ("art",)
+    assert main.session_id(request) == record.session_id
+    assert on_loop == [False]
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
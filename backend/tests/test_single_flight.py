@@ -0,0 +1,91 @@
+"""Tests for coalescing identical in-flight LLM calls."""
+
+import asyncio
+
+import pytest
+
+from llm_client import SingleFlight
+
+class Upstream:
+    """Counts calls and holds each one until released."""
+
+    def __init__(self, result="reply", error=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def start_waiters(flight, upstream, count, key="prompt"):
+    waiters = [asyncio.create_task(flight.do(key, upstream)) for _ in range(count)]
+    # Let every waiter reach the shared call
+    await asyncio.sleep(0)
+    return waiters
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        waiters = await start_waiters(flight, upstream, 10)
+        assert len(flight) == 1
+        upstream.release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert results == ["reply"] * 10
+    assert flight.coalesced == 9
+    assert len(flight) == 0
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        waiters = [asyncio.create_task(flight.do(key, upstream)) for key in ("a", "b")]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        await asyncio.gather(*waiters)
+        return upstream
+
+    assert asyncio.run(scenario()).calls == 2
+
+def test_upstream_error_reaches_every_waiter():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream(error=RuntimeError("upstream down"))
+        waiters = await start_waiters(flight, upstream, 5)
+        upstream.release.set()
+        return upstream, await asyncio.gather(*waiters, return_exceptions=True)
+
+    upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert len(results) == 5
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream down" for result in results)
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        leader, *others = await start_waiters(flight, upstream, 3)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        upstream.release.set()
+        return upstream, await asyncio.gather(*others)
+
+    upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert results == ["reply", "reply"]
+
+def test_finished_call_is_not_reused():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        upstream.release.set()
+        await flight.do("prompt", upstream)
+        await flight.do("prompt", upstream)
+        return upstream
+
+    assert asyncio.run(scenario()).calls == 2
@@ -0,0 +1,38 @@
+"""Tests for lazy imports, startup warm-up and /api/ready."""
+
+import asyncio
+import os
+import subprocess
+import sys
+
+import main
+from asgi_client import call, send_request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_main_does_not_import_openai():
+    # A fresh interpreter, since other tests may have imported the SDK already
+    check = "import sys, main; sys.exit('openai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_ready_is_503_until_warm_up_finishes(monkeypatch):
+    monkeypatch.delenv("REPLY_CACHE_WARM_FILE", raising=False)
+    monkeypatch.setattr(main.app.state, "ready", False, raising=False)
+    response = call(main.app, "GET", "/api/ready")
+    assert response.status == 503
+    assert response.json() == {"ready": False}
+
+    async def scenario():
+        async with main.app.router.lifespan_context(main.app):
+            for _ in range(500):
+                if main.app.state.ready:
+                    break
+                await asyncio.sleep(0.01)
+            return await send_request(main.app, "GET", "/api/ready")
+
+    response = asyncio.run(scenario())
+    assert response.status == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert {"import", "rules", "catalog", "warm_up"} <= set(body["startup"])
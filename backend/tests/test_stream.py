@@ -0,0 +1,104 @@
+"""Tests for the Server-Sent Events endpoints."""
+
+import json
+
+import pytest
+
+import main
+from admission import AdmissionRejected
+from asgi_client import call
+from disk_cache import DiskReplyCache
+
+MISS = "zzyzx qwv plumbus"
+
+class FakeLLM:
+    """Streams canned deltas, or sheds the call like a full admission queue."""
+
+    def __init__(self, deltas=("Try the ", "Chess Club!"), reject=False):
+        self.deltas = deltas
+        self.reject = reject
+        self.streams = 0
+
+    async def stream(self, system_message, user_message):
+        self.streams += 1
+        if self.reject:
+            raise AdmissionRejected("queue full")
+        for delta in self.deltas:
+            yield delta
+
+def parse_events(body: bytes):
+    events = []
+    for frame in body.decode("utf-8").split("\n\n"):
+        if not frame:
+            continue
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+@pytest.fixture
+def llm(monkeypatch):
+    main.reply_cache.clear()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(main, "disk_cache", None)
+    fake = FakeLLM()
+    monkeypatch.setattr(main.app.state, "llm", fake, raising=False)
+    yield fake
+    main.reply_cache.clear()
+
+def stream(path, message):
+    response = call(main.app, "POST", path, {"message": message})
+    assert response.status == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.body)
+
+def test_rule_hit_is_sent_complete_without_the_llm(llm):
+    events = stream("/api/recommend/stream", "I love coding")
+    assert [name for name, _ in events] == ["meta", "token", "done"]
+    meta, token, done = (data for _, data in events)
+    assert meta["source"] == "rules"
+    assert meta["matched_patterns"][0] == "coding"
+    assert token["text"] == done["reply"]
+    assert llm.streams == 0
+
+def test_ai_fallback_relays_deltas_then_done(llm):
+    events = stream("/api/recommend/stream", MISS)
+    assert [name for name, _ in events] == ["meta", "token", "token", "done"]
+    assert events[0][1]["source"] == "ai"
+    assert [data["text"] for name, data in events if name == "token"] == ["Try the ", "Chess Club!"]
+    assert events[-1][1] == {"reply": "Try the Chess Club!"}
+
+def test_streamed_reply_is_cached_for_the_next_request(llm):
+    stream("/api/recommend/stream", MISS)
+    events = stream("/api/recommend/stream", MISS)
+    assert [name for name, _ in events] == ["meta", "token", "done"]
+    assert events[-1][1]["reply"] == "Try the Chess Club!"
+    assert llm.streams == 1
+
+def test_streamed_reply_is_written_to_and_served_from_disk(llm, monkeypatch, tmp_path):
+    disk = DiskReplyCache(str(tmp_path / "replies.db"))
+    monkeypatch.setattr(main, "disk_cache", disk)
+    try:
+        stream("/api/recommend/stream", MISS)
+        # Another worker, or this one after a restart, has only the disk copy
+        main.reply_cache.clear()
+        events = stream("/api/recommend/stream", MISS)
+    finally:
+        disk.close()
+    assert [name for name, _ in events] == ["meta", "token", "done"]
+    assert events[-1][1]["reply"] == "Try the Chess Club!"
+    assert llm.streams == 1
+
+def test_rejected_stream_switches_to_a_degraded_reply(llm):
+    llm.reject = True
+    events = stream("/api/recommend/stream", MISS)
+    assert [name for name, _ in events] == ["meta", "meta", "token", "done"]
+    assert events[0][1]["source"] == "ai"
+    assert events[1][1]["source"] == "rules-degraded"
+    assert events[2][1]["text"] == events[3][1]["reply"]
+
+def test_ai_stream_relays_deltas(llm):
+    events = stream("/api/ai/stream", "what clubs are there?")
+    assert [name for name, _ in events] == ["meta", "token", "token", "done"]
+    assert events[0][1]["source"] == "ai"
+    assert events[-1][1]["reply"] == "Try the Chess Club!"
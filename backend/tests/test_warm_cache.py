@@ -0,0 +1,23 @@
+"""Tests for the standalone cache warmer."""
+
+import asyncio
+
+import main
+import warm_cache
+
+def test_lifespan_warmer_is_disabled_while_warming(monkeypatch, tmp_path):
+    queries = tmp_path / "queries.txt"
+    queries.write_text("tell me something\n", encoding="utf-8")
+    monkeypatch.setenv("REPLY_CACHE_WARM_FILE", str(queries))
+    warmed = []
+
+    async def fake_warm(path):
+        warmed.append(path)
+        # Give a lifespan warmer, if one was started, the chance to run
+        await asyncio.sleep(0.01)
+        return 1
+
+    monkeypatch.setattr(main, "warm_reply_cache", fake_warm)
+    monkeypatch.setattr(warm_cache, "warm_reply_cache", fake_warm)
+    assert asyncio.run(warm_cache.run(str(queries))) == 1
+    assert warmed == [str(queries)]
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Warm the AI reply caches with popular queries.
+Run this before (or alongside) starting the backend with REPLY_DISK_CACHE_PATH
+set, so every worker starts with the popular replies already on disk.
+
+Usage: python warm_cache.py popular_queries.txt
+"""
+
+import asyncio
+import os
+import sys
+
+from main import app, warm_reply_cache
+
+async def run(path: str) -> int:
+    # The lifespan would also warm REPLY_CACHE_WARM_FILE, calling the LLM twice per query
+    os.environ.pop("REPLY_CACHE_WARM_FILE", None)
+    # Run inside the app lifespan so the LLM client is created and closed properly
+    async with app.router.lifespan_context(app):
+        return await warm_reply_cache(path)
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python warm_cache.py <queries-file>")
+        sys.exit(1)
+    warmed = asyncio.run(run(sys.argv[1]))
+    print(f"🔥 Warmed {warmed} queries")
+
+if __name__ == "__main__":
+    main()